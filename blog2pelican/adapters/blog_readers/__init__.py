@@ -1,4 +1,4 @@
-from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.domain.ports.blog_reader import AsyncBlogReader, BlogReader
 
 
 def create_blog_reader(engine: str) -> BlogReader:
@@ -28,3 +28,9 @@ def create_blog_reader(engine: str) -> BlogReader:
         return FeedReader()
     else:
         raise ValueError(f"Unhandled blog engine: {engine}")
+
+
+def create_async_blog_reader(engine: str) -> AsyncBlogReader:
+    from blog2pelican.adapters.blog_readers.threaded import ThreadedAsyncBlogReader
+
+    return ThreadedAsyncBlogReader(create_blog_reader(engine))
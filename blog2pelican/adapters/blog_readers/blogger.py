@@ -1,44 +1,123 @@
 import os
 from collections.abc import Generator
+from functools import cache, partial
 
 from pelican.utils import SafeDatetime
 
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import BloggerSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
-from blog2pelican.helpers.soup import soup_from_xml_file
+from blog2pelican.helpers.cpu import available_cpu_count
+from blog2pelican.helpers.input_files import is_compressed, open_input
+from blog2pelican.helpers.xml_shards import map_shards
+from blog2pelican.helpers.xml_stream import (
+    element_string,
+    import_lxml_etree,
+    iter_elements,
+)
+
+_NAMESPACES = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "app": "http://purl.org/atom/app#",
+}
+_KIND_SCHEME = "http://schemas.google.com/g/2005#kind"
+_TAG_SCHEME = "http://www.blogger.com/atom/ns#"
+# Files of exports, e.g. in a Takeout archive
+_EXPORT_SUFFIXES = (".atom", ".xml")
+_KINDS = {
+    "http://schemas.google.com/blogger/2008/kind#post": "article",
+    "http://schemas.google.com/blogger/2008/kind#comment": "comment",
+    "http://schemas.google.com/blogger/2008/kind#page": "page",
+}
+
+
+class _Queries:
+    """XPath queries of the fields of an entry, compiled once"""
+
+    def __init__(self):
+        etree = import_lxml_etree()
+
+        def xpath(path):
+            return etree.XPath(path, namespaces=_NAMESPACES, smart_strings=False)
+
+        self.kind = xpath(f"string(atom:category[@scheme='{_KIND_SCHEME}']/@term)")
+        self.alternate = xpath("string(atom:link[@rel='alternate']/@href)")
+        self.id = xpath("atom:id")
+        self.title = xpath("atom:title")
+        self.content = xpath("atom:content")
+        self.published = xpath("atom:published")
+        self.author = xpath("atom:author/atom:name")
+        self.tags = xpath(f"atom:category[@scheme='{_TAG_SCHEME}']/@term")
+        self.draft = xpath("app:control/app:draft")
+
+
+@cache
+def _queries() -> _Queries:
+    return _Queries()
+
+
+def _first_string(elements: list) -> str | None:
+    return element_string(elements[0]) if elements else None
 
 
 class BloggerReader(BlogReader[BloggerSettings]):
+    @property
+    def read_jobs(self) -> int:
+        jobs = self.settings.read_jobs if self.settings else 1
+        return jobs or available_cpu_count()
+
+    @property
+    def import_comments(self) -> bool:
+        return self.settings.import_comments if self.settings else False
+
     def read_posts(self, path: str) -> Generator[Post]:
-        """Opens a blogger XML file, and yield Pelican fields"""
-
-        soup = soup_from_xml_file(path)
-        entries = soup.feed.find_all("entry")
-        for entry in entries:
-            raw_kind = entry.find(
-                "category", {"scheme": "http://schemas.google.com/g/2005#kind"}
-            ).get("term")
-            if raw_kind == "http://schemas.google.com/blogger/2008/kind#post":
-                kind = "article"
-            elif raw_kind == "http://schemas.google.com/blogger/2008/kind#comment":
-                kind = "comment"
-            elif raw_kind == "http://schemas.google.com/blogger/2008/kind#page":
-                kind = "page"
-            else:
-                continue
+        """
+        Opens a blogger XML file, and yield Pelican fields.
+
+        The file is parsed incrementally, each entry being freed once read.
+        Entries that aren't imported, such as settings and comments unless
+        requested, are skipped as soon as their kind is known.
+
+        With several read jobs, large files are split in shards parsed in
+        parallel, posts still being yielded in order.
+
+        Files compressed with gzip, bzip2 or xz, and Takeout zip archives,
+        are decompressed while being parsed, in this process.
+        """
+        if self.read_jobs == 1 or is_compressed(path):
+            with open_input(path, _EXPORT_SUFFIXES) as f:
+                yield from self._read_entries(f)
+            return
+
+        for posts in map_shards(
+            path, "entry", partial(_read_shard, self.settings), self.read_jobs
+        ):
+            yield from posts
+
+    def _read_entries(self, xml) -> Generator[Post]:
+        queries = _queries()
+        kinds = _KINDS
+        if not self.import_comments:
+            kinds = {term: kind for term, kind in kinds.items() if kind != "comment"}
 
-            try:
-                assert kind != "comment"
-                filename = entry.find("link", {"rel": "alternate"})["href"]
-                filename = os.path.splitext(os.path.basename(filename))[0]
-            except (AssertionError, TypeError, KeyError):
-                filename = entry.find("id").string.split(".")[-1]
+        for entry in iter_elements(xml, f"{{{_NAMESPACES['atom']}}}entry"):
+            kind = kinds.get(queries.kind(entry))
+            if kind is not None:
+                yield self._read_entry(entry, kind, queries)
 
-            title = entry.find("title").string or ""
+    def _read_entry(self, entry, kind: str, queries: _Queries) -> Post:
+        filename = queries.alternate(entry) if kind != "comment" else ""
+        if filename:
+            filename = os.path.splitext(os.path.basename(filename))[0]
+        else:
+            filename = (_first_string(queries.id(entry)) or "").split(".")[-1]
 
-            content = entry.find("content").string
-            raw_date = entry.find("published").string
+        title = _first_string(queries.title(entry)) or ""
+
+        content = _first_string(queries.content(entry)) or ""
+        raw_date = _first_string(queries.published(entry))
+        date = None
+        if raw_date is not None:
             if hasattr(SafeDatetime, "fromisoformat"):
                 date_object = SafeDatetime.fromisoformat(raw_date)
             else:
@@ -46,33 +125,33 @@ class BloggerReader(BlogReader[BloggerSettings]):
                     raw_date[:23], "%Y-%m-%dT%H:%M:%S.%f"
                 )
             date = date_object.strftime("%Y-%m-%d %H:%M")
-            author = entry.find("author").find("name").string
+        author = _first_string(queries.author(entry))
 
-            # blogger posts only have tags, no category
-            tags = [
-                tag.get("term")
-                for tag in entry.find_all(
-                    "category", {"scheme": "http://www.blogger.com/atom/ns#"}
-                )
-            ]
-
-            # Drafts have <app:control><app:draft>yes</app:draft></app:control>
-            status = "published"
-            try:
-                if entry.find("control").find("draft").string == "yes":
-                    status = "draft"
-            except AttributeError:
-                pass
-
-            yield Post(
-                title,
-                content,
-                filename,
-                date,
-                author,
-                None,
-                tags,
-                status,
-                kind,
-                "html",
-            )
+        # blogger posts only have tags, no category
+        tags = queries.tags(entry)
+
+        # Drafts have <app:control><app:draft>yes</app:draft></app:control>
+        status = "published"
+        if _first_string(queries.draft(entry)) == "yes":
+            status = "draft"
+
+        return Post(
+            title,
+            content,
+            filename,
+            date,
+            author,
+            None,
+            tags,
+            status,
+            kind,
+            "html",
+        )
+
+
+def _read_shard(settings: BloggerSettings | None, shard) -> list[Post]:
+    """Read the posts of a shard of a Blogger XML file, in a worker process"""
+    reader = BloggerReader()
+    if settings is not None:
+        reader.use_settings(settings)
+    return list(reader._read_entries(shard))
@@ -1,7 +1,15 @@
+import csv
+import functools
+import itertools
 import logging
-from collections.abc import Generator, Mapping
+import re
+import sys
+from collections import defaultdict
+from collections.abc import Generator, Iterable, Mapping
 from dataclasses import dataclass
+from operator import itemgetter
 from typing import cast
+from urllib.parse import urlsplit
 
 import pelican.utils
 import phpserialize
@@ -10,48 +18,191 @@ from pelican.settings import DEFAULT_CONFIG
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import DotclearSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.helpers.input_files import open_input
 from blog2pelican.helpers.pelican_format import pelican_format_datetime
 
 logger = logging.getLogger(__name__)
 
 subs = DEFAULT_CONFIG["SLUG_REGEX_SUBSTITUTIONS"]
 
+# Files of backups, in a zip archive
+_BACKUP_SUFFIXES = (".txt",)
+
+# Post contents are stored in a single field, that can be several MB long
+csv.field_size_limit(2**31 - 1)
+
+
+class DotclearDialect(csv.Dialect):
+    """
+    Records of Dotclear backups: quoted fields, where backslashes and quotes
+    are escaped with a backslash. Newlines are escaped as \\n, and decoded
+    beforehand by _read_records().
+    """
+
+    delimiter = ","
+    quotechar = '"'
+    escapechar = "\\"
+    doublequote = False
+    skipinitialspace = False
+    lineterminator = "\n"
+    quoting = csv.QUOTE_ALL
+    strict = False
+
+
+def _decode_newlines(line: str) -> str:
+    """Decode the escaped newlines of a record, leaving other escapes to csv"""
+    # Escaped backslashes are split apart first, so the "n" following one
+    # isn't mistaken for an escaped newline
+    return "\\\\".join([part.replace("\\n", "\n") for part in line.split("\\\\")])
+
+
+_PHP_STRING_RE = re.compile(rb's:(\d+):"')
+_PHP_ARRAY_RE = re.compile(rb"a:(\d+):\{")
+
+
+def _php_string(data: bytes, pos: int) -> tuple[bytes, int]:
+    """Read a PHP-serialized string at pos, return it and the position after"""
+    match = _PHP_STRING_RE.match(data, pos)
+    if match is None:
+        raise ValueError(f"string expected at {pos}")
+    start = match.end()
+    end = start + int(match[1])
+    if data[end : end + 2] != b'";':
+        raise ValueError(f"string at {pos} isn't terminated")
+    return data[start:end], end + 2
+
+
+def _php_array(data: bytes, pos: int) -> tuple[int, int]:
+    """Read the header of a PHP-serialized array, return its size and content"""
+    match = _PHP_ARRAY_RE.match(data, pos)
+    if match is None:
+        raise ValueError(f"array expected at {pos}")
+    return int(match[1]), match.end()
+
+
+def _php_skip(data: bytes, pos: int) -> int:
+    """Skip a PHP-serialized value, return the position after it"""
+    kind = data[pos : pos + 1]
+    if kind == b"s":
+        return _php_string(data, pos)[1]
+    if kind in (b"i", b"d", b"b", b"N"):
+        end = data.find(b";", pos)
+        if end == -1:
+            raise ValueError(f"value at {pos} isn't terminated")
+        return end + 1
+    if kind == b"a":
+        size, pos = _php_array(data, pos)
+        for _ in range(2 * size):
+            pos = _php_skip(data, pos)
+        if data[pos : pos + 1] != b"}":
+            raise ValueError(f"array isn't terminated at {pos}")
+        return pos + 1
+    raise ValueError(f"unsupported value at {pos}")
+
+
+def _parse_meta_tags(data: bytes) -> list[bytes] | None:
+    """
+    Extract the tag array of a PHP-serialized post_meta, without decoding
+    its other entries. Raise ValueError on anything unexpected.
+    """
+    size, pos = _php_array(data, 0)
+    for _ in range(size):
+        if data[pos : pos + 1] == b"s":
+            key, pos = _php_string(data, pos)
+        else:
+            key, pos = None, _php_skip(data, pos)
+        if key != b"tag":
+            pos = _php_skip(data, pos)
+            continue
+
+        tags = []
+        count, pos = _php_array(data, pos)
+        for _ in range(count):
+            pos = _php_skip(data, pos)
+            tag, pos = _php_string(data, pos)
+            tags.append(tag)
+        return tags
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_tags(post_meta: str) -> tuple[str, ...] | None:
+    """
+    Tags of a post_meta, or None if it has none. Posts often share the same
+    metadata, so results are cached, and tags interned.
+    """
+    data = post_meta.encode("utf-8")
+    try:
+        tags = _parse_meta_tags(data)
+    except ValueError:
+        # Let phpserialize handle what the fast parser doesn't
+        tags_dict = phpserialize.loads(data)
+        if not tags_dict or b"tag" not in tags_dict:
+            return None
+        tags = tags_dict[b"tag"].values()
+
+    if tags is None:
+        return None
+    return tuple(sys.intern(tag.decode("utf-8")) for tag in tags)
+
 
 @dataclass
 class DotclearPost:
-    # post_id: str
-    # blog_id: str
     user_id: str
     cat_ids: str
     post_dt: str
-    # post_tz: str
     post_creadt: str
-    # post_upddt: str
-    # post_password: str
-    # post_type: str
     post_format: str
-    # post_url: str
-    # post_lang: str
     post_title: str
     post_excerpt: str
     post_excerpt_xhtml: str
     post_content: str
     post_content_xhtml: str
-    # post_notes: str
-    # post_words: str
     post_meta: str
-    # post_status: str
-    # post_selected: str
-    # post_open_comment: str
-    # post_position: str
-    # post_open_comment: str
-    # post_open_tb: str
-    # nb_comment: str
-    # nb_trackback: str
-    # post_position: str
+
+
+# Column of the [post section read into each DotclearPost field
+_POST_COLUMNS = (
+    "user_id",
+    "cat_id",
+    "post_dt",
+    "post_creadt",
+    "post_format",
+    "post_title",
+    "post_excerpt",
+    "post_excerpt_xhtml",
+    "post_content",
+    "post_content_xhtml",
+    "post_meta",
+)
+
+
+@dataclass
+class DotclearSection:
+    """Location of a section (e.g. [post ...]) of a Dotclear backup file"""
+
+    columns: list[str]
+    # Byte offset of the first record, followed by count records, one per line
+    offset: int
+    count: int = 0
 
 
 class DotclearReader(BlogReader[DotclearSettings]):
+    def __init__(self):
+        super().__init__()
+        # Filename of each post, by post id
+        self._filenames: dict[str, str] = {}
+        # URL of each media, by media id
+        self._media: dict[str, str] = {}
+        # (media id, post id) of each media attached to a post
+        self._post_media: list[tuple[str, str]] = []
+        # Root-relative links to media, made absolute so they can be rewritten
+        self._media_links: tuple[re.Pattern, str] | None = None
+
+    @property
+    def dc_media(self) -> bool:
+        return self.settings.dc_media if self.settings else False
+
     def _get_tags(self, post_meta, post_title=None):
         """
         Get tags related to a post
@@ -60,99 +211,126 @@ class DotclearReader(BlogReader[DotclearSettings]):
         # This will make it easier to find them afterwards.
         tags = ["Unclassified"]
 
-        # First, unescape characters that were escaped to store the data in
-        # the backup file in CSV-like format
-        post_meta = post_meta.replace("\\", "")
         if not post_meta:
             logger.debug("post has no metadata: '%s'", post_title)
             return tags
 
-        tags_dict = phpserialize.loads(post_meta.encode("utf-8"))
-
-        if not tags_dict:
-            logger.debug("post has really no tags: '%s'", post_title)
-            return tags
-
-        if b"tag" not in tags_dict:
+        post_tags = _decode_tags(post_meta)
+        if post_tags is None:
             logger.debug("post has no tags: '%s'", post_title)
             return tags
 
-        tags = [tag.decode("utf-8") for tag in tags_dict[b"tag"].values()]
-        return tags
-
-    def _parse_sections(self, file: str):
-        in_cat = False
-        in_post = False
-        category_list = {}
-        posts = []
+        return list(post_tags)
 
-        with open(file, encoding="utf-8") as f:
+    def _index_sections(self, path: str) -> dict[str, DotclearSection]:
+        """
+        Scan a Dotclear backup file for its sections, without decoding their
+        records. The first section of each name is kept.
+        """
+        sections: dict[str, DotclearSection] = {}
+        section = None
+        offset = 0
+        with open_input(path, _BACKUP_SUFFIXES) as f:
             for line in f:
-                # remove final \n
-                line = line[:-1]
-
-                if line.startswith("[category"):
-                    in_cat = True
-                elif line.startswith("[post"):
-                    in_post = True
-                elif in_cat:
-                    fields = line.strip('"').split('","')
-                    if not line:
-                        in_cat = False
+                offset += len(line)
+                if section is not None:
+                    if line.rstrip(b"\r\n"):
+                        section.count += 1
                     else:
-                        category_list[fields[0]] = fields[2]
-                elif in_post:
-                    if not line:
-                        in_post = False
-                        break
-                    else:
-                        posts.append(line)
-
-        return category_list, posts
-
-    def _parse_raw_post(self, raw_post) -> DotclearPost:
-        fields = raw_post.strip('"').split('","')
-        dc_post = DotclearPost(
-            # post_id = fields[0][1:],
-            # blog_id = fields[1],
-            user_id=fields[2],
-            cat_ids=fields[3],
-            # post_dt
-            post_dt=pelican_format_datetime(fields[4]),
-            # post_tz = fields[5],
-            post_creadt=pelican_format_datetime(fields[6]),
-            # post_upddt = pelican_format_datetime(fields[7]),
-            # post_password = fields[8],
-            # post_type = fields[9],
-            post_format=fields[10],
-            # post_url = fields[11],
-            # post_lang = fields[12],
-            post_title=fields[13],
-            post_excerpt=fields[14],
-            post_excerpt_xhtml=fields[15],
-            post_content=fields[16],
-            post_content_xhtml=fields[17],
-            # post_notes = fields[18],
-            # post_words = fields[19],
-            post_meta=fields[20],
-            # post_status = fields[20],
-            # post_selected = fields[21],
-            # post_position = fields[22],
-            # post_open_comment = fields[23],
-            # post_open_tb = fields[24],
-            # nb_comment = fields[25],
-            # nb_trackback = fields[26],
-            # redirect_url = fields[28][:-1],
+                        section = None
+                elif line.startswith(b"["):
+                    header = line.rstrip(b"\r\n").decode("utf-8")
+                    name, _, columns = header[1:].removesuffix("]").partition(" ")
+                    section = DotclearSection(columns.split(","), offset)
+                    sections.setdefault(name, section)
+        return sections
+
+    def _read_section(
+        self, path: str, section: DotclearSection | None
+    ) -> Generator[str]:
+        """Seek to a section of a Dotclear backup file, and yield its records"""
+        if section is None:
+            return
+
+        with open_input(path, _BACKUP_SUFFIXES) as f:
+            f.seek(section.offset)
+            for line in itertools.islice(f, section.count):
+                yield line.rstrip(b"\r\n").decode("utf-8")
+
+    def _read_records(
+        self, path: str, section: DotclearSection | None
+    ) -> Iterable[list[str]]:
+        """Yield the fields of each record of a section, unescaped"""
+        lines = map(_decode_newlines, self._read_section(path, section))
+        return csv.reader(lines, DotclearDialect)
+
+    def _parse_categories(
+        self, path: str, section: DotclearSection | None
+    ) -> dict[str, str]:
+        if section is None:
+            return {}
+
+        category_fields = itemgetter(
+            section.columns.index("cat_id"), section.columns.index("cat_title")
+        )
+        return dict(
+            category_fields(record) for record in self._read_records(path, section)
         )
 
-        return dc_post
+    def _parse_media(self, path: str, sections: Mapping[str, DotclearSection]):
+        """Index the media of the blog, and the posts they are attached to"""
+        assert self.settings is not None and self.settings.dc_public_url
+        public_url = self.settings.dc_public_url.rstrip("/") + "/"
 
-    def _adapt_escaped_content(self, content: str) -> str:
-        # Unescape backquoted characters
-        result = content
-        result = result.replace("\\n", "\n")
-        result = result.replace("\\", "")
-        return result
+        section = sections.get("media")
+        if section is not None:
+            media_fields = itemgetter(
+                section.columns.index("media_id"), section.columns.index("media_file")
+            )
+            for record in self._read_records(path, section):
+                media_id, media_file = media_fields(record)
+                self._media[media_id] = public_url + media_file.lstrip("/")
+
+        section = sections.get("post_media")
+        if section is not None:
+            post_media_fields = itemgetter(
+                section.columns.index("media_id"), section.columns.index("post_id")
+            )
+            self._post_media = [
+                post_media_fields(record)
+                for record in self._read_records(path, section)
+            ]
+
+        public_path = urlsplit(public_url).path
+        if public_url != public_path:
+            regex = re.compile(r"((?:src|href)=[\"'])" + re.escape(public_path))
+            self._media_links = (regex, public_url)
+
+    def attached_files(self) -> dict[str | None, set[str]] | None:
+        if not self.dc_media:
+            return None
+
+        attached = defaultdict(set)
+        orphans = set(self._media)
+        for media_id, post_id in self._post_media:
+            url = self._media.get(media_id)
+            if url is None:
+                continue
+            # Media of posts that weren't read are orphans
+            filename = self._filenames.get(post_id)
+            attached[filename].add(url)
+            orphans.discard(media_id)
+
+        for media_id in orphans:
+            attached[None].add(self._media[media_id])
+        return attached
+
+    def _parse_raw_post(self, record: list[str], post_fields) -> DotclearPost:
+        """Build a post from a record, post_fields getting its _POST_COLUMNS"""
+        dc_post = DotclearPost(*post_fields(record))
+        dc_post.post_dt = pelican_format_datetime(dc_post.post_dt)
+        dc_post.post_creadt = pelican_format_datetime(dc_post.post_creadt)
+        return dc_post
 
     def _adapt_categories(
         self,
@@ -176,10 +354,13 @@ class DotclearReader(BlogReader[DotclearSettings]):
             result = dc_post.post_excerpt + dc_post.post_content
         else:
             result = dc_post.post_excerpt_xhtml + dc_post.post_content_xhtml
-            result = self._adapt_escaped_content(result)
 
             dc_post.post_format = "html"
 
+        if self._media_links is not None:
+            regex, public_url = self._media_links
+            result = regex.sub(lambda m: m[1] + public_url, result)
+
         return result
 
     def _adapt_post(
@@ -209,12 +390,34 @@ class DotclearReader(BlogReader[DotclearSettings]):
         )
 
     def read_posts(self, path: str) -> Generator[Post]:
-        """Parse a Dotclear export file, and yield posts"""
-        categories_dict, raw_posts = self._parse_sections(path)
+        """
+        Parse a Dotclear export file, and yield posts.
+
+        Posts are read one at a time, once the sections of the file have been
+        indexed. Media are indexed beforehand, as their sections come after
+        the posts.
+
+        Compressed files are decompressed on the fly. Seeking to a section
+        decompresses the file up to it again, so they are read a few times.
+        """
+        self._filenames = {}
+        self._media = {}
+        self._post_media = []
+        self._media_links = None
+        sections = self._index_sections(path)
+        categories_dict = self._parse_categories(path, sections.get("category"))
+        if self.dc_media:
+            self._parse_media(path, sections)
+        post_section = sections.get("post")
 
-        print(f"{len(raw_posts)} posts read.")
+        print(f"{post_section.count if post_section else 0} posts read.")
+        if post_section is None:
+            return
 
-        for raw_post in raw_posts:
-            dc_post = self._parse_raw_post(raw_post)
+        post_fields = itemgetter(*map(post_section.columns.index, _POST_COLUMNS))
+        post_id_index = post_section.columns.index("post_id")
+        for record in self._read_records(path, post_section):
+            dc_post = self._parse_raw_post(record, post_fields)
             post = self._adapt_post(dc_post, categories_dict)
+            self._filenames[record[post_id_index]] = post.filename
             yield post
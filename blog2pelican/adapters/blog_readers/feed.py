@@ -1,3 +1,4 @@
+import os
 import time
 from collections.abc import Generator
 from typing import cast
@@ -8,14 +9,22 @@ from pelican.utils import slugify
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import FeedSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.helpers.input_files import is_compressed, open_input
 
 
 class FeedReader(BlogReader[FeedSettings]):
     def read_posts(self, file) -> Generator[Post]:
-        """Read a feed and yield pelican fields"""
+        """
+        Read a feed and yield pelican fields. file is an URL or the path of
+        a file, possibly compressed.
+        """
         import feedparser  # noqa: PLC0415
 
-        d = feedparser.parse(file)
+        if os.path.isfile(file) and is_compressed(file):
+            with open_input(file, (".xml", ".rss", ".atom")) as f:
+                d = feedparser.parse(f)
+        else:
+            d = feedparser.parse(file)
         subs = DEFAULT_CONFIG["SLUG_REGEX_SUBSTITUTIONS"]
         for entry in d.entries:
             date = (
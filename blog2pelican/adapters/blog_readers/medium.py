@@ -1,16 +1,44 @@
+import concurrent.futures
+import contextlib
 import os
 import re
+import zipfile
+from collections import deque
 from collections.abc import Generator
+from functools import partial
 
 import dateutil.parser
 
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import MediumSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.helpers.cpu import available_cpu_count
+from blog2pelican.helpers.input_files import archive_members, input_format
+from blog2pelican.helpers.iterables import batched
 from blog2pelican.helpers.soup import import_bs4, soup_from_xml_file
 
+# Number of files parsed by a worker process at once
+_FILES_PER_TASK = 16
+
+# Tags unwrapped from post contents, and attributes removed from all tags.
+# section and div cause problems, footer also can cause problems, and has
+# nothing we want to keep.
+# See https://stackoverflow.com/a/8439761
+# See https://stackoverflow.com/a/9045719
+_INVALID_TAGS = frozenset(["section", "div", "footer"])
+_INVALID_ATTRIBUTES = ("name", "id", "class")
+
 
 class MediumReader(BlogReader[MediumSettings]):
+    @property
+    def read_jobs(self) -> int:
+        jobs = self.settings.read_jobs if self.settings else 1
+        return jobs or available_cpu_count()
+
+    @property
+    def html_parser(self) -> str:
+        return self.settings.html_parser if self.settings else "html.parser"
+
     def strip_medium_post_content(self, soup) -> str:
         """Strip some tags and attributes from medium post content.
 
@@ -34,35 +62,40 @@ class MediumReader(BlogReader[MediumSettings]):
         Also, the "id" and "name" attributes in tags cause similar problems.  They show
         up in .rst as extra junk that separates transitions.
         """
-        # Remove tags
-        # section and div cause problems
-        # footer also can cause problems, and has nothing we want to keep
-        # See https://stackoverflow.com/a/8439761
-        invalid_tags = ["section", "div", "footer"]
-        for tag in invalid_tags:
-            for match in soup.find_all(tag):
-                match.unwrap()
-
-        # Remove attributes
-        # See https://stackoverflow.com/a/9045719
-        invalid_attributes = ["name", "id", "class"]
-        bs4 = import_bs4()
-        for tag in soup.descendants:
-            if isinstance(tag, bs4.element.Tag):
-                tag.attrs = {
-                    key: value
-                    for key, value in tag.attrs.items()
-                    if key not in invalid_attributes
-                }
+        # Remove tags and attributes in a single walk of the tree. Tags can be
+        # unwrapped while walking it, descendants already knowing the element
+        # that follows the current one. Attributes are filtered in place,
+        # and only for the tags that have some to remove.
+        tag_class = import_bs4().element.Tag
+        for element in soup.descendants:
+            if not isinstance(element, tag_class):
+                continue
+
+            if element.name in _INVALID_TAGS:
+                element.unwrap()
+                continue
+
+            attrs = element.attrs
+            if not attrs.keys().isdisjoint(_INVALID_ATTRIBUTES):
+                for key in _INVALID_ATTRIBUTES:
+                    attrs.pop(key, None)
 
         # Get the string of all content, keeping other tags
-        all_content = "".join(str(element) for element in soup.contents)
-        return all_content
+        return soup.decode_contents()
 
-    def _medium2fields(self, filepath: str) -> Post:
-        """Take an HTML post from a medium export, return Pelican posts."""
+    def _medium2fields(
+        self, filepath: str, archive: zipfile.ZipFile | None = None
+    ) -> Post:
+        """
+        Take an HTML post from a medium export, return Pelican posts.
+        filepath is the name of the post in archive, if any.
+        """
 
-        soup = soup_from_xml_file(filepath, "html.parser")
+        if archive is None:
+            soup = soup_from_xml_file(filepath, self.html_parser)
+        else:
+            with archive.open(filepath) as infile:
+                soup = soup_from_xml_file(infile, self.html_parser)
         if not soup:
             raise ValueError(f"{filepath} could not be parsed by beautifulsoup")
         kind = "article"
@@ -127,11 +160,87 @@ class MediumReader(BlogReader[MediumSettings]):
         slug = re.sub(r"((-)+([0-9a-f]+|DRAFT))+$", "", slug)
         return slug
 
+    def list_posts(self, path: str) -> list[str]:
+        """Paths of the HTML posts of a medium export directory, sorted"""
+        with os.scandir(path) as entries:
+            return sorted(
+                entry.path
+                for entry in entries
+                if entry.name.endswith(".html")
+                and not entry.name.startswith(".")
+                and entry.is_file()
+            )
+
+    def list_archived_posts(self, archive: zipfile.ZipFile) -> list[str]:
+        """Names of the HTML posts of a medium export archive, sorted"""
+        return sorted(
+            name
+            for name in archive_members(archive, (".html",))
+            if os.path.basename(os.path.dirname(name)) == "posts"
+        )
+
     def read_posts(self, path: str) -> Generator[Post]:
         """
         Take HTML posts in a medium export directory, and yield Pelican fields.
-        path: path to the medium export dir, or file to parse.
+        path: path to the medium export dir or zip archive, or file to parse.
+
+        Posts are yielded in file name order. With several read jobs, they
+        are parsed in a pool of processes. Posts of archives are decompressed
+        on the fly, without being extracted.
         """
-        for file in os.listdir(path):
-            filename = os.fsdecode(file)
-            yield self._medium2fields(os.path.join(path, filename))
+        archive_path = None
+        if input_format(path) == "zip":
+            archive_path = path
+            with zipfile.ZipFile(path) as archive:
+                filepaths = self.list_archived_posts(archive)
+        elif os.path.isdir(path):
+            filepaths = self.list_posts(path)
+        else:
+            yield self._medium2fields(path)
+            return
+
+        if self.read_jobs > 1:
+            yield from self._read_in_pool(filepaths, archive_path)
+            return
+
+        with (
+            zipfile.ZipFile(archive_path) if archive_path else contextlib.nullcontext()
+        ) as archive:
+            for filepath in filepaths:
+                yield self._medium2fields(filepath, archive)
+
+    def _read_in_pool(
+        self, filepaths: list[str], archive_path: str | None = None
+    ) -> Generator[Post]:
+        jobs = self.read_jobs
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Bound the number of parsed posts waiting to be consumed
+            pending: deque[concurrent.futures.Future] = deque()
+            read = partial(_read_posts, self.settings, archive_path=archive_path)
+            try:
+                for batch in batched(filepaths, _FILES_PER_TASK):
+                    pending.append(executor.submit(read, batch))
+                    if len(pending) >= 2 * jobs:
+                        yield from pending.popleft().result()
+
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+def _read_posts(
+    settings: MediumSettings | None,
+    filepaths: list[str],
+    archive_path: str | None = None,
+) -> list[Post]:
+    """Read medium posts, from the archive at archive_path if any, in a worker"""
+    reader = MediumReader()
+    if settings is not None:
+        reader.use_settings(settings)
+    if archive_path is None:
+        return [reader._medium2fields(filepath) for filepath in filepaths]
+
+    with zipfile.ZipFile(archive_path) as archive:
+        return [reader._medium2fields(filepath, archive) for filepath in filepaths]
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from collections.abc import AsyncGenerator
+
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings import Settings
+from blog2pelican.domain.ports.blog_reader import AsyncBlogReader, BlogReader
+
+_END = object()
+
+
+class ThreadedAsyncBlogReader(AsyncBlogReader[Settings]):
+    """
+    Run a blog reader in a thread, so that reading posts (often network or
+    disk bound) overlaps with what the event loop does with them.
+    """
+
+    def __init__(self, reader: BlogReader, read_ahead=16):
+        super().__init__()
+        self.reader = reader
+        self.read_ahead = read_ahead
+
+    def use_settings(self, settings: Settings):
+        super().use_settings(settings)
+        self.reader.use_settings(settings)
+
+    def attached_files(self) -> dict[str | None, set[str]] | None:
+        return self.reader.attached_files()
+
+    async def read_posts(self, path: str) -> AsyncGenerator[Post]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.read_ahead)
+        stop = threading.Event()
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce():
+            try:
+                for post in self.reader.read_posts(path):
+                    if stop.is_set():
+                        return
+                    put(post)
+            except BaseException as e:  # noqa: BLE001
+                put(e)
+            else:
+                put(_END)
+
+        producer = asyncio.create_task(asyncio.to_thread(produce))
+        try:
+            while (item := await queue.get()) is not _END:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Unblock the producer if the consumer stopped early
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
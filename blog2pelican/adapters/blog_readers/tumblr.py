@@ -1,8 +1,13 @@
 import datetime
+import http.client
 import json
-import urllib.request as urllib_request
-from collections.abc import Generator
+import logging
+import queue
+import threading
+import time
+from collections.abc import Generator, Iterator
 from typing import cast
+from urllib.parse import urlencode, urlsplit
 
 from pelican.settings import DEFAULT_CONFIG
 from pelican.utils import SafeDatetime, slugify
@@ -10,6 +15,178 @@ from pelican.utils import SafeDatetime, slugify
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import TumblrSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.helpers.downloader import HostPool
+
+logger = logging.getLogger(__name__)
+
+API_BASE = "https://api.tumblr.com/v2"
+# Maximum number of posts the API returns at once
+_PAGE_SIZE = 20
+# Status codes worth retrying, the API may answer later
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Rate limits of the API, whose remaining requests and reset delay (in
+# seconds) are given by the X-Ratelimit-<window>-Remaining/Reset headers
+_RATE_LIMIT_WINDOWS = ("Perhour", "Perday")
+_END = object()
+
+
+class TumblrAPIError(Exception):
+    pass
+
+
+class TumblrClient:
+    """
+    Client of the Tumblr API, keeping its connection alive between requests.
+
+    Requests failing on a network error or on a server error are retried
+    with an exponential backoff. Rate limited requests are retried once the
+    limit is reset, and requests wait for the reset of exhausted limits.
+    """
+
+    def __init__(
+        self,
+        api_base: str = API_BASE,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 1,
+    ):
+        parts = urlsplit(api_base)
+        self.api_base = api_base
+        self.retries = retries
+        self.backoff = backoff
+        self._path = parts.path.rstrip("/")
+        self._pool = HostPool(parts.scheme, parts.netloc, 1, timeout)
+        # time.monotonic() when the exhausted rate limits are reset
+        self._resume = 0.0
+
+    def close(self):
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, endpoint: str, **params) -> dict:
+        """Send a GET request to endpoint, return the response of the API"""
+        target = f"{self._path}/{endpoint}?{urlencode(params)}"
+        url = f"{self.api_base.rstrip('/')}/{endpoint}"
+        attempt = 0
+        while True:
+            delay = self._resume - time.monotonic()
+            if delay > 0:
+                logger.warning("Tumblr API rate limit reached, waiting %.0fs", delay)
+                time.sleep(delay)
+
+            try:
+                status, headers, body = self._request(target)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.retries:
+                    raise TumblrAPIError(f"{url}: {e}") from e
+                _retry_later(url, self.backoff * 2**attempt, e)
+                attempt += 1
+                continue
+
+            self._update_rate_limits(headers)
+            if status == 200:
+                try:
+                    return json.loads(body)["response"]
+                except (ValueError, KeyError) as e:
+                    raise TumblrAPIError(f"{url}: invalid response") from e
+            if status not in _RETRY_STATUSES or attempt == self.retries:
+                raise TumblrAPIError(f"{url}: HTTP error {status}")
+
+            retry_after = _seconds(headers.get("Retry-After"))
+            if retry_after is None:
+                retry_after = self.backoff * 2**attempt
+            _retry_later(url, retry_after, f"HTTP error {status}")
+            attempt += 1
+
+    def _update_rate_limits(self, headers: http.client.HTTPMessage):
+        for window in _RATE_LIMIT_WINDOWS:
+            remaining = headers.get(f"X-Ratelimit-{window}-Remaining")
+            reset = _seconds(headers.get(f"X-Ratelimit-{window}-Reset"))
+            if remaining == "0" and reset is not None:
+                self._resume = max(self._resume, time.monotonic() + reset)
+
+    def _request(self, target: str) -> tuple[int, http.client.HTTPMessage, bytes]:
+        headers = {"User-Agent": "blog2pelican", "Accept": "application/json"}
+        connection, reused = self._pool.acquire()
+        while True:
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if not reused:
+                    raise
+                # The server may have closed the idle connection
+                connection, reused = self._pool.connect(), False
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._pool.release(connection)
+        return response.status, response.headers, body
+
+
+def _retry_later(url: str, delay: float, reason):
+    logger.debug("Retrying %s in %.1fs: %s", url, delay, reason)
+    time.sleep(delay)
+
+
+def _seconds(value: str | None) -> float | None:
+    try:
+        return max(float(value), 0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _prefetch(pages: Iterator[list], depth: int) -> Generator[list]:
+    """
+    Yield pages, while up to depth following ones are fetched
+    by a thread. Without depth, pages are fetched when needed.
+    """
+    if depth < 1:
+        yield from pages
+        return
+
+    fetched: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                fetched.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+        except BaseException as e:  # noqa: BLE001
+            put(e)
+        else:
+            put(_END)
+
+    producer = threading.Thread(target=produce, name="tumblr-pages", daemon=True)
+    producer.start()
+    try:
+        while (item := fetched.get()) is not _END:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stop.set()
+        producer.join()
 
 
 class TumblrReader(BlogReader[TumblrSettings]):
@@ -19,124 +196,173 @@ class TumblrReader(BlogReader[TumblrSettings]):
             self.settings.blogname if self.settings and self.settings.blogname else ""
         )
 
-    def _get_tumblr_posts(self, api_key, offset=0):
-        url = (
-            f"https://api.tumblr.com/v2/blog/{self.blogname}.tumblr.com/"
-            f"posts?api_key={api_key}&offset={offset}&filter=raw"
-        )
-        request = urllib_request.Request(url)
-        handle = urllib_request.urlopen(request)
-        posts = json.loads(handle.read().decode("utf-8"))
-        return posts.get("response").get("posts")
+    @property
+    def api_base(self) -> str:
+        return self.settings.api_base if self.settings else API_BASE
+
+    @property
+    def prefetch_pages(self) -> int:
+        return self.settings.prefetch_pages if self.settings else 2
+
+    def _get_tumblr_posts(
+        self, client: TumblrClient, api_key, before: int | None = None
+    ) -> list[dict]:
+        params = {"api_key": api_key, "limit": _PAGE_SIZE, "filter": "raw"}
+        if before is not None:
+            params["before"] = before
+        response = client.get(f"blog/{self.blogname}.tumblr.com/posts", **params)
+        return response["posts"]
+
+    def _get_pages(self, client: TumblrClient, api_key) -> Generator[list[dict]]:
+        """
+        Yield the posts of the blog by pages, from the most recent ones.
+
+        Pages are requested with the timestamp of the oldest post read as
+        cursor, which stays fast on deep blogs unlike offsets. The cursor
+        includes its second, as several posts can be published during the
+        same one: posts already read are skipped.
+        """
+        before = None
+        # Ids of the posts read that were published during the oldest second
+        seen: set = set()
+        while True:
+            posts = self._get_tumblr_posts(client, api_key, before)
+            new_posts = [post for post in posts if post["id"] not in seen]
+            if new_posts:
+                yield new_posts
+            if len(posts) < _PAGE_SIZE:
+                return
+
+            oldest = posts[-1]["timestamp"]
+            if not new_posts:
+                # A whole page of posts published during the same second
+                logger.warning(
+                    "Some posts published at %s may be missing, there are "
+                    "more than %d of them",
+                    oldest,
+                    _PAGE_SIZE,
+                )
+                before, seen = oldest, set()
+                continue
+
+            if before != oldest + 1:
+                seen = set()
+            seen.update(post["id"] for post in posts if post["timestamp"] == oldest)
+            before = oldest + 1
 
     def read_posts(self, api_key) -> Generator[Post]:
-        """s Tumblr posts (API v2)"""
-        offset = 0
-        posts = self._get_tumblr_posts(api_key, offset)
+        """
+        Read Tumblr posts (API v2).
+
+        Following pages of posts are downloaded while the posts of the
+        current one are yielded.
+        """
+        with TumblrClient(self.api_base) as client:
+            pages = self._get_pages(client, api_key)
+            for posts in _prefetch(pages, self.prefetch_pages):
+                for post in posts:
+                    yield self._tumblr2fields(post)
+
+    def _tumblr2fields(self, post) -> Post:
+        """Take a post of the Tumblr API, return Pelican fields"""
         subs = DEFAULT_CONFIG["SLUG_REGEX_SUBSTITUTIONS"]
-        while len(posts) > 0:
-            for post in posts:
-                title = (
-                    post.get("title")
-                    or post.get("source_title")
-                    or post.get("type").capitalize()
-                )
-                slug = post.get("slug") or slugify(title, regex_subs=cast(list, subs))
-                tags = post.get("tags")
-                timestamp = post.get("timestamp")
-                date = SafeDatetime.fromtimestamp(
-                    int(timestamp), tz=datetime.timezone.utc
-                ).strftime("%Y-%m-%d %H:%M:%S%z")
-                slug = (
-                    SafeDatetime.fromtimestamp(
-                        int(timestamp), tz=datetime.timezone.utc
-                    ).strftime("%Y-%m-%d-")
-                    + slug
-                )
-                post_format = post.get("format")
-                content = post.get("body")
-                post_type = post.get("type")
-                if post_type == "photo":
-                    if post_format == "markdown":
-                        fmtstr = "![%s](%s)"
-                    else:
-                        fmtstr = '<img alt="%s" src="%s" />'
-                    content = "\n".join(
-                        fmtstr
-                        % (photo.get("caption"), photo.get("original_size").get("url"))
-                        for photo in post.get("photos")
-                    )
-                elif post_type == "quote":
-                    if post_format == "markdown":
-                        fmtstr = "\n\n&mdash; %s"
-                    else:
-                        fmtstr = "<p>&mdash; %s</p>"
-                    content = post.get("text") + fmtstr % post.get("source")
-                elif post_type == "link":
-                    if post_format == "markdown":
-                        fmtstr = "[via](%s)\n\n"
-                    else:
-                        fmtstr = '<p><a href="%s">via</a></p>\n'
-                    content = fmtstr % post.get("url") + post.get("description")
-                elif post_type == "audio":
-                    if post_format == "markdown":
-                        fmtstr = "[via](%s)\n\n"
-                    else:
-                        fmtstr = '<p><a href="%s">via</a></p>\n'
-                    content = (
-                        fmtstr % post.get("source_url")
-                        + post.get("caption")
-                        + post.get("player")
-                    )
-                elif post_type == "video":
-                    if post_format == "markdown":
-                        fmtstr = "[via](%s)\n\n"
-                    else:
-                        fmtstr = '<p><a href="%s">via</a></p>\n'
-                    source = fmtstr % post.get("source_url")
-                    caption = post.get("caption")
-                    players = [
-                        # If embed_code is False, couldn't get the video
-                        player.get("embed_code") or None
-                        for player in post.get("player")
-                    ]
-                    # If there are no embeddable players, say so, once
-                    if players and all(player is None for player in players):
-                        str_players = "<p>(This video isn't available anymore.)</p>\n"
-                    else:
-                        str_players = "\n".join([str(player) for player in players])
-                    content = source + caption + str_players
-                elif post_type == "answer":
-                    title = post.get("question")
-                    content = (
-                        "<p>"
-                        '<a href="{}" rel="external nofollow">{}</a>'
-                        ": {}"
-                        "</p>\n"
-                        " {}".format(
-                            post.get("asking_name"),
-                            post.get("asking_url"),
-                            post.get("question"),
-                            post.get("answer"),
-                        )
-                    )
-
-                content = content.rstrip() + "\n"
-                kind = "article"
-                status = "published"  # TODO: Find a way for draft posts
-
-                yield Post(
-                    title,
-                    content,
-                    slug,
-                    date,
-                    post.get("blog_name"),
-                    [post_type],
-                    tags,
-                    status,
-                    kind,
-                    post_format,
+        title = (
+            post.get("title")
+            or post.get("source_title")
+            or post.get("type").capitalize()
+        )
+        slug = post.get("slug") or slugify(title, regex_subs=cast(list, subs))
+        tags = post.get("tags")
+        timestamp = post.get("timestamp")
+        date = SafeDatetime.fromtimestamp(
+            int(timestamp), tz=datetime.timezone.utc
+        ).strftime("%Y-%m-%d %H:%M:%S%z")
+        slug = (
+            SafeDatetime.fromtimestamp(
+                int(timestamp), tz=datetime.timezone.utc
+            ).strftime("%Y-%m-%d-")
+            + slug
+        )
+        post_format = post.get("format")
+        content = post.get("body")
+        post_type = post.get("type")
+        if post_type == "photo":
+            if post_format == "markdown":
+                fmtstr = "![%s](%s)"
+            else:
+                fmtstr = '<img alt="%s" src="%s" />'
+            content = "\n".join(
+                fmtstr % (photo.get("caption"), photo.get("original_size").get("url"))
+                for photo in post.get("photos")
+            )
+        elif post_type == "quote":
+            if post_format == "markdown":
+                fmtstr = "\n\n&mdash; %s"
+            else:
+                fmtstr = "<p>&mdash; %s</p>"
+            content = post.get("text") + fmtstr % post.get("source")
+        elif post_type == "link":
+            if post_format == "markdown":
+                fmtstr = "[via](%s)\n\n"
+            else:
+                fmtstr = '<p><a href="%s">via</a></p>\n'
+            content = fmtstr % post.get("url") + post.get("description")
+        elif post_type == "audio":
+            if post_format == "markdown":
+                fmtstr = "[via](%s)\n\n"
+            else:
+                fmtstr = '<p><a href="%s">via</a></p>\n'
+            content = (
+                fmtstr % post.get("source_url")
+                + post.get("caption")
+                + post.get("player")
+            )
+        elif post_type == "video":
+            if post_format == "markdown":
+                fmtstr = "[via](%s)\n\n"
+            else:
+                fmtstr = '<p><a href="%s">via</a></p>\n'
+            source = fmtstr % post.get("source_url")
+            caption = post.get("caption")
+            players = [
+                # If embed_code is False, couldn't get the video
+                player.get("embed_code") or None
+                for player in post.get("player")
+            ]
+            # If there are no embeddable players, say so, once
+            if players and all(player is None for player in players):
+                str_players = "<p>(This video isn't available anymore.)</p>\n"
+            else:
+                str_players = "\n".join([str(player) for player in players])
+            content = source + caption + str_players
+        elif post_type == "answer":
+            title = post.get("question")
+            content = (
+                "<p>"
+                '<a href="{}" rel="external nofollow">{}</a>'
+                ": {}"
+                "</p>\n"
+                " {}".format(
+                    post.get("asking_name"),
+                    post.get("asking_url"),
+                    post.get("question"),
+                    post.get("answer"),
                 )
+            )
 
-            offset += len(posts)
-            posts = self._get_tumblr_posts(api_key, offset)
+        content = content.rstrip() + "\n"
+        kind = "article"
+        status = "published"  # TODO: Find a way for draft posts
+
+        return Post(
+            title,
+            content,
+            slug,
+            date,
+            post.get("blog_name"),
+            [post_type],
+            tags,
+            status,
+            kind,
+            post_format,
+        )
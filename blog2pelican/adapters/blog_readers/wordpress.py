@@ -1,7 +1,10 @@
 import logging
 import re
+from collections import defaultdict
 from collections.abc import Generator
+from functools import partial
 from html import unescape
+from operator import itemgetter
 
 from pelican.utils import SafeDatetime
 
@@ -9,16 +12,118 @@ from blog2pelican.app.use_cases.convert_blog import get_filename
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import WordPressSettings
 from blog2pelican.domain.ports.blog_reader import BlogReader
-from blog2pelican.helpers.soup import soup_from_xml_file
+from blog2pelican.helpers.cpu import available_cpu_count
+from blog2pelican.helpers.input_files import is_compressed, open_input
+from blog2pelican.helpers.xml_shards import map_shards
+from blog2pelican.helpers.xml_stream import (
+    element_string,
+    element_text,
+    find,
+    find_string,
+    iter_elements,
+)
 
 logger = logging.getLogger(__name__)
 
+# Regular expressions of decode_wp_content(), a port of WordPress' wpautop
+_ALLBLOCKS = (
+    "(?:table|thead|tfoot|caption|col|colgroup|tbody|tr|"
+    "td|th|div|dl|dd|dt|ul|ol|li|pre|select|option|form|"
+    "map|area|blockquote|address|math|style|p|h[1-6]|hr|"
+    "fieldset|noscript|samp|legend|section|article|aside|"
+    "hgroup|header|footer|nav|figure|figcaption|details|"
+    "menu|summary)"
+)
+_DOUBLE_BR_RE = re.compile(r"<br />\s*<br />")
+_BLOCK_START_RE = re.compile(r"(<" + _ALLBLOCKS + r"[^>]*>)")
+_BLOCK_END_RE = re.compile(r"(</" + _ALLBLOCKS + r">)")
+# The whitespace preceding <param> and </embed> is stripped by
+# _sub_eating_space(), as a leading \s* would backtrack on long runs
+_PARAM_RE = re.compile(r"<param([^>]*)>\s*")
+_EMBED_END_RE = re.compile(r"</embed>\s*")
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_EMPTY_P_RE = re.compile(r"<p>\s*</p>")
+_P_IN_BLOCK_RE = re.compile(r"<p>([^<]+)</(div|address|form)>")
+_P_AROUND_BLOCK_RE = re.compile(r"<p>\s*(</?" + _ALLBLOCKS + r"[^>]*>)\s*</p>")
+_P_AROUND_LI_RE = re.compile(r"<p>(<li.*)</p>")
+_P_BLOCKQUOTE_RE = re.compile(r"<p><blockquote([^>]*)>")
+_P_BEFORE_BLOCK_RE = re.compile(r"<p>\s*(</?" + _ALLBLOCKS + "[^>]*>)")
+_P_AFTER_BLOCK_RE = re.compile(r"(</?" + _ALLBLOCKS + r"[^>]*>)\s*</p>")
+_SCRIPT_RE = re.compile(r"/<(script|style).*?<\/\\1>/s")
+_NEWLINE_RE = re.compile(r"\n\s*")
+_BR_AFTER_BLOCK_RE = re.compile(r"(</?" + _ALLBLOCKS + r"[^>]*>)\s*<br />")
+_BR_BEFORE_BLOCK_RE = re.compile(
+    r"<br />(\s*</?(?:p|li|div|dl|dd|dt|th|pre|td|ul|ol)[^>]*>)"
+)
+# Replacement keeping only the first group, cheaper than a "\\1" template
+_group = itemgetter(1)
+_PRE_TAG_RE = re.compile(r"<pre wp-pre-tag-\d+></pre>")
+_CAPTION_RE = re.compile(
+    r"\[caption(?:.*?)(?:caption=\"(.*?)\")?\]"
+    r"((?:\<a(?:.*?)\>)?(?:\<img.*?\>)(?:\<\/a\>)?)\s?(.*?)\[\/caption\]"
+)
+
+
+def _sub_eating_space(regex: re.Pattern, template: str, content: str) -> str:
+    r"""
+    Same as regex.sub(template, content) if regex started with \s*: the
+    whitespace preceding each match is removed as well.
+    """
+    parts = []
+    pos = 0
+    for match in regex.finditer(content):
+        parts.append(content[pos : match.start()].rstrip())
+        parts.append(match.expand(template))
+        pos = match.end()
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def _newlines_to_br(content: str) -> str:
+    r"""
+    Same as re.sub(r"(?<!<br />)\s*\n", "<br />\n", content) in linear time:
+    each whitespace run is replaced up to its last newline.
+    """
+    parts = []
+    pos = 0
+    for match in _NEWLINE_RE.finditer(content):
+        start = pos + len(content[pos : match.start()].rstrip())
+        space = content[start : match.end()]
+        parts.append(content[pos:start])
+        pos = match.end()
+
+        # A run right after a <br /> is only replaced from its second character
+        skip = 1 if content.endswith("<br />", 0, start) else 0
+        end = space.rfind("\n") + 1
+        if end <= skip:
+            parts.append(space)
+        else:
+            parts.append(space[:skip] + "<br />\n" + space[end:])
+    parts.append(content[pos:])
+    return "".join(parts)
+
 
 class WordPressReader(BlogReader[WordPressSettings]):
+    def __init__(self):
+        super().__init__()
+        # Filename of each post, by post id
+        self._filenames: dict[str, str] = {}
+        # (parent post id, url) of each attachment
+        self._attachments: list[tuple[str, str]] = []
+
     @property
     def custpost(self) -> bool:
         return self.settings.custpost if self.settings else False
 
+    @property
+    def wp_attach(self) -> bool:
+        return self.settings.wp_attach if self.settings else False
+
+    @property
+    def read_jobs(self) -> int:
+        jobs = self.settings.read_jobs if self.settings else 1
+        return jobs or available_cpu_count()
+
     @staticmethod
     def decode_wp_content(content, br=True):
         pre_tags = {}
@@ -29,135 +134,173 @@ class WordPressReader(BlogReader[WordPressSettings]):
         if "<pre" in content:
             pre_parts = content.split("</pre>")
             last_pre = pre_parts.pop()
-            content = ""
-            pre_index = 0
+            parts = []
 
             for pre_part in pre_parts:
                 start = pre_part.find("<pre")
                 if start == -1:
-                    content = content + pre_part
+                    parts.append(pre_part)
                     continue
-                name = f"<pre wp-pre-tag-{pre_index}></pre>"
+                name = f"<pre wp-pre-tag-{len(pre_tags)}></pre>"
                 pre_tags[name] = pre_part[start:] + "</pre>"
-                content = content + pre_part[0:start] + name
-                pre_index += 1
-            content = content + last_pre
-
-        content = re.sub(r"<br />\s*<br />", "\n\n", content)
-        allblocks = (
-            "(?:table|thead|tfoot|caption|col|colgroup|tbody|tr|"
-            "td|th|div|dl|dd|dt|ul|ol|li|pre|select|option|form|"
-            "map|area|blockquote|address|math|style|p|h[1-6]|hr|"
-            "fieldset|noscript|samp|legend|section|article|aside|"
-            "hgroup|header|footer|nav|figure|figcaption|details|"
-            "menu|summary)"
-        )
-        content = re.sub(r"(<" + allblocks + r"[^>]*>)", "\n\\1", content)
-        content = re.sub(r"(</" + allblocks + r">)", "\\1\n\n", content)
+                parts.append(pre_part[0:start])
+                parts.append(name)
+            parts.append(last_pre)
+            content = "".join(parts)
+
+        content = _DOUBLE_BR_RE.sub("\n\n", content)
+        content = _BLOCK_START_RE.sub(lambda m: "\n" + m[1], content)
+        content = _BLOCK_END_RE.sub(lambda m: m[1] + "\n\n", content)
         #    content = content.replace("\r\n", "\n")
         if "<object" in content:
             # no <p> inside object/embed
-            content = re.sub(r"\s*<param([^>]*)>\s*", "<param\\1>", content)
-            content = re.sub(r"\s*</embed>\s*", "</embed>", content)
+            content = _sub_eating_space(_PARAM_RE, "<param\\1>", content)
+            content = _sub_eating_space(_EMBED_END_RE, "</embed>", content)
             #    content = re.sub(r'/\n\n+/', '\n\n', content)
-        pgraphs = filter(lambda s: s != "", re.split(r"\n\s*\n", content))
-        content = ""
-        for p in pgraphs:
-            content = content + "<p>" + p.strip() + "</p>\n"
+        content = "".join(
+            f"<p>{p.strip()}</p>\n" for p in _PARAGRAPH_SPLIT_RE.split(content) if p
+        )
         # under certain strange conditions it could create
         # a P of entirely whitespace
-        content = re.sub(r"<p>\s*</p>", "", content)
-        content = re.sub(
-            r"<p>([^<]+)</(div|address|form)>", "<p>\\1</p></\\2>", content
-        )
+        content = _EMPTY_P_RE.sub("", content)
+        content = _P_IN_BLOCK_RE.sub("<p>\\1</p></\\2>", content)
         # don't wrap tags
-        content = re.sub(r"<p>\s*(</?" + allblocks + r"[^>]*>)\s*</p>", "\\1", content)
+        content = _P_AROUND_BLOCK_RE.sub(_group, content)
         # problem with nested lists
-        content = re.sub(r"<p>(<li.*)</p>", "\\1", content)
-        content = re.sub(r"<p><blockquote([^>]*)>", "<blockquote\\1><p>", content)
+        content = _P_AROUND_LI_RE.sub(_group, content)
+        content = _P_BLOCKQUOTE_RE.sub("<blockquote\\1><p>", content)
         content = content.replace("</blockquote></p>", "</p></blockquote>")
-        content = re.sub(r"<p>\s*(</?" + allblocks + "[^>]*>)", "\\1", content)
-        content = re.sub(r"(</?" + allblocks + r"[^>]*>)\s*</p>", "\\1", content)
+        content = _P_BEFORE_BLOCK_RE.sub(_group, content)
+        content = _P_AFTER_BLOCK_RE.sub(_group, content)
         if br:
 
             def _preserve_newline(match):
                 return match.group(0).replace("\n", "<WPPreserveNewline />")
 
-            content = re.sub(
-                r"/<(script|style).*?<\/\\1>/s", _preserve_newline, content
-            )
+            content = _SCRIPT_RE.sub(_preserve_newline, content)
             # optionally make line breaks
-            content = re.sub(r"(?<!<br />)\s*\n", "<br />\n", content)
+            content = _newlines_to_br(content)
             content = content.replace("<WPPreserveNewline />", "\n")
-        content = re.sub(r"(</?" + allblocks + r"[^>]*>)\s*<br />", "\\1", content)
-        content = re.sub(
-            r"<br />(\s*</?(?:p|li|div|dl|dd|dt|th|pre|td|ul|ol)[^>]*>)", "\\1", content
-        )
-        content = re.sub(r"\n</p>", "</p>", content)
+        content = _BR_AFTER_BLOCK_RE.sub(_group, content)
+        content = _BR_BEFORE_BLOCK_RE.sub(_group, content)
+        content = content.replace("\n</p>", "</p>")
 
         if pre_tags:
+            content = _PRE_TAG_RE.sub(
+                lambda m: pre_tags.get(m.group(), m.group()), content
+            )
+
+        # convert [caption] tags into <figure>. Matches end with [/caption],
+        # so the regex doesn't need to backtrack over what follows the last one
+        caption_end = content.rfind("[/caption]") + len("[/caption]")
+        if caption_end >= len("[/caption]"):
+            content = (
+                _CAPTION_RE.sub(
+                    r"<figure>\n\2\n<figcaption>\1\3</figcaption>\n</figure>",
+                    content[:caption_end],
+                )
+                + content[caption_end:]
+            )
 
-            def _multi_replace(dic, string):
-                pattern = r"|".join(map(re.escape, dic.keys()))
-                return re.sub(pattern, lambda m: dic[m.group()], string)
+        return content
 
-            content = _multi_replace(pre_tags, content)
+    def _index_attachments(self, item, post_type: str | None):
+        post_id = find_string(item, "post_id") or ""
+        if post_type == "attachment":
+            url = find_string(item, "attachment_url")
+            if url is not None:
+                self._attachments.append((find_string(item, "post_parent") or "", url))
+        else:
+            post_name = find_string(item, "post_name")
+            self._filenames[post_id] = get_filename(post_name, post_id)
 
-        # convert [caption] tags into <figure>
-        content = re.sub(
-            r"\[caption(?:.*?)(?:caption=\"(.*?)\")?\]"
-            r"((?:\<a(?:.*?)\>)?(?:\<img.*?\>)(?:\<\/a\>)?)\s?(.*?)\[\/caption\]",
-            r"<figure>\n\2\n<figcaption>\1\3</figcaption>\n</figure>",
-            content,
-        )
+    def attached_files(self) -> dict[str | None, set[str]] | None:
+        if not self.wp_attach:
+            return None
 
-        return content
+        attachedposts: defaultdict[str | None, set[str]] = defaultdict(set)
+        for parent, url in self._attachments:
+            parent_name: str | None
+            try:
+                parent_name = self._filenames[parent]
+            except KeyError:
+                # attachment's parent is not a valid post
+                parent_name = None
+
+            attachedposts[parent_name].add(url)
+        return attachedposts
 
     def read_posts(self, xml) -> Generator[Post]:
-        """Opens a wordpress XML file, and yield Pelican fields"""
+        """
+        Opens a wordpress XML file, and yield Pelican fields.
 
-        soup = soup_from_xml_file(xml)
-        items = soup.rss.channel.find_all("item")
-        for item in items:
-            if item.find("status").string in ["publish", "draft"]:
+        The file is parsed incrementally, each item being freed once its
+        post has been yielded. With several read jobs, large files are split
+        in shards parsed in parallel, posts still being yielded in order.
+
+        Files compressed with gzip, bzip2 or xz, and zip archives, are
+        decompressed while being parsed, in this process.
+        """
+
+        self._filenames = {}
+        self._attachments = []
+        if self.read_jobs == 1 or is_compressed(xml):
+            with open_input(xml, (".xml",)) as f:
+                yield from self._read_items(f)
+            return
+
+        for posts, filenames, attachments in map_shards(
+            xml, "item", partial(_read_shard, self.settings), self.read_jobs
+        ):
+            self._filenames.update(filenames)
+            self._attachments += attachments
+            yield from posts
+
+    def _read_items(self, xml) -> Generator[Post]:
+        for item in iter_elements(xml, "{*}item"):
+            post_type = find_string(item, "post_type")
+            if self.wp_attach:
+                self._index_attachments(item, post_type)
+
+            status = find_string(item, "status")
+            if status in ["publish", "draft"]:
                 try:
                     # Use HTMLReader due to issues with BeautifulSoup 3
-                    title = unescape(item.title.contents[0])
+                    title = unescape(element_text(find(item, "title")))
                 except IndexError:
-                    title = "No title [{}]".format(item.find("post_name").string)
+                    title = "No title [{}]".format(find_string(item, "post_name"))
                     logger.warning('Post "%s" is lacking a proper title', title)
 
-                post_name = item.find("post_name").string
-                post_id = item.find("post_id").string
+                post_name = find_string(item, "post_name")
+                post_id = find_string(item, "post_id") or ""
                 filename = get_filename(post_name, post_id)
 
-                content = item.find("encoded").string
-                raw_date = item.find("post_date").string
-                if raw_date == "0000-00-00 00:00:00":
+                content = find_string(item, "encoded") or ""
+                raw_date = find_string(item, "post_date")
+                if raw_date is None or raw_date == "0000-00-00 00:00:00":
                     date = None
                 else:
                     date_object = SafeDatetime.strptime(raw_date, "%Y-%m-%d %H:%M:%S")
                     date = date_object.strftime("%Y-%m-%d %H:%M")
-                author = item.find("creator").string
+                author = find_string(item, "creator")
 
                 categories = [
-                    cat.string
-                    for cat in item.find_all("category", {"domain": "category"})
+                    name
+                    for cat in item.iter("{*}category")
+                    if cat.get("domain") == "category"
+                    and (name := element_string(cat)) is not None
                 ]
 
                 tags = [
-                    tag.string
-                    for tag in item.find_all("category", {"domain": "post_tag"})
+                    name
+                    for tag in item.iter("{*}category")
+                    if tag.get("domain") == "post_tag"
+                    and (name := element_string(tag)) is not None
                 ]
                 # To publish a post the status should be 'published'
-                status = (
-                    "published"
-                    if item.find("status").string == "publish"
-                    else item.find("status").string
-                )
+                status = "published" if status == "publish" else status
 
                 kind = "article"
-                post_type = item.find("post_type").string
                 if post_type == "page":
                     kind = "page"
                 elif self.custpost:
@@ -169,7 +312,7 @@ class WordPressReader(BlogReader[WordPressSettings]):
                     # maintain existing behaviour in case that doesn't hold true.
                     elif post_type == "attachment":
                         pass
-                    else:
+                    elif post_type is not None:
                         kind = post_type
                 yield Post(
                     title,
@@ -183,3 +326,14 @@ class WordPressReader(BlogReader[WordPressSettings]):
                     kind,
                     "wp-html",
                 )
+
+
+def _read_shard(
+    settings: WordPressSettings | None, shard
+) -> tuple[list[Post], dict[str, str], list[tuple[str, str]]]:
+    """Read the posts of a shard of a WordPress XML file, in a worker process"""
+    reader = WordPressReader()
+    if settings is not None:
+        reader.use_settings(settings)
+    posts = list(reader._read_items(shard))
+    return posts, reader._filenames, reader._attachments
@@ -1,25 +1,64 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import io
+import json
 import logging
 import os
 import pathlib
 import sys
-import tempfile
-from collections import defaultdict
-from collections.abc import Generator, Iterable
-from typing import cast
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable
 
-from blog2pelican.adapters.blog_readers import create_blog_reader
+from blog2pelican.adapters.blog_readers import (
+    create_async_blog_reader,
+    create_blog_reader,
+)
 from blog2pelican.app.use_cases.convert_post import (
     ConvertPostUseCase,
     download_attachments,
 )
 from blog2pelican.domain.entities.posts import Post
-from blog2pelican.domain.entities.settings import Settings, WordPressSettings
-from blog2pelican.domain.ports.blog_reader import BlogReader
+from blog2pelican.domain.entities.settings import DotclearSettings, Settings
+from blog2pelican.domain.ports.blog_reader import AsyncBlogReader, BlogReader
+from blog2pelican.helpers.attachment_store import AttachmentStore, AttachmentStoreStats
+from blog2pelican.helpers.cpu import available_cpu_count
+from blog2pelican.helpers.downloader import Downloader
+from blog2pelican.helpers.import_manifest import ImportManifest
+from blog2pelican.helpers.iterables import batched
 from blog2pelican.helpers.pandoc import Pandoc
-from blog2pelican.helpers.soup import soup_from_xml_file
+from blog2pelican.helpers.pandoc_cache import PandocCache, PandocCacheStats
 
 logger = logging.getLogger(__name__)
 
+# Directory of the output directory where attachments are stored
+ATTACHMENT_STORE_DIR = ".attachments"
+
+# File of the output directory recording the posts imported
+IMPORT_MANIFEST = ".import-manifest.sqlite"
+
+# Settings that don't change the files posts are converted to
+_RUN_SETTINGS = frozenset(
+    {
+        "input",
+        "output_dir",
+        "jobs",
+        "read_jobs",
+        "pandoc_server",
+        "pandoc_batch_size",
+        "pandoc_cache",
+        "pandoc_cache_size",
+        "incremental",
+        "delete_removed",
+        "download_workers",
+        "download_connections_per_host",
+        "download_timeout",
+        "download_retries",
+        "dc_public_dir",
+    }
+)
+
 
 class MissingPandocError(Exception):
     pass
@@ -36,6 +75,34 @@ def get_filename(post_name, post_id):
         return post_name
 
 
+def get_settings_key(settings: Settings, pandoc_version) -> str:
+    """Serialize the settings that affect the conversion of posts"""
+    values = {
+        field.name: getattr(settings, field.name)
+        for field in dataclasses.fields(settings)
+        if field.name not in _RUN_SETTINGS
+    }
+    return json.dumps([values, pandoc_version], sort_keys=True, default=str)
+
+
+def get_local_copies(settings: Settings) -> dict[str, pathlib.Path]:
+    """Local copies of the attachments, by URL prefix"""
+    if not isinstance(settings, DotclearSettings):
+        return {}
+    if settings.dc_public_url is None or settings.dc_public_dir is None:
+        return {}
+    return {settings.dc_public_url: settings.dc_public_dir}
+
+
+async def iter_async(iterable: Iterable) -> AsyncGenerator:
+    for item in iterable:
+        yield item
+
+
+def is_author_allowed(post: Post, settings: Settings) -> bool:
+    return settings.allowed_authors is None or post.author in settings.allowed_authors
+
+
 def create_output_dir_if_required(dirname: str | pathlib.Path):
     if not os.path.isdir(dirname):
         try:
@@ -45,9 +112,91 @@ def create_output_dir_if_required(dirname: str | pathlib.Path):
             sys.exit(error)
 
 
+class _RecordingHandler(logging.Handler):
+    """Keep log records so that they can be replayed by another process."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Make the record picklable
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+_worker_use_case: "ConvertBlogUseCase | None" = None
+_worker_settings: Settings | None = None
+_worker_attachments = None
+
+
+def _init_worker(settings: Settings, attachments, pandoc_server_port: int | None):
+    global _worker_use_case, _worker_settings, _worker_attachments
+
+    _worker_use_case = ConvertBlogUseCase()
+    _worker_use_case.open_pandoc_cache(settings)
+    _worker_use_case.pandoc.use_fast_convert(settings.fast_convert)
+    if pandoc_server_port is not None:
+        _worker_use_case.pandoc.connect_server(pandoc_server_port)
+    _worker_use_case.open_downloader(settings)
+    _worker_use_case.open_manifest(settings)
+    _worker_settings = settings
+    _worker_attachments = attachments
+
+
+def _convert_posts_in_worker(posts: list[Post]):
+    """
+    Convert posts in a worker process. Output and logs are captured, to be
+    replayed by the parent in the same order as a serial conversion.
+    """
+    assert _worker_use_case is not None and _worker_settings is not None
+
+    cache = _worker_use_case.pandoc.cache
+    if cache is not None:
+        cache.stats = PandocCacheStats()
+    store = _worker_use_case.attachment_store
+    if store is not None:
+        store.stats = AttachmentStoreStats()
+
+    handler = _RecordingHandler()
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers
+    root_logger.handlers = [handler]
+    stdout = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(stdout):
+            posts_require_pandoc = _worker_use_case.convert_posts_batch(
+                posts,
+                _worker_settings,
+                _worker_attachments,
+            )
+    finally:
+        root_logger.handlers = handlers
+
+    cache_stats = cache.stats if cache is not None else None
+    store_stats = store.stats if store is not None else None
+    return (
+        stdout.getvalue(),
+        handler.records,
+        posts_require_pandoc,
+        cache_stats,
+        store_stats,
+    )
+
+
 class ConvertBlogUseCase:
     def __init__(self):
         self.pandoc = Pandoc()
+        self.blog_reader: BlogReader | AsyncBlogReader | None = None
+        self.downloader: Downloader | None = None
+        self.attachment_store: AttachmentStore | None = None
+        self.manifest: ImportManifest | None = None
+        # Names of the posts read, to find the ones removed from the blog
+        self._post_names: set[str] = set()
 
     def convert_blog(self, settings: Settings):
         posts = self.read_posts(settings)
@@ -57,110 +206,453 @@ class ConvertBlogUseCase:
     def read_posts(self, settings: Settings) -> Generator[Post]:
         blog_reader: BlogReader = create_blog_reader(settings.engine)
         blog_reader.use_settings(settings)
+        self.blog_reader = blog_reader
         return blog_reader.read_posts(settings.input)
 
     def convert_post(
         self,
         post: Post,
         settings: Settings,
-        pandoc_tmpdir: str | None,
         attachments=None,
     ):
         strip_raw = getattr(settings, "strip_raw", False)
         dirpage = getattr(settings, "dirpage", False)
         wp_custpost = getattr(settings, "wp_custpost", False)
-        wp_attach = getattr(settings, "wp_attach", False)
+        wp_attach = settings.attach
 
-        if (
-            settings.allowed_authors is not None
-            and post.author not in settings.allowed_authors
-        ):
+        if not is_author_allowed(post, settings):
             return
 
         if is_pandoc_needed(post.markup) and not self.pandoc.version:
             raise MissingPandocError
 
-        pc = ConvertPostUseCase(pandoc=self.pandoc)
+        digest = self.get_digest(post, attachments)
+        pc = ConvertPostUseCase(pandoc=self.pandoc, downloader=self.downloader)
         pc.convert(
             post,
             settings,
-            pandoc_tmpdir,
             strip_raw,
             dirpage,
             wp_custpost,
             wp_attach,
             attachments,
         )
+        if self.manifest is not None and digest is not None:
+            self.manifest.record(post, digest, pc.out_filenames)
 
-        if wp_attach and attachments and None in attachments:
-            print("downloading attachments that don't have a parent post")
-            urls = attachments[None]
-            download_attachments(settings.output_dir, urls)
+    def convert_batch(self, posts: list[Post], settings: Settings):
+        """Convert a batch of posts with a single pandoc run when possible"""
+        if len(posts) < 2 or not self.pandoc.version:
+            return
 
-    def extract_attachments(self, settings: Settings):
+        strip_raw = getattr(settings, "strip_raw", False)
+        self.pandoc.convert_batch(
+            [post for post in posts if is_author_allowed(post, settings)],
+            settings.markup,
+            strip_raw,
+        )
+
+    def convert_posts_batch(
+        self,
+        posts: list[Post],
+        settings: Settings,
+        attachments=None,
+    ) -> list[str]:
+        """
+        Convert a batch of posts, and return the filenames of the posts that
+        could not be converted because pandoc is missing.
         """
-        Return a dictionary of posts that have attachments.
+        posts_require_pandoc = []
+        self.convert_batch(posts, settings)
+        for post in posts:
+            try:
+                self.convert_post(
+                    post,
+                    settings,
+                    attachments,
+                )
+            except MissingPandocError:
+                posts_require_pandoc.append(post.filename)
+
+        return posts_require_pandoc
+
+    def convert_posts_in_parallel(
+        self,
+        posts: Iterable[Post],
+        settings: Settings,
+        attachments=None,
+    ) -> list[str]:
+        """
+        Convert batches of posts in a pool of processes.
 
-        Each post has list of the attachment_urls.
+        Results are handled in submission order, so that the output and logs
+        are the same as with a serial conversion.
         """
-        if settings.engine != "wordpress":
-            return None
+        jobs = settings.jobs or available_cpu_count()
+        posts_require_pandoc = []
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(settings, attachments, self.pandoc.server_port),
+        ) as executor:
+            # Bound the number of pending batches, to avoid reading all the
+            # posts in memory
+            pending: deque[concurrent.futures.Future] = deque()
+            for batch in batched(posts, settings.pandoc_batch_size):
+                pending.append(executor.submit(_convert_posts_in_worker, batch))
+                if len(pending) >= 2 * jobs:
+                    posts_require_pandoc += self._replay(pending.popleft())
+
+            while pending:
+                posts_require_pandoc += self._replay(pending.popleft())
+
+        return posts_require_pandoc
+
+    def _replay(self, future: concurrent.futures.Future) -> list[str]:
+        output, records, posts_require_pandoc, cache_stats, store_stats = (
+            future.result()
+        )
+        if cache_stats is not None and self.pandoc.cache is not None:
+            self.pandoc.cache.stats.add(cache_stats)
+        if store_stats is not None and self.attachment_store is not None:
+            self.attachment_store.stats.add(store_stats)
+        sys.stdout.write(output)
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        return posts_require_pandoc
+
+    def extract_attachments(
+        self,
+        settings: Settings,
+        posts: Iterable[Post],
+    ) -> tuple[Iterable[Post], dict[str | None, set[str]] | None]:
+        """
+        Return the posts, and a dictionary of posts that have attachments.
+
+        Each post has list of the attachment_urls. The blog reader indexes
+        attachments while reading posts, and attachments may come after
+        their post, so all the posts are read first.
+        """
+        if not settings.attach:
+            return posts, None
+
+        reader = self.blog_reader
+        posts = list(posts)
+        if reader is None:
+            # The posts don't come from read_posts(), index them separately
+            reader = create_blog_reader(settings.engine)
+            reader.use_settings(settings)
+            deque(reader.read_posts(settings.input), maxlen=0)
+
+        return posts, reader.attached_files()
+
+    async def extract_attachments_async(
+        self,
+        settings: Settings,
+        posts: AsyncIterable[Post],
+    ) -> tuple[AsyncIterable[Post], dict[str | None, set[str]] | None]:
+        """Asynchronous version of extract_attachments()"""
+        if not settings.attach:
+            return posts, None
+
+        posts_read = [post async for post in posts]
+        if self.blog_reader is None:
+            _, attachments = await asyncio.to_thread(
+                self.extract_attachments, settings, posts_read
+            )
+        else:
+            attachments = self.blog_reader.attached_files()
+
+        return iter_async(posts_read), attachments
+
+    def open_downloader(self, settings: Settings):
+        if settings.attach:
+            self.attachment_store = AttachmentStore(
+                pathlib.Path(settings.output_dir) / ATTACHMENT_STORE_DIR
+            )
+            self.downloader = Downloader(
+                workers=settings.download_workers,
+                connections_per_host=settings.download_connections_per_host,
+                timeout=settings.download_timeout,
+                retries=settings.download_retries,
+                store=self.attachment_store,
+                local_copies=get_local_copies(settings),
+            )
+
+    def close_downloader(self):
+        if self.downloader is not None:
+            self.downloader.close()
+            self.downloader = None
+
+        store = self.attachment_store
+        if store is None:
+            return
 
-        s = cast(WordPressSettings, settings)
+        self.attachment_store = None
+        store.close()
+        logger.info(
+            "Attachments: %d downloaded, %d unchanged, %d duplicates",
+            store.stats.downloaded,
+            store.stats.unchanged,
+            store.stats.duplicates,
+        )
 
-        if not s.wp_attach:
+    def download_orphan_attachments(self, settings: Settings, attachments):
+        """Download the attachments that don't belong to a post read"""
+        if settings.attach and attachments and None in attachments:
+            print("downloading attachments that don't have a parent post")
+            download_attachments(
+                settings.output_dir, attachments[None], self.downloader
+            )
+
+    def open_manifest(self, settings: Settings):
+        if settings.incremental:
+            output_dir = pathlib.Path(settings.output_dir)
+            self.manifest = ImportManifest(
+                output_dir / IMPORT_MANIFEST,
+                output_dir,
+                get_settings_key(settings, self.pandoc.version),
+            )
+            self._post_names = set()
+
+    def get_digest(self, post: Post, attachments=None) -> str | None:
+        if self.manifest is None:
             return None
+        urls = attachments.get(post.filename) if attachments else None
+        return self.manifest.digest(post, urls)
 
-        xml_filepath = settings.input
-        soup = soup_from_xml_file(xml_filepath)
-        items = soup.rss.channel.find_all("item")
-        names = {}
-        attachments = []
-
-        for item in items:
-            kind = item.find("post_type").string
-            post_name = item.find("post_name").string
-            post_id = item.find("post_id").string
-
-            if kind == "attachment":
-                attachments.append(
-                    (
-                        item.find("post_parent").string,
-                        item.find("attachment_url").string,
-                    )
+    def skip_unchanged_posts(
+        self, posts: Iterable[Post], attachments=None
+    ) -> Generator[Post]:
+        """Filter out the posts that didn't change since the last import"""
+        for post in posts:
+            if not self.is_unchanged(post, attachments):
+                yield post
+
+    async def skip_unchanged_posts_async(
+        self, posts: AsyncIterable[Post], attachments=None
+    ) -> AsyncGenerator[Post]:
+        """Asynchronous version of skip_unchanged_posts()"""
+        async for post in posts:
+            if not self.is_unchanged(post, attachments):
+                yield post
+
+    def is_unchanged(self, post: Post, attachments=None) -> bool:
+        if self.manifest is None:
+            return False
+
+        self._post_names.add(post.filename)
+        digest = self.get_digest(post, attachments)
+        if digest is not None and self.manifest.is_unchanged(post, digest):
+            self.manifest.stats.unchanged += 1
+            return True
+        return False
+
+    def handle_removed_posts(self, settings: Settings):
+        """Report the posts removed since the last import, or delete them"""
+        if self.manifest is None:
+            return
+
+        for name, outputs in self.manifest.removed(self._post_names):
+            self.manifest.stats.removed += 1
+            if not settings.delete_removed:
+                logger.warning(
+                    "Post %s was removed from the blog, but not its files:\n  %s",
+                    name,
+                    "\n  ".join(outputs),
                 )
-            else:
-                filename = get_filename(post_name, post_id)
-                names[post_id] = filename
-        attachedposts = defaultdict(set)
-        for parent, url in attachments:
-            try:
-                parent_name = names[parent]
-            except KeyError:
-                # attachment's parent is not a valid post
-                parent_name = None
+                continue
+
+            for output in outputs:
+                try:
+                    os.remove(output)
+                    print(f"deleted {output}")
+                except FileNotFoundError:
+                    pass
+            self.manifest.forget(name)
+
+    def close_manifest(self):
+        manifest = self.manifest
+        if manifest is None:
+            return
+
+        self.manifest = None
+        manifest.close()
+        logger.info(
+            "Import manifest: %d posts unchanged, %d removed",
+            manifest.stats.unchanged,
+            manifest.stats.removed,
+        )
+
+    def open_pandoc_cache(self, settings: Settings):
+        if settings.pandoc_cache is not None:
+            cache = PandocCache(
+                settings.pandoc_cache,
+                settings.pandoc_cache_size * 1024 * 1024,
+            )
+            self.pandoc.use_cache(cache)
+
+    def close_pandoc_cache(self):
+        cache = self.pandoc.cache
+        if cache is None:
+            return
 
-            attachedposts[parent_name].add(url)
-        return attachedposts
+        self.pandoc.use_cache(None)
+        cache.close()
+        logger.info(
+            "Pandoc cache: %d hits, %d misses, %d evictions",
+            cache.stats.hits,
+            cache.stats.misses,
+            cache.stats.evictions,
+        )
 
     def convert_posts(
         self,
         posts: Iterable[Post],
         settings: Settings,
     ):
-        attachments = self.extract_attachments(settings)
+        posts, attachments = self.extract_attachments(settings, posts)
         posts_require_pandoc = []
-        with tempfile.TemporaryDirectory() as pandoc_tmpdir:
-            for post in posts:
-                try:
-                    self.convert_post(
+        self.open_pandoc_cache(settings)
+        self.pandoc.use_fast_convert(settings.fast_convert)
+        self.open_downloader(settings)
+        self.open_manifest(settings)
+        posts = self.skip_unchanged_posts(posts, attachments)
+        if settings.pandoc_server:
+            self.pandoc.start_server()
+
+        try:
+            if settings.jobs == 1:
+                for batch in batched(posts, settings.pandoc_batch_size):
+                    posts_require_pandoc += self.convert_posts_batch(
+                        batch,
+                        settings,
+                        attachments,
+                    )
+            else:
+                posts_require_pandoc = self.convert_posts_in_parallel(
+                    posts,
+                    settings,
+                    attachments,
+                )
+            self.download_orphan_attachments(settings, attachments)
+            self.handle_removed_posts(settings)
+        finally:
+            self.pandoc.stop_server()
+            self.close_pandoc_cache()
+            self.close_downloader()
+            self.close_manifest()
+
+        if posts_require_pandoc:
+            logger.error(
+                "Pandoc must be installed to import the following posts:\n  {}".format(
+                    "\n  ".join(posts_require_pandoc)
+                )
+            )
+
+    async def convert_blog_async(self, settings: Settings):
+        """
+        Asynchronous version of convert_blog(), to run the import within an
+        event loop. Posts are read in a thread, and converted concurrently by
+        at most settings.jobs pandoc processes.
+        """
+        posts = self.read_posts_async(settings)
+        create_output_dir_if_required(settings.output_dir)
+        await self.convert_posts_async(posts, settings)
+
+    def read_posts_async(self, settings: Settings) -> AsyncGenerator[Post]:
+        blog_reader: AsyncBlogReader = create_async_blog_reader(settings.engine)
+        blog_reader.use_settings(settings)
+        self.blog_reader = blog_reader
+        return blog_reader.read_posts(settings.input)
+
+    async def convert_post_async(
+        self,
+        post: Post,
+        settings: Settings,
+        pandoc_semaphore: asyncio.Semaphore,
+        attachments=None,
+    ):
+        strip_raw = getattr(settings, "strip_raw", False)
+        dirpage = getattr(settings, "dirpage", False)
+        wp_custpost = getattr(settings, "wp_custpost", False)
+        wp_attach = settings.attach
+
+        if not is_author_allowed(post, settings):
+            return
+
+        if is_pandoc_needed(post.markup) and not self.pandoc.version:
+            raise MissingPandocError
+
+        digest = self.get_digest(post, attachments)
+        pc = ConvertPostUseCase(pandoc=self.pandoc, downloader=self.downloader)
+        await pc.convert_async(
+            post,
+            settings,
+            strip_raw,
+            dirpage,
+            wp_custpost,
+            wp_attach,
+            attachments,
+            pandoc_semaphore,
+        )
+        if self.manifest is not None and digest is not None:
+            self.manifest.record(post, digest, pc.out_filenames)
+
+    async def convert_posts_async(
+        self,
+        posts: AsyncIterable[Post],
+        settings: Settings,
+    ):
+        jobs = settings.jobs or available_cpu_count()
+        pandoc_semaphore = asyncio.Semaphore(jobs)
+        posts, attachments = await self.extract_attachments_async(settings, posts)
+        # Query the version once, out of the event loop
+        await asyncio.to_thread(lambda: self.pandoc.version)
+        self.open_pandoc_cache(settings)
+        self.pandoc.use_fast_convert(settings.fast_convert)
+        self.open_downloader(settings)
+        self.open_manifest(settings)
+        posts = self.skip_unchanged_posts_async(posts, attachments)
+
+        posts_require_pandoc = []
+        pending: deque[tuple[Post, asyncio.Task]] = deque()
+
+        async def wait_oldest():
+            post, task = pending.popleft()
+            try:
+                await task
+            except MissingPandocError:
+                posts_require_pandoc.append(post.filename)
+
+        try:
+            async for post in posts:
+                task = asyncio.create_task(
+                    self.convert_post_async(
                         post,
                         settings,
-                        pandoc_tmpdir,
+                        pandoc_semaphore,
                         attachments,
                     )
-                except MissingPandocError:
-                    posts_require_pandoc.append(post.filename)
+                )
+                pending.append((post, task))
+                # Bound the number of posts held in memory
+                if len(pending) >= 4 * jobs:
+                    await wait_oldest()
+
+            while pending:
+                await wait_oldest()
+
+            await asyncio.to_thread(
+                self.download_orphan_attachments, settings, attachments
+            )
+            self.handle_removed_posts(settings)
+        finally:
+            for _, task in pending:
+                task.cancel()
+            self.close_pandoc_cache()
+            await asyncio.to_thread(self.close_downloader)
+            self.close_manifest()
 
         if posts_require_pandoc:
             logger.error(
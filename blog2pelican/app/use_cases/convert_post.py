@@ -1,12 +1,12 @@
+import asyncio
 import copy
 import logging
 import os.path
 import pathlib
 import re
 import sys
-from urllib.error import URLError
+from collections.abc import Iterable
 from urllib.parse import quote, urlparse, urlsplit, urlunsplit
-from urllib.request import urlretrieve
 
 from docutils.utils import column_width
 from pelican.settings import DEFAULT_CONFIG
@@ -14,6 +14,8 @@ from pelican.utils import slugify
 
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import Settings
+from blog2pelican.domain.entities.settings.base import OutMarkup
+from blog2pelican.helpers.downloader import Downloader
 from blog2pelican.helpers.pandoc import Pandoc
 
 logger = logging.getLogger(__name__)
@@ -216,12 +218,14 @@ def get_out_filename(
 
 def download_attachments(
     output_path: pathlib.Path,
-    urls: list[str],
+    urls: Iterable[str],
+    downloader: Downloader | None = None,
 ) -> dict[str, str]:
-    """Downloads WordPress attachments and returns a list of paths to
+    """Downloads attachments and returns a list of paths to
     attachments that can be associated with a post (relative path to output
     directory). Files that fail to download, will not be added to posts"""
-    locations = {}
+    targets = {}
+    localpaths = {}
     for url in urls:
         path = urlparse(url).path
         # teardown path and rebuild to negate any errors with
@@ -229,10 +233,12 @@ def download_attachments(
         path_components = path.split("/")
         filename = path_components.pop(-1)
         localpath = ""
-        for item in path:
+        for item in path_components:
+            if item in (".", ".."):
+                # don't write outside of the output directory
+                continue
             if sys.platform != "win32" or ":" not in item:
                 localpath = os.path.join(localpath, item)
-        full_path = os.path.join(output_path, localpath)
 
         # Generate percent-encoded URL
         scheme, netloc, path, query, fragment = urlsplit(url)
@@ -240,15 +246,25 @@ def download_attachments(
             path = quote(path)
             url = urlunsplit((scheme, netloc, path, query, fragment))
 
-        if not os.path.exists(full_path):
-            os.makedirs(full_path)
         print(f"downloading {filename}")
-        try:
-            urlretrieve(url, os.path.join(full_path, filename))
-            locations[url] = os.path.join(localpath, filename)
-        except (URLError, OSError) as e:
-            # Python 2.7 throws an IOError rather Than URLError
-            logger.warning("No file could be downloaded from %s\n%s", url, e)
+        targets[url] = os.path.join(output_path, localpath, filename)
+        localpaths[url] = os.path.join(localpath, filename)
+
+    for dirname in {os.path.dirname(target) for target in targets.values()}:
+        os.makedirs(dirname, exist_ok=True)
+
+    if downloader is None:
+        with Downloader() as default_downloader:
+            errors = default_downloader.download_many(targets)
+    else:
+        errors = downloader.download_many(targets)
+
+    locations = {}
+    for url, error in errors.items():
+        if error is None:
+            locations[url] = localpaths[url]
+        else:
+            logger.warning("No file could be downloaded from %s\n%s", url, error)
     return locations
 
 
@@ -261,10 +277,11 @@ def get_output_data(
     output_path,
     dirpage,
     wp_custpost,
+    out_markup=None,
 ):
     slug_subs = DEFAULT_CONFIG["SLUG_REGEX_SUBSTITUTIONS"]
-    out_markup = settings.markup
-    ext = get_ext(settings.markup, post.markup)
+    out_markup = out_markup or settings.markup
+    ext = get_ext(out_markup, post.markup)
 
     if ext == ".adoc":
         header = build_asciidoc_header(
@@ -275,7 +292,7 @@ def get_output_data(
             post.tags,
             slug,
             post.status,
-            attachments,
+            links.values() if links else None,
         )
     elif ext == ".md":
         # FIXME: allow to choose between different markdown dialects
@@ -315,70 +332,172 @@ def get_output_data(
     return out_filename, out_markup, header
 
 
+def get_out_markups(settings: Settings, post: Post) -> list[OutMarkup]:
+    """Markup languages to convert the post to, the main one first"""
+    out_markups: list[OutMarkup] = [settings.markup]
+    if post.markup in ("html", "wp-html"):
+        for out_markup in settings.extra_markups or []:
+            if out_markup not in out_markups:
+                out_markups.append(out_markup)
+
+    return out_markups
+
+
 class ConvertPostUseCase:
-    def __init__(self, pandoc=None):
+    def __init__(self, pandoc=None, downloader=None):
         self.pandoc = Pandoc() if pandoc is None else pandoc
+        self.downloader = downloader
+        # Files the post was saved to
+        self.out_filenames: list[str] = []
 
     def replace_author_aliases(self, post: Post, settings: Settings):
         if settings.author_aliases and post.author in settings.author_aliases:
             post.author = settings.author_aliases[post.author]
 
-    def convert(
-        self,
-        post: Post,
-        settings: Settings,
-        tmpdir: str | None = None,
-        strip_raw=False,
-        dirpage=False,
-        wp_custpost=False,
-        wp_attach=False,
-        attachments=None,
-    ) -> Post:
+    def get_slug(self, post: Post, settings: Settings) -> str | None:
         slug = None if settings.disable_slugs else post.filename
         assert slug is None or post.filename == os.path.basename(
             post.filename
         ), f"filename is not a basename: {post.filename}"
+        return slug
 
-        out_post = copy.copy(post)
-        self.replace_author_aliases(post, settings)
-
+    def get_links(
+        self,
+        post: Post,
+        settings: Settings,
+        wp_attach=False,
+        attachments=None,
+    ) -> dict[str, str] | None:
+        """Download the attachments of the post, and return their location"""
         if wp_attach and attachments:
             try:
                 urls = attachments[post.filename]
-                links = download_attachments(settings.output_dir, urls)
+                links = download_attachments(settings.output_dir, urls, self.downloader)
             except KeyError:
                 links = None
         else:
             links = None
 
-        out_filename, out_markup, header = get_output_data(
-            settings,
-            post,
-            slug,
-            attachments,
-            links,
-            settings.output_dir,
-            dirpage,
-            wp_custpost,
+        return links
+
+    def convert(
+        self,
+        post: Post,
+        settings: Settings,
+        strip_raw=False,
+        dirpage=False,
+        wp_custpost=False,
+        wp_attach=False,
+        attachments=None,
+    ) -> Post:
+        slug = self.get_slug(post, settings)
+        self.replace_author_aliases(post, settings)
+        links = self.get_links(post, settings, wp_attach, attachments)
+
+        outputs = self.get_outputs(
+            post, settings, slug, attachments, links, dirpage, wp_custpost
         )
-        print(out_filename)
 
-        out_post = copy.copy(post)
         # Convert content
+        contents = None
         if post.markup in ("html", "wp-html"):
-            out_post.content = self.pandoc.convert(
+            contents = self.pandoc.convert_many(
                 post,
-                out_markup,
+                [out_markup for out_markup, _, _ in outputs],
                 strip_raw,
                 wp_attach,
                 links,
-                out_filename,
             )
-            out_post.markup = out_markup
 
-        self.save(out_post, header, out_filename)
+        return self.save_outputs(post, outputs, contents)
+
+    def get_outputs(
+        self,
+        post: Post,
+        settings: Settings,
+        slug,
+        attachments,
+        links,
+        dirpage,
+        wp_custpost,
+    ) -> list[tuple[str, str, str]]:
+        """Return the markup, file name and header of each output file"""
+        outputs = []
+        for out_markup in get_out_markups(settings, post):
+            out_filename, out_markup, header = get_output_data(
+                settings,
+                post,
+                slug,
+                attachments,
+                links,
+                settings.output_dir,
+                dirpage,
+                wp_custpost,
+                out_markup,
+            )
+            print(out_filename)
+            outputs.append((out_markup, out_filename, header))
+
+        return outputs
+
+    def save_outputs(
+        self,
+        post: Post,
+        outputs: list[tuple[str, str, str]],
+        contents: dict[str, str] | None,
+    ) -> Post:
+        """Save each output file, and return the post in the main markup"""
+        out_posts = []
+        for out_markup, out_filename, header in outputs:
+            out_post = copy.copy(post)
+            if contents is not None:
+                out_post.content = contents[out_markup]
+                out_post.markup = out_markup
+            self.save(out_post, header, out_filename)
+            self.out_filenames.append(out_filename)
+            out_posts.append(out_post)
+
+        return out_posts[0]
+
+    async def convert_async(
+        self,
+        post: Post,
+        settings: Settings,
+        strip_raw=False,
+        dirpage=False,
+        wp_custpost=False,
+        wp_attach=False,
+        attachments=None,
+        pandoc_semaphore: asyncio.Semaphore | None = None,
+    ) -> Post:
+        """
+        Asynchronous version of convert(). Pandoc runs as an asyncio
+        subprocess, bounded by pandoc_semaphore if any. Downloads and file
+        writes are done in threads.
+        """
+        slug = self.get_slug(post, settings)
+        self.replace_author_aliases(post, settings)
+        links = await asyncio.to_thread(
+            self.get_links, post, settings, wp_attach, attachments
+        )
+
+        outputs = self.get_outputs(
+            post, settings, slug, attachments, links, dirpage, wp_custpost
+        )
+
+        # Convert content
+        contents = None
+        if post.markup in ("html", "wp-html"):
+            contents = await self.pandoc.convert_many_async(
+                post,
+                [out_markup for out_markup, _, _ in outputs],
+                strip_raw,
+                wp_attach,
+                links,
+                pandoc_semaphore,
+            )
 
-        return out_post
+        return await asyncio.to_thread(self.save_outputs, post, outputs, contents)
 
     def save(self, post, header, out_filename):
         with open(out_filename, "w", encoding="utf-8") as fs:
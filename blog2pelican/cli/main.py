@@ -39,7 +39,11 @@ def build_argument_parser() -> argparse.ArgumentParser:
         "feed",
     ]:
         parsers[engine] = subparsers.add_parser(engine)
-        parsers[engine].add_argument(dest="input", help="The input file to read")
+        parsers[engine].add_argument(
+            dest="input",
+            help="The input file to read. Files compressed with gzip, bzip2 or "
+            "xz, and zip archives, are read without being extracted.",
+        )
         parsers[engine].add_argument(
             "-o",
             "--output",
@@ -56,6 +60,15 @@ def build_argument_parser() -> argparse.ArgumentParser:
             default="rst",
             help="Output markup format",
         )
+        parsers[engine].add_argument(
+            "--also-markup",
+            action="append",
+            choices=["rst", "markdown", "asciidoc"],
+            dest="extra_markups",
+            help="Also convert HTML posts to this markup format, in another "
+            "file. Posts are parsed only once for all formats. "
+            "Use multiple times to add several formats.",
+        )
         parsers[engine].add_argument(
             "--dir-cat",
             action="store_true",
@@ -87,6 +100,72 @@ def build_argument_parser() -> argparse.ArgumentParser:
             "With this disabled, your Pelican URLs may not be consistent "
             "with your original posts.",
         )
+        parsers[engine].add_argument(
+            "--pandoc-server",
+            action="store_true",
+            dest="pandoc_server",
+            help="Convert posts through a single long-lived pandoc server "
+            "instead of running pandoc once per post. Falls back to one "
+            "pandoc process per post if the server can't be used.",
+        )
+        parsers[engine].add_argument(
+            "--pandoc-batch-size",
+            type=int,
+            default=1,
+            dest="pandoc_batch_size",
+            help="Number of posts converted by a single pandoc run. "
+            "Posts of a failing batch are converted one by one.",
+        )
+        parsers[engine].add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            nargs="?",
+            const=0,
+            default=1,
+            dest="jobs",
+            help="Number of posts converted in parallel. Without a value, "
+            "use all the CPUs available to the process.",
+        )
+        parsers[engine].add_argument(
+            "--pandoc-cache",
+            type=pathlib.Path,
+            dest="pandoc_cache",
+            help="Cache pandoc conversions in this SQLite database, so that "
+            "re-running an import only converts posts that changed.",
+        )
+        parsers[engine].add_argument(
+            "--pandoc-cache-size",
+            type=int,
+            default=1024,
+            dest="pandoc_cache_size",
+            help="Maximum size of the pandoc cache in MiB. Least recently "
+            "used conversions are evicted when it's full.",
+        )
+        parsers[engine].add_argument(
+            "--fast-convert",
+            choices=["off", "on", "check"],
+            default="off",
+            dest="fast_convert",
+            help="Convert simple HTML posts without running pandoc. "
+            "'check' also runs pandoc, and reports posts whose "
+            "conversions differ.",
+        )
+        parsers[engine].add_argument(
+            "--incremental",
+            action="store_true",
+            dest="incremental",
+            help="Only convert the posts that changed since the last import "
+            "in the output directory, and report the posts that were removed "
+            "from the blog.",
+        )
+        parsers[engine].add_argument(
+            "--delete-removed",
+            action="store_true",
+            dest="delete_removed",
+            help="With --incremental, delete the files of the posts that were "
+            "removed from the blog.",
+        )
 
     for engine in ["blogger", "wordpress"]:
         parsers[engine].add_argument(
@@ -96,6 +175,34 @@ def build_argument_parser() -> argparse.ArgumentParser:
             help=('Put files recognised as pages in "pages/" sub-directory'),
         )
 
+    for engine in ["blogger", "medium", "wordpress"]:
+        parsers[engine].add_argument(
+            "--read-jobs",
+            type=int,
+            nargs="?",
+            const=0,
+            default=1,
+            dest="read_jobs",
+            help="Number of processes parsing the input. Large XML files are "
+            "split in shards, and medium posts are parsed in parallel. "
+            "Without a value, use all the CPUs available to the process.",
+        )
+
+    parsers["medium"].add_argument(
+        "--html-parser",
+        choices=["html.parser", "lxml"],
+        default="html.parser",
+        dest="html_parser",
+        help="BeautifulSoup parser of the posts. lxml is faster, but needs "
+        "lxml to be installed.",
+    )
+    parsers["blogger"].add_argument(
+        "--import-comments",
+        action="store_true",
+        dest="import_comments",
+        help="Also import comments, as posts of the comment kind. Comments "
+        "are skipped otherwise.",
+    )
     parsers["wordpress"].add_argument(
         "--strip-raw",
         action="store_true",
@@ -121,14 +228,83 @@ def build_argument_parser() -> argparse.ArgumentParser:
         "they aren't associated with a post. Files will be downloaded "
         "with their original path inside the output directory. "
         "e.g. output/wp-uploads/date/postname/file.jpg "
+        "Files are stored once per content in output/.attachments, so that "
+        "re-running the import only downloads the files that changed. "
         "-- Requires an internet connection --",
     )
+    parsers["dotclear"].add_argument(
+        "--dc-media",
+        action="store_true",
+        dest="dc_media",
+        help="Download the media of the blog, and link posts to them. Media "
+        "are saved with the path of their URL inside the output directory, "
+        "e.g. output/public/2012/photo.jpg. Requires --dc-public-url.",
+    )
+    parsers["dotclear"].add_argument(
+        "--dc-public-url",
+        dest="dc_public_url",
+        help="URL of the public directory of the blog, where its media are "
+        "stored, e.g. http://blog.example.org/public/",
+    )
+    parsers["dotclear"].add_argument(
+        "--dc-public-dir",
+        type=pathlib.Path,
+        dest="dc_public_dir",
+        help="Local copy of the public directory of the blog. Media found "
+        "there are linked instead of downloaded.",
+    )
+    for engine in ["dotclear", "wordpress"]:
+        parsers[engine].add_argument(
+            "--download-workers",
+            type=int,
+            default=8,
+            dest="download_workers",
+            help="Number of attachments downloaded in parallel",
+        )
+        parsers[engine].add_argument(
+            "--download-connections-per-host",
+            type=int,
+            default=4,
+            dest="download_connections_per_host",
+            help="Maximum number of attachments downloaded from the same host "
+            "at once",
+        )
+        parsers[engine].add_argument(
+            "--download-timeout",
+            type=float,
+            default=30,
+            dest="download_timeout",
+            help="Timeout of attachment downloads, in seconds",
+        )
+        parsers[engine].add_argument(
+            "--download-retries",
+            type=int,
+            default=3,
+            dest="download_retries",
+            help="Number of times a failed attachment download is retried, "
+            "waiting longer each time",
+        )
     parsers["tumblr"].add_argument(
         "-b",
         "--blogname",
         dest="blogname",
         help="Blog name",
     )
+    parsers["tumblr"].add_argument(
+        "--api-base",
+        default="https://api.tumblr.com/v2",
+        dest="api_base",
+        help="Base URL of the Tumblr API",
+    )
+    parsers["tumblr"].add_argument(
+        "--prefetch-pages",
+        type=int,
+        default=2,
+        dest="prefetch_pages",
+        help="Number of pages of posts downloaded from the API while the "
+        "posts already downloaded are imported. 0 downloads each page once "
+        "its posts are needed.",
+    )
     return parser
 
 
@@ -2,6 +2,9 @@ import pathlib
 from dataclasses import dataclass
 from typing import Literal
 
+# Markup languages that posts can be converted to
+OutMarkup = Literal["markdown", "rst", "asciidoc"]
+
 
 @dataclass(kw_only=True)
 class Settings:
@@ -28,6 +31,9 @@ class Settings:
     """Markup format to use in output"""
     markup: Literal["rst", "markdown"]
 
+    """Other markup formats to convert HTML posts to, in separate files"""
+    extra_markups: list[OutMarkup] | None = None
+
     """Author whose posts to import, or None to select all"""
     allowed_authors: list[str] | None = None
 
@@ -40,5 +46,61 @@ class Settings:
     """ Disable storing slugs from imported posts within output"""
     disable_slugs: bool = False
 
+    """Convert posts through a long-lived pandoc server"""
+    pandoc_server: bool = False
+
+    """Number of posts converted by a single pandoc run"""
+    pandoc_batch_size: int = 1
+
+    """Number of conversion processes, 0 to use all available CPUs"""
+    jobs: int = 1
+
+    """Number of processes parsing the input, 0 to use all CPUs"""
+    read_jobs: int = 1  # Blogger, Medium & WordPress only
+
+    """Path to the database caching pandoc conversions, None to disable it"""
+    pandoc_cache: pathlib.Path | None = None
+
+    """Maximum size of the pandoc cache, in MiB"""
+    pandoc_cache_size: int = 1024
+
+    """Convert simple HTML posts without pandoc, or compare with pandoc"""
+    fast_convert: Literal["off", "on", "check"] = "off"
+
+    """Only convert the posts that changed since the last import"""
+    incremental: bool = False
+
+    """Delete the files of the posts removed since the last import"""
+    delete_removed: bool = False
+
+    """Number of attachments downloaded in parallel"""
+    download_workers: int = 8  # Dotclear & WordPress only
+
+    """Maximum number of attachments downloaded from the same host at once"""
+    download_connections_per_host: int = 4  # Dotclear & WordPress only
+
+    """Timeout of attachment downloads, in seconds"""
+    download_timeout: float = 30  # Dotclear & WordPress only
+
+    """Number of times a failed attachment download is retried"""
+    download_retries: int = 3  # Dotclear & WordPress only
+
+    @property
+    def attach(self) -> bool:
+        """Whether the files attached to posts are downloaded"""
+        return False
+
     def check(self):
         """Check if the settings are consistent for the selected engine"""
+        if self.pandoc_batch_size < 1:
+            raise ValueError("The pandoc batch size must be at least 1")
+        if self.jobs < 0:
+            raise ValueError("The number of jobs can't be negative")
+        if self.read_jobs < 0:
+            raise ValueError("The number of read jobs can't be negative")
+        if self.delete_removed and not self.incremental:
+            raise ValueError("Removed posts can only be found by incremental imports")
+        if self.download_workers < 1 or self.download_connections_per_host < 1:
+            raise ValueError("Attachments need at least one download connection")
+        if self.download_retries < 0:
+            raise ValueError("The number of download retries can't be negative")
@@ -10,3 +10,6 @@ class BloggerSettings(Settings):
 
     """Put pages in pages subdirectories"""
     dirpage: bool  # Blogger & WordPress only
+
+    """Import comments as posts of the comment kind"""
+    import_comments: bool = False
@@ -1,3 +1,4 @@
+import pathlib
 from dataclasses import dataclass
 from typing import Literal
 
@@ -7,3 +8,21 @@ from .base import Settings
 @dataclass
 class DotclearSettings(Settings):
     engine: Literal["dotclear"]
+
+    """Download the media of posts, and link posts to their local copies"""
+    dc_media: bool = False
+
+    """URL of the public directory of the blog, where media are stored"""
+    dc_public_url: str | None = None
+
+    """Local copy of the public directory, to link media from"""
+    dc_public_dir: pathlib.Path | None = None
+
+    @property
+    def attach(self) -> bool:
+        return self.dc_media
+
+    def check(self):
+        super().check()
+        if self.dc_media and not self.dc_public_url:
+            raise ValueError("Media can't be imported without the public URL")
@@ -7,3 +7,6 @@ from .base import Settings
 @dataclass
 class MediumSettings(Settings):
     engine: Literal["medium"]
+
+    """BeautifulSoup parser of the posts, lxml being faster"""
+    html_parser: Literal["html.parser", "lxml"] = "html.parser"
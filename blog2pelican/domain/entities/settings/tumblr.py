@@ -10,3 +10,14 @@ class TumblrSettings(Settings):
 
     """Blog name"""
     blogname: str | None  # Tumblr only
+
+    """Base URL of the Tumblr API"""
+    api_base: str = "https://api.tumblr.com/v2"
+
+    """Number of pages of posts downloaded ahead of the posts being imported"""
+    prefetch_pages: int = 2
+
+    def check(self):
+        super().check()
+        if self.prefetch_pages < 0:
+            raise ValueError("The number of prefetched pages can't be negative")
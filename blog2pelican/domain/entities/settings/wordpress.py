@@ -16,3 +16,7 @@ class WordPressSettings(Settings):
 
     """Download files uploaded to wordpress as attachments"""
     wp_attach: bool
+
+    @property
+    def attach(self) -> bool:
+        return self.wp_attach
@@ -1,5 +1,5 @@
 import abc
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Generic, TypeVar
 
 from blog2pelican.domain.entities.posts import Post
@@ -22,3 +22,33 @@ class BlogReader(abc.ABC, Generic[S]):
         """
         path: path to the file or dir containing the blog data to parse.
         """
+
+    def attached_files(self) -> dict[str | None, set[str]] | None:
+        """
+        URLs of the files attached to the posts read, by post filename
+        (None for files without a post), or None if not supported.
+        Only complete once read_posts() has been exhausted.
+        """
+        return None
+
+
+class AsyncBlogReader(abc.ABC, Generic[S]):
+    """Blog reader yielding posts from an asynchronous generator"""
+
+    settings: S | None
+
+    def __init__(self):
+        self.settings = None
+
+    def use_settings(self, settings: S):
+        self.settings = settings
+
+    @abc.abstractmethod
+    def read_posts(self, path: str) -> AsyncGenerator[Post]:
+        """
+        path: path to the file or dir containing the blog data to parse.
+        """
+
+    def attached_files(self) -> dict[str | None, set[str]] | None:
+        """See BlogReader.attached_files()"""
+        return None
@@ -0,0 +1,169 @@
+import contextlib
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StoredFile:
+    digest: str
+    size: int
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+@dataclass
+class AttachmentStoreStats:
+    downloaded: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+
+    def add(self, other: "AttachmentStoreStats"):
+        self.downloaded += other.downloaded
+        self.unchanged += other.unchanged
+        self.duplicates += other.duplicates
+
+
+class AttachmentStore:
+    """
+    Attachments stored by content hash, and hardlinked at their paths in the
+    output directory, so that identical files are stored once.
+
+    A manifest records the validators (ETag, Last-Modified) sent with each
+    URL, so that re-running an import can ask the server whether files
+    changed instead of downloading them again.
+    """
+
+    def __init__(self, path: str | pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.objects = self.path / "objects"
+        self.stats = AttachmentStoreStats()
+        os.makedirs(self.objects, exist_ok=True)
+
+        # Autocommit, several processes may share the store. The connection
+        # is shared by the download threads.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path / "manifest.sqlite",
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT"
+            ")"
+        )
+
+    def object_path(self, digest: str) -> pathlib.Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def lookup(self, url: str) -> StoredFile | None:
+        """Return what was stored for url, if the file is still there"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, size, etag, last_modified FROM files WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        stored = StoredFile(*row)
+        try:
+            if os.path.getsize(self.object_path(stored.digest)) != stored.size:
+                return None
+        except OSError:
+            return None
+        return stored
+
+    def save(
+        self,
+        url: str,
+        source,
+        target: str | os.PathLike,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        """
+        Stream the file object source to the store, and link it at target.
+        """
+        h = hashlib.sha256()
+        size = 0
+        fd, partial = tempfile.mkstemp(dir=self.path, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := source.read(_CHUNK_SIZE):
+                    h.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            digest = h.hexdigest()
+            object_path = self.object_path(digest)
+            # The same content may be saved by several threads at once
+            with self._lock:
+                duplicate = object_path.exists()
+                if duplicate:
+                    os.remove(partial)
+                else:
+                    os.makedirs(object_path.parent, exist_ok=True)
+                    os.replace(partial, object_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(partial)
+            raise
+
+        stored = StoredFile(digest, size, etag, last_modified)
+        self.link(stored, target)
+        with self._lock:
+            self.stats.downloaded += 1
+            self.stats.duplicates += duplicate
+            self._db.execute(
+                "INSERT OR REPLACE INTO files"
+                " (url, digest, size, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, size, etag, last_modified),
+            )
+
+    def reuse(self, stored: StoredFile, target: str | os.PathLike):
+        """Link a file that didn't change since it was stored at target"""
+        self.link(stored, target)
+        with self._lock:
+            self.stats.unchanged += 1
+
+    def link(self, stored: StoredFile, target: str | os.PathLike):
+        """Hardlink the stored file at target, or copy it if not possible"""
+        link_file(self.object_path(stored.digest), target)
+
+    def close(self):
+        self._db.close()
+
+
+def link_file(source: str | os.PathLike, target: str | os.PathLike):
+    """Hardlink source at target, or copy it if not possible"""
+    with contextlib.suppress(OSError):
+        if os.path.samefile(source, target):
+            return
+
+    partial = f"{os.fspath(target)}.part"
+    with contextlib.suppress(OSError):
+        os.remove(partial)
+    try:
+        os.link(source, partial)
+    except OSError:
+        # Hardlinks aren't supported by every filesystem
+        shutil.copyfile(source, partial)
+    os.replace(partial, target)
@@ -0,0 +1,50 @@
+import math
+import os
+
+
+def _read_cgroup_cpu_quota() -> float | None:
+    """
+    Return the number of CPUs allowed by the cgroup CPU quota, if any.
+    Containers usually restrict CPU time this way rather than with affinity.
+    """
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota_str, period_str = f.read().split()[:2]
+        if quota_str == "max":
+            return None
+        quota, period = int(quota_str), int(period_str)
+        return quota / period
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="utf-8") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="utf-8") as f:
+            period = int(f.read())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpu_count() -> int:
+    """
+    Number of CPUs this process may use, honouring CPU affinity and the
+    container's CPU quota.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+
+    quota = _read_cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, math.ceil(quota))
+
+    return max(1, count)
@@ -0,0 +1,335 @@
+import concurrent.futures
+import contextlib
+import http.client
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from collections.abc import Mapping
+from urllib.parse import unquote, urljoin, urlsplit
+
+from blog2pelican.helpers.attachment_store import AttachmentStore, StoredFile, link_file
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying, the server may answer later
+_RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+_MAX_REDIRECTS = 5
+_CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+class _RetryableError(DownloadError):
+    pass
+
+
+class HostPool:
+    """Keep-alive connections to a host, used by at most `size` threads."""
+
+    def __init__(self, scheme: str, netloc: str, size: int, timeout: float):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.semaphore = threading.BoundedSemaphore(size)
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection, or a new one, and if it was reused"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.connect(), False
+
+    def connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def release(self, connection: http.client.HTTPConnection):
+        with self._lock:
+            self._idle.append(connection)
+
+    def close(self):
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle = []
+
+
+class Downloader:
+    """
+    Download files with a pool of threads.
+
+    HTTP connections are kept alive and reused for following files of the
+    same host, and at most connections_per_host files are downloaded from a
+    host at once. Failed downloads are retried with an exponential backoff,
+    and files are streamed to disk.
+
+    With a store, files are saved in it, and files already stored are only
+    downloaded again if the server says they changed.
+
+    local_copies maps URL prefixes to local directories holding a copy of
+    their files, which are then linked instead of downloaded.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        connections_per_host: int = 4,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 0.5,
+        store: AttachmentStore | None = None,
+        local_copies: Mapping[str, str | os.PathLike] | None = None,
+    ):
+        self.workers = workers
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.store = store
+        self.local_copies = dict(local_copies or {})
+        self._pools: dict[tuple[str, str], HostPool] = {}
+        self._pools_lock = threading.Lock()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def download_many(
+        self, targets: Mapping[str, str | os.PathLike]
+    ) -> dict[str, DownloadError | None]:
+        """
+        Download each URL of targets to its path, in parallel. Return the
+        error of each URL, None if it was downloaded.
+        """
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="download",
+            )
+
+        futures = {
+            url: self._executor.submit(self.download, url, path)
+            for url, path in targets.items()
+        }
+        errors: dict[str, DownloadError | None] = {}
+        for url, future in futures.items():
+            try:
+                future.result()
+                errors[url] = None
+            except DownloadError as e:
+                errors[url] = e
+        return errors
+
+    def download(self, url: str, path: str | os.PathLike):
+        """Download url to path, raise DownloadError on failure"""
+        local_copy = self._local_copy(url)
+        if local_copy is not None:
+            try:
+                link_file(local_copy, path)
+                return
+            except OSError as e:
+                raise DownloadError(f"{local_copy}: {e}") from e
+
+        stored = self.store.lookup(url) if self.store is not None else None
+        for attempt in range(self.retries + 1):
+            try:
+                self._download(url, path, stored)
+                return
+            except _RetryableError as e:
+                if attempt == self.retries:
+                    raise DownloadError(str(e)) from e
+                delay = self.backoff * 2**attempt
+                logger.debug("Retrying %s in %.1fs: %s", url, delay, e)
+                time.sleep(delay)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                raise DownloadError(f"{url}: {e}") from e
+
+    def _local_copy(self, url: str) -> str | None:
+        """Path of the local copy of url, None if there is none"""
+        url = unquote(url)
+        for prefix, directory in self.local_copies.items():
+            if not url.startswith(prefix):
+                continue
+            directory = os.path.abspath(directory)
+            path = os.path.normpath(
+                os.path.join(directory, url[len(prefix) :].lstrip("/"))
+            )
+            # Don't link files from outside of the directory
+            if path.startswith(os.path.join(directory, "")) and os.path.isfile(path):
+                return path
+        return None
+
+    def _download(self, url: str, path: str | os.PathLike, stored: StoredFile | None):
+        scheme = urlsplit(url).scheme
+        if scheme not in ("http", "https"):
+            self._download_other(url, path)
+            return
+
+        location = url
+        for _ in range(_MAX_REDIRECTS + 1):
+            redirection = self._download_http(location, path, url, stored)
+            if redirection is None:
+                return
+            location = redirection
+        raise DownloadError(f"Too many redirections for {url}")
+
+    def _pool(self, scheme: str, netloc: str) -> HostPool:
+        with self._pools_lock:
+            pool = self._pools.get((scheme, netloc))
+            if pool is None:
+                pool = HostPool(scheme, netloc, self.connections_per_host, self.timeout)
+                self._pools[scheme, netloc] = pool
+            return pool
+
+    def _download_http(
+        self,
+        url: str,
+        path: str | os.PathLike,
+        original_url: str,
+        stored: StoredFile | None,
+    ) -> str | None:
+        """
+        Download url, redirected from original_url if different, to path.
+        Return where it's redirected to, if so.
+        """
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        headers = {"User-Agent": "blog2pelican", "Accept-Encoding": "identity"}
+        if stored is not None:
+            if stored.etag is not None:
+                headers["If-None-Match"] = stored.etag
+            if stored.last_modified is not None:
+                headers["If-Modified-Since"] = stored.last_modified
+
+        pool = self._pool(parts.scheme, parts.netloc)
+        with pool.semaphore:
+            connection, reused = pool.acquire()
+            while True:
+                try:
+                    response = self._get(connection, target, headers)
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    if not reused:
+                        raise _RetryableError(f"{url}: {e}") from e
+                    # The server may have closed the idle connection
+                    connection, reused = pool.connect(), False
+
+            try:
+                location = self._handle_response(
+                    response, url, path, original_url, stored
+                )
+            except BaseException:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                pool.release(connection)
+            return location
+
+    @staticmethod
+    def _get(
+        connection: http.client.HTTPConnection, target: str, headers: dict[str, str]
+    ):
+        connection.request("GET", target, headers=headers)
+        return connection.getresponse()
+
+    def _handle_response(
+        self,
+        response: http.client.HTTPResponse,
+        url: str,
+        path: str | os.PathLike,
+        original_url: str,
+        stored: StoredFile | None,
+    ) -> str | None:
+        if response.status in _REDIRECT_STATUSES:
+            response.read()
+            location = response.getheader("Location")
+            if location is None:
+                raise DownloadError(f"{url}: redirection without a location")
+            return urljoin(url, location)
+
+        if response.status == 304 and stored is not None:
+            response.read()
+            assert self.store is not None
+            self.store.reuse(stored, path)
+            return None
+
+        if response.status != 200:
+            response.read()
+            error = f"{url}: HTTP error {response.status} {response.reason}"
+            if response.status in _RETRY_STATUSES:
+                raise _RetryableError(error)
+            raise DownloadError(error)
+
+        try:
+            self._save(
+                original_url,
+                response,
+                path,
+                response.getheader("ETag"),
+                response.getheader("Last-Modified"),
+            )
+        except (OSError, http.client.HTTPException) as e:
+            raise _RetryableError(f"{url}: {e}") from e
+        return None
+
+    def _download_other(self, url: str, path: str | os.PathLike):
+        """Download URLs of other schemes, such as file://, with urllib"""
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                self._save(url, response, path)
+        except OSError as e:
+            raise DownloadError(f"{url}: {e}") from e
+
+    def _save(
+        self,
+        url: str,
+        response,
+        path: str | os.PathLike,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        if self.store is not None:
+            self.store.save(url, response, path, etag, last_modified)
+        else:
+            _save(response, path)
+
+
+def _save(response, path: str | os.PathLike):
+    """Stream response to path, which only appears once complete"""
+    partial = f"{os.fspath(path)}.part"
+    try:
+        with open(partial, "wb") as f:
+            shutil.copyfileobj(response, f, _CHUNK_SIZE)
+        os.replace(partial, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(partial)
+        raise
@@ -0,0 +1,94 @@
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from blog2pelican.domain.entities.posts import Post
+
+
+@dataclass
+class ImportManifestStats:
+    unchanged: int = 0
+    removed: int = 0
+
+
+class ImportManifest:
+    """
+    Record of the posts imported in an output directory, stored in a SQLite
+    database.
+
+    Each post is recorded with a digest of its fields and of the settings
+    that affect its conversion, along with the files it was saved to. A
+    rerun can then skip the posts that didn't change, and find the posts
+    that were removed from the blog.
+    """
+
+    def __init__(self, path: str | pathlib.Path, output_dir, settings_key: str):
+        self.path = pathlib.Path(path)
+        self.output_dir = output_dir
+        self.settings_key = settings_key
+        self.stats = ImportManifestStats()
+
+        # Autocommit, several processes may share the manifest
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            " name TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL,"
+            " outputs TEXT NOT NULL"
+            ")"
+        )
+
+    def digest(self, post: Post, attachments: Iterable[str] | None = None) -> str:
+        """Hash everything that affects the files the post is saved to"""
+        h = hashlib.sha256()
+        for part in (
+            self.settings_key,
+            json.dumps(dataclasses.astuple(post)),
+            json.dumps(sorted(attachments or [])),
+        ):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def is_unchanged(self, post: Post, digest: str) -> bool:
+        """Check if post was imported with the same digest, and still is"""
+        row = self._db.execute(
+            "SELECT digest, outputs FROM posts WHERE name = ?", (post.filename,)
+        ).fetchone()
+        if row is None or row[0] != digest:
+            return False
+
+        return all(
+            os.path.exists(os.path.join(self.output_dir, output))
+            for output in json.loads(row[1])
+        )
+
+    def record(self, post: Post, digest: str, outputs: Iterable[str]):
+        outputs = [os.path.relpath(output, self.output_dir) for output in outputs]
+        self._db.execute(
+            "INSERT OR REPLACE INTO posts (name, digest, outputs) VALUES (?, ?, ?)",
+            (post.filename, digest, json.dumps(outputs)),
+        )
+
+    def removed(self, names: set[str]) -> list[tuple[str, list[str]]]:
+        """Return the posts recorded that are not in names, with their files"""
+        removed = []
+        for name, outputs in self._db.execute(
+            "SELECT name, outputs FROM posts ORDER BY name"
+        ):
+            if name not in names:
+                paths = [os.path.join(self.output_dir, o) for o in json.loads(outputs)]
+                removed.append((name, paths))
+        return removed
+
+    def forget(self, name: str):
+        self._db.execute("DELETE FROM posts WHERE name = ?", (name,))
+
+    def close(self):
+        self._db.close()
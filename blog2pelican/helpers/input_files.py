@@ -0,0 +1,80 @@
+import bz2
+import gzip
+import lzma
+import os
+import zipfile
+from typing import IO
+
+# Magic numbers of the compressed files read directly, by format. Empty zip
+# archives start with their end of central directory record.
+_MAGIC_NUMBERS = {
+    "gzip": (b"\x1f\x8b",),
+    "bzip2": (b"BZh",),
+    "xz": (b"\xfd7zXZ\x00",),
+    "zip": (b"PK\x03\x04", b"PK\x05\x06"),
+}
+
+
+def input_format(path) -> str | None:
+    """
+    Compression format of the file at path, from its magic number: gzip,
+    bzip2, xz or zip. None for directories and uncompressed files.
+    """
+    if os.path.isdir(path):
+        return None
+
+    with open(path, "rb") as f:
+        start = f.read(6)
+    for name, magic in _MAGIC_NUMBERS.items():
+        if start.startswith(magic):
+            return name
+    return None
+
+
+def is_compressed(path) -> bool:
+    return input_format(path) is not None
+
+
+def archive_members(archive: zipfile.ZipFile, suffixes: tuple[str, ...]) -> list[str]:
+    """
+    Names of the files of archive with one of suffixes (any file if there's
+    none), in archive order. Hidden files and macOS metadata are skipped.
+    """
+    return [
+        info.filename
+        for info in archive.infolist()
+        if not info.is_dir()
+        and (not suffixes or info.filename.endswith(suffixes))
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+
+
+def open_input(path, suffixes: tuple[str, ...] = ()) -> IO[bytes]:
+    """
+    Open the file at path for reading, decompressing it on the fly if it's
+    compressed with gzip, bzip2 or xz.
+
+    Zip archives must contain a single file with one of suffixes, which is
+    decompressed on the fly as well. Nothing is extracted to disk.
+    """
+    fmt = input_format(path)
+    if fmt is None:
+        return open(path, "rb")
+    if fmt == "gzip":
+        return gzip.open(path, "rb")
+    if fmt == "bzip2":
+        return bz2.open(path, "rb")
+    if fmt == "xz":
+        return lzma.open(path, "rb")
+
+    with zipfile.ZipFile(path) as archive:
+        members = archive_members(archive, suffixes)
+        if len(members) != 1:
+            kinds = " or ".join(suffixes) or "input"
+            raise ValueError(
+                f"{path}: expected a single {kinds} file in the archive, "
+                f"found {len(members)}"
+            )
+        # The member keeps the archive file open until it's closed
+        return archive.open(members[0])
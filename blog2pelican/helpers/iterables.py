@@ -0,0 +1,9 @@
+from collections.abc import Generator, Iterable
+from itertools import islice
+
+
+def batched(iterable: Iterable, n: int) -> Generator[list]:
+    """Split iterable into lists of length n, the last one may be shorter."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
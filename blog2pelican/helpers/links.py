@@ -0,0 +1,69 @@
+import re
+from collections.abc import Iterable, Mapping
+
+
+def url_variants(url: str) -> list[str]:
+    """Return url, with both the http:// and https:// schemes"""
+    http_url = url.replace("https://", "http://")
+    https_url = url.replace("http://", "https://")
+    return [http_url, https_url] if http_url != https_url else [url]
+
+
+def _trie_pattern(strings: Iterable[str]) -> str:
+    """
+    Build a regular expression matching any of strings, factored as a trie
+    so that the regex engine doesn't try every string at each position.
+    Longer strings are preferred over their prefixes.
+    """
+    trie: dict = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: dict) -> str:
+        prefix = ""
+        # Chains of single characters are matched literally
+        while len(node) == 1 and "" not in node:
+            ((char, node),) = node.items()
+            prefix += char
+        branches = [
+            re.escape(char) + pattern(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return re.escape(prefix)
+        if len(branches) == 1:
+            group = f"(?:{branches[0]})"
+        else:
+            group = "(?:{})".format("|".join(branches))
+        return re.escape(prefix) + group + ("?" if "" in node else "")
+
+    return pattern(trie)
+
+
+class LinkRewriter:
+    """
+    Replace links to remote files with links to their local copies, in a
+    single pass over the content.
+
+    locations maps remote URLs to paths relative to the output directory.
+    URLs are matched with both http:// and https:// schemes.
+    """
+
+    def __init__(self, locations: Mapping[str, str], prefix: str = "{static}"):
+        self._targets: dict[str, str] = {}
+        for url, path in locations.items():
+            for variant in url_variants(url):
+                self._targets.setdefault(variant, prefix + path)
+
+        self._regex = None
+        if self._targets:
+            self._regex = re.compile(_trie_pattern(self._targets))
+
+    def rewrite(self, content: str) -> str:
+        if self._regex is None:
+            return content
+        return self._regex.sub(lambda m: self._targets[m.group()], content)
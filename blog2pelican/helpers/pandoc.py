@@ -1,17 +1,133 @@
+import asyncio
+import contextlib
+import difflib
 import logging
+import os.path
 import subprocess
 import sys
 import tempfile
+import uuid
+from collections.abc import Sequence
+from html.parser import HTMLParser
 from typing import Literal
 
 from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings.base import OutMarkup
+from blog2pelican.helpers.links import LinkRewriter
+from blog2pelican.helpers.pandoc_cache import PandocCache
+from blog2pelican.helpers.pandoc_server import PandocServer, PandocServerError
+from blog2pelican.helpers.simple_html import convert_simple_html
 
 logger = logging.getLogger(__name__)
 
+# Output formats of pandoc: markup languages, and its JSON AST
+PandocFormat = OutMarkup | Literal["json"]
+
+# Custom pandoc writer used for batches: posts are separated by marker
+# paragraphs, and each post is rendered on its own so that document-level
+# constructs (footnotes, rst image substitutions...) stay within their post.
+BATCH_WRITER_LUA = """\
+function Writer(doc, opts)
+  local marker = tostring(opts.variables.b2p_marker)
+  local format = tostring(opts.variables.b2p_format)
+  local chunks = {}
+  local blocks = {}
+  for _, block in ipairs(doc.blocks) do
+    if block.t == "Para" and pandoc.utils.stringify(block) == marker then
+      table.insert(chunks, pandoc.write(pandoc.Pandoc(blocks, doc.meta), format, opts))
+      blocks = {}
+    else
+      table.insert(blocks, block)
+    end
+  end
+  table.insert(chunks, pandoc.write(pandoc.Pandoc(blocks, doc.meta), format, opts))
+  return table.concat(chunks, "\\n" .. marker .. "\\n")
+end
+"""
+
+
+class _TagBalanceChecker(HTMLParser):
+    """Check that every opened HTML tag is closed, in the right order."""
+
+    VOID_TAGS = frozenset(
+        {
+            "area",
+            "base",
+            "br",
+            "col",
+            "embed",
+            "hr",
+            "img",
+            "input",
+            "link",
+            "meta",
+            "param",
+            "source",
+            "track",
+            "wbr",
+        }
+    )
+    # Tags whose end tag may be omitted
+    OPTIONAL_END_TAGS = frozenset(
+        {
+            "colgroup",
+            "dd",
+            "dt",
+            "li",
+            "option",
+            "p",
+            "tbody",
+            "td",
+            "tfoot",
+            "th",
+            "thead",
+            "tr",
+        }
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.balanced = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        while self.stack and self.stack[-1] != tag:
+            if self.stack.pop() not in self.OPTIONAL_END_TAGS:
+                self.balanced = False
+        if self.stack:
+            self.stack.pop()
+        else:
+            self.balanced = False
+
+    def close(self):
+        super().close()
+        if any(tag not in self.OPTIONAL_END_TAGS for tag in self.stack):
+            self.balanced = False
+
+
+def is_balanced_html(html: str) -> bool:
+    checker = _TagBalanceChecker()
+    checker.feed(html)
+    checker.close()
+    return checker.balanced
+
 
 class Pandoc:
     def __init__(self, *args, **kwargs):
         self._version = None
+        self._server = None
+        self._batch_results = {}
+        self._cache = None
+        self._fast_convert = "off"
         self.name = "Pandoc"
 
     def _get_version(self):
@@ -41,6 +157,94 @@ class Pandoc:
     def available(self):
         return bool(self.version)
 
+    def start_server(self):
+        """
+        Start a long-lived pandoc server, used by convert() instead of
+        running one pandoc process per post.
+        """
+        if self._server is not None:
+            return
+
+        if self.version < (3,):
+            logger.warning(
+                "Pandoc %s has no server mode, falling back to one process per post",
+                ".".join(str(i) for i in self.version) or "(unknown)",
+            )
+            return
+
+        server = PandocServer()
+        try:
+            server.start()
+        except PandocServerError as e:
+            logger.warning("%s, falling back to one process per post", e)
+            return
+
+        self._server = server
+
+    def connect_server(self, port: int):
+        """Use a pandoc server started by another Pandoc instance."""
+        self._server = PandocServer(port=port)
+
+    @property
+    def server_port(self) -> int | None:
+        return self._server.port if self._server is not None else None
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+
+    @property
+    def cache(self) -> PandocCache | None:
+        return self._cache
+
+    def use_cache(self, cache: PandocCache | None):
+        """Reuse conversions stored in cache, and store new ones there"""
+        self._cache = cache
+
+    def _cache_key(
+        self,
+        html_content: str,
+        out_markup: OutMarkup,
+        strip_raw: bool,
+    ) -> str:
+        format_ = self._build_pandoc_options(out_markup, strip_raw)["to"]
+        return PandocCache.make_key(html_content, format_, strip_raw, self.version)
+
+    def use_fast_convert(self, mode: Literal["off", "on", "check"]):
+        """
+        Convert simple HTML in-process instead of running pandoc. In "check"
+        mode, pandoc is still used, and differences are reported.
+        """
+        self._fast_convert = mode
+
+    def _convert_fast(
+        self,
+        html_content: str,
+        out_markup: OutMarkup,
+    ) -> str | None:
+        # The fast path mimics the writers of modern pandoc versions
+        if self._fast_convert == "off" or self.version < (2,):
+            return None
+
+        return convert_simple_html(html_content, out_markup)
+
+    def _check_fast_conversion(self, fast_content: str, content: str, name: str):
+        if fast_content == content:
+            return
+
+        diff = difflib.unified_diff(
+            content.splitlines(keepends=True),
+            fast_content.splitlines(keepends=True),
+            "pandoc",
+            "fast",
+        )
+        logger.warning(
+            "Fast conversion of %s differs from pandoc:\n%s",
+            name,
+            "".join(diff),
+        )
+
     def supports(self, input_format):
         return input_format in ("html", "wp-html")
 
@@ -62,30 +266,25 @@ class Pandoc:
 
     def _build_legacy_pandoc_cmd(
         self,
-        out_markup: Literal["markdown", "rst"],
+        out_markup: PandocFormat,
         strip_raw: bool,
-        out_filename: str,
-        html_filename: str,
     ):
         cmd = [
             "pandoc",
             "--normalize",
-            "--parse-raw" if not strip_raw else "",
+            *(["--parse-raw"] if not strip_raw else []),
             "--from",
             "html",
             "--to",
             out_markup if out_markup != "markdown" else "gfm",
             "--wrap=none" if self.version >= (1, 16) else "--no-wrap",
-            "--output",
-            out_filename,
-            html_filename,
         ]
 
         return cmd
 
     def _build_pandoc_format_string(
         self,
-        format_: Literal["markdown", "rst"],
+        format_: PandocFormat,
         extensions_dict: dict[str, dict[str, list[str]]],
     ) -> str:
         enabled = extensions_dict.setdefault(format_, {}).get("enabled", [])
@@ -94,12 +293,14 @@ class Pandoc:
         str_disabled = "".join([f"-{ext}" for ext in disabled])
         return f"{format_}{str_enabled}{str_disabled}"
 
+    def _build_input_format(self, strip_raw: bool) -> str:
+        return "html+raw_html" if not strip_raw else "html"
+
     def _build_modern_pandoc_cmd(
         self,
-        out_markup: Literal["markdown", "rst"],
+        out_markup: PandocFormat,
         strip_raw: bool,
-        out_filename: str,
-        html_filename: str,
+        in_format: str | None = None,
     ):
         output_format_extensions = {
             "markdown": {
@@ -113,7 +314,7 @@ class Pandoc:
         cmd = [
             "pandoc",
             "--from",
-            "html+raw_html" if not strip_raw else "html",
+            in_format or self._build_input_format(strip_raw),
             "--to",
             self._build_pandoc_format_string(
                 out_markup,
@@ -121,34 +322,55 @@ class Pandoc:
             ),
             "--wrap",
             "none",
-            "--output",
-            out_filename,
-            html_filename,
         ]
         return cmd
 
+    def _build_pandoc_options(
+        self,
+        out_markup: PandocFormat,
+        strip_raw: bool,
+        in_format: str | None = None,
+    ) -> dict[str, str]:
+        """Pandoc server equivalent of _build_modern_pandoc_cmd"""
+        output_format_extensions = {
+            "markdown": {
+                "disabled": ["smart"],
+            }
+        }
+
+        options = {
+            "from": in_format or self._build_input_format(strip_raw),
+            "to": self._build_pandoc_format_string(
+                out_markup,
+                output_format_extensions,
+            ),
+            "wrap": "none",
+        }
+        return options
+
     def _build_pandoc_cmd(
         self,
-        out_markup: Literal["markdown", "rst"],
+        out_markup: PandocFormat,
         strip_raw: bool,
-        out_filename: str,
-        html_filename: str,
-    ) -> str:
+    ) -> list[str]:
         if self.version < (2,):
             build_pandoc_cmd = self._build_legacy_pandoc_cmd
         else:
             build_pandoc_cmd = self._build_modern_pandoc_cmd
 
-        return build_pandoc_cmd(
-            out_markup,
-            strip_raw,
-            out_filename,
-            html_filename,
-        )
+        return build_pandoc_cmd(out_markup, strip_raw)
 
-    def _run_pandoc_cmd(self, cmd):
+    def _run_pandoc_cmd(self, cmd, input_text: str) -> str:
+        """Run pandoc, feeding it with input_text, and return its output."""
         try:
-            rc = subprocess.call(cmd)
+            result = subprocess.run(
+                cmd,
+                input=input_text,
+                stdout=subprocess.PIPE,
+                encoding="utf-8",
+                check=False,
+            )
+            rc = result.returncode
             if rc < 0:
                 error = f"Child was terminated by signal {-rc}"
                 sys.exit(error)
@@ -160,14 +382,40 @@ class Pandoc:
             error = f"Pandoc execution failed: {e}"
             sys.exit(error)
 
+        return result.stdout
+
+    async def _run_pandoc_cmd_async(self, cmd, input_text: str) -> str:
+        """Asynchronous version of _run_pandoc_cmd."""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            stdout, _ = await process.communicate(input_text.encode("utf-8"))
+            rc = await process.wait()
+        except OSError as e:
+            error = f"Pandoc execution failed: {e}"
+            sys.exit(error)
+
+        if rc < 0:
+            error = f"Child was terminated by signal {-rc}"
+            sys.exit(error)
+
+        elif rc > 0:
+            error = "Please, check your Pandoc installation."
+            sys.exit(error)
+
+        # Same newline translation as the text mode of _run_pandoc_cmd
+        return stdout.decode("utf-8").replace("\r\n", "\n")
+
     def convert(
         self,
         post: Post,
-        out_markup: Literal["markdown", "rst"],
+        out_markup: OutMarkup,
         strip_raw: bool,
         wp_attach: bool,
         links: dict[str, str],
-        out_filename: str,
     ):
         """
         Convert text from one markup language to another.
@@ -175,42 +423,460 @@ class Pandoc:
         if not self.supports(post.markup):
             return
 
-        with tempfile.NamedTemporaryFile(
-            "w",
-            suffix=".html",
-            encoding="utf-8",
-        ) as fp:
-            html_filename = fp.name
+        content = self._pop_batch_result(post, out_markup, strip_raw)
+        if content is None:
             html_content = self._wrap_into_html(post)
-            fp.write(html_content)
-            fp.flush()  # avoid buffering, pandoc needs the file on disk
+            fast_content = self._convert_fast(html_content, out_markup)
+            if fast_content is not None and self._fast_convert == "on":
+                content = fast_content
+            else:
+                content = self._convert_html(
+                    html_content,
+                    out_markup,
+                    strip_raw,
+                    post.filename,
+                )
+                if fast_content is not None:
+                    self._check_fast_conversion(fast_content, content, post.filename)
+
+        return self._postprocess(content, out_markup, wp_attach, links)
+
+    def _convert_html(
+        self,
+        html_content: str,
+        out_markup: OutMarkup,
+        strip_raw: bool,
+        name: str,
+    ) -> str:
+        key = None
+        if self._cache is not None:
+            key = self._cache_key(html_content, out_markup, strip_raw)
+            content = self._cache.get(key)
+            if content is not None:
+                return content
+
+        content = self._run_conversion(html_content, out_markup, strip_raw, name)
+
+        if key is not None:
+            self._cache.put(key, content)
+
+        return content
+
+    def _run_conversion(
+        self,
+        text: str,
+        out_markup: PandocFormat,
+        strip_raw: bool,
+        name: str,
+        in_format: str | None = None,
+    ) -> str:
+        content = None
+        if self._server is not None:
+            content = self._convert_with_server(
+                text,
+                out_markup,
+                strip_raw,
+                name,
+                in_format,
+            )
 
-            cmd = self._build_pandoc_cmd(
+        if content is None:
+            content = self._convert_with_subprocess(
+                text,
                 out_markup,
                 strip_raw,
-                out_filename,
-                html_filename,
+                in_format,
             )
-            self._run_pandoc_cmd(cmd)
 
-        with open(out_filename, "r", encoding="utf-8") as fs:
-            content = fs.read()
-            if out_markup == "markdown":
-                # In markdown, to insert a <br />, end a line with two
-                # or more spaces & then a end-of-line
-                content = content.replace("\\\n ", "  \n")
-                content = content.replace("\\\n", "  \n")
+        return content
+
+    def convert_many(
+        self,
+        post: Post,
+        out_markups: Sequence[OutMarkup],
+        strip_raw: bool,
+        wp_attach: bool,
+        links: dict[str, str],
+    ) -> dict[str, str]:
+        """
+        Convert a post to several markup languages. The HTML is parsed only
+        once into pandoc's JSON AST, from which each markup is rendered.
+        """
+        if not self.supports(post.markup):
+            return {}
+
+        if len(out_markups) == 1 or self.version < (2,):
+            return {
+                out_markup: self.convert(post, out_markup, strip_raw, wp_attach, links)
+                for out_markup in out_markups
+            }
+
+        html_content = self._wrap_into_html(post)
+        contents, fast_contents, keys = self._lookup_conversions(
+            post, html_content, out_markups, strip_raw
+        )
+        missing = [
+            out_markup for out_markup in out_markups if out_markup not in contents
+        ]
+        if missing:
+            ast = self._run_conversion(html_content, "json", strip_raw, post.filename)
+            for out_markup in missing:
+                contents[out_markup] = self._run_conversion(
+                    ast,
+                    out_markup,
+                    strip_raw,
+                    post.filename,
+                    in_format="json",
+                )
+
+        return self._finish_conversions(
+            post, out_markups, contents, fast_contents, keys, missing, wp_attach, links
+        )
+
+    async def convert_many_async(
+        self,
+        post: Post,
+        out_markups: Sequence[OutMarkup],
+        strip_raw: bool,
+        wp_attach: bool,
+        links: dict[str, str],
+        semaphore: asyncio.Semaphore | None = None,
+    ) -> dict[str, str]:
+        """Asynchronous version of convert_many()"""
+        if not self.supports(post.markup):
+            return {}
+
+        if len(out_markups) == 1 or self.version < (2,):
+            return {
+                out_markup: await self.convert_async(
+                    post, out_markup, strip_raw, wp_attach, links, semaphore
+                )
+                for out_markup in out_markups
+            }
+
+        html_content = self._wrap_into_html(post)
+        contents, fast_contents, keys = self._lookup_conversions(
+            post, html_content, out_markups, strip_raw
+        )
+        missing = [
+            out_markup for out_markup in out_markups if out_markup not in contents
+        ]
+        if missing:
+            async with semaphore or contextlib.nullcontext():
+                cmd = self._build_modern_pandoc_cmd("json", strip_raw)
+                ast = await self._run_pandoc_cmd_async(cmd, html_content)
+                for out_markup in missing:
+                    cmd = self._build_modern_pandoc_cmd(out_markup, strip_raw, "json")
+                    contents[out_markup] = await self._run_pandoc_cmd_async(cmd, ast)
+
+        return self._finish_conversions(
+            post, out_markups, contents, fast_contents, keys, missing, wp_attach, links
+        )
+
+    def _lookup_conversions(
+        self,
+        post: Post,
+        html_content: str,
+        out_markups: Sequence[OutMarkup],
+        strip_raw: bool,
+    ) -> tuple[dict[OutMarkup, str], dict[OutMarkup, str], dict[OutMarkup, str]]:
+        """
+        Find the conversions that don't need pandoc: batch results, fast
+        conversions and cached ones.
+        """
+        contents: dict[OutMarkup, str] = {}
+        fast_contents: dict[OutMarkup, str] = {}
+        keys: dict[OutMarkup, str] = {}
+        content = self._pop_batch_result(post, out_markups[0], strip_raw)
+        if content is not None:
+            contents[out_markups[0]] = content
+
+        for out_markup in out_markups:
+            if out_markup in contents:
+                continue
+
+            fast_content = self._convert_fast(html_content, out_markup)
+            if fast_content is not None:
+                if self._fast_convert == "on":
+                    contents[out_markup] = fast_content
+                    continue
+                fast_contents[out_markup] = fast_content
+
+            if self._cache is not None:
+                keys[out_markup] = self._cache_key(html_content, out_markup, strip_raw)
+                content = self._cache.get(keys[out_markup])
+                if content is not None:
+                    contents[out_markup] = content
+
+        return contents, fast_contents, keys
+
+    def _finish_conversions(
+        self,
+        post: Post,
+        out_markups: Sequence[OutMarkup],
+        contents: dict[OutMarkup, str],
+        fast_contents: dict[OutMarkup, str],
+        keys: dict[OutMarkup, str],
+        converted: list[OutMarkup],
+        wp_attach: bool,
+        links: dict[str, str],
+    ) -> dict[str, str]:
+        for out_markup in converted:
+            if out_markup in keys:
+                self._cache.put(keys[out_markup], contents[out_markup])
+
+        for out_markup, fast_content in fast_contents.items():
+            self._check_fast_conversion(
+                fast_content, contents[out_markup], post.filename
+            )
+
+        return {
+            out_markup: self._postprocess(
+                contents[out_markup], out_markup, wp_attach, links
+            )
+            for out_markup in out_markups
+        }
+
+    async def convert_async(
+        self,
+        post: Post,
+        out_markup: OutMarkup,
+        strip_raw: bool,
+        wp_attach: bool,
+        links: dict[str, str],
+        semaphore: asyncio.Semaphore | None = None,
+    ):
+        """
+        Convert text from one markup language to another, without blocking
+        the event loop while pandoc runs. The optional semaphore bounds the
+        number of concurrent pandoc processes.
+        """
+        if not self.supports(post.markup):
+            return
+
+        html_content = self._wrap_into_html(post)
+        fast_content = self._convert_fast(html_content, out_markup)
+        if fast_content is not None and self._fast_convert == "on":
+            return self._postprocess(fast_content, out_markup, wp_attach, links)
+
+        key = None
+        content = None
+        if self._cache is not None:
+            key = self._cache_key(html_content, out_markup, strip_raw)
+            content = self._cache.get(key)
+
+        if content is None:
+            cmd = self._build_pandoc_cmd(out_markup, strip_raw)
+            async with semaphore or contextlib.nullcontext():
+                content = await self._run_pandoc_cmd_async(cmd, html_content)
+
+            if key is not None:
+                self._cache.put(key, content)
+
+        if fast_content is not None:
+            self._check_fast_conversion(fast_content, content, post.filename)
+
+        return self._postprocess(content, out_markup, wp_attach, links)
+
+    def _postprocess(
+        self,
+        content: str,
+        out_markup: OutMarkup,
+        wp_attach: bool,
+        links: dict[str, str],
+    ) -> str:
+        if out_markup == "markdown":
+            # In markdown, to insert a <br />, end a line with two
+            # or more spaces & then a end-of-line
+            content = content.replace("\\\n ", "  \n")
+            content = content.replace("\\\n", "  \n")
 
         if wp_attach and links:
             content = self.update_links_to_attached_files(content, links)
 
         return content
 
-    def update_links_to_attached_files(self, content, attachments):
-        for old_url, new_path in attachments.items():
-            # url may occur both with http:// and https://
-            http_url = old_url.replace("https://", "http://")
-            https_url = old_url.replace("http://", "https://")
-            for url in [http_url, https_url]:
-                content = content.replace(url, "{static}" + new_path)
+    def _convert_with_server(
+        self,
+        html_content: str,
+        out_markup: PandocFormat,
+        strip_raw: bool,
+        name: str,
+        in_format: str | None = None,
+    ) -> str | None:
+        options = self._build_pandoc_options(out_markup, strip_raw, in_format)
+        try:
+            return self._server.convert(html_content, options)
+        except PandocServerError as e:
+            logger.warning("%s, converting '%s' with a pandoc process instead", e, name)
+            if self._server.process_exited:
+                self.stop_server()
+            return None
+
+    def _convert_with_subprocess(
+        self,
+        html_content: str,
+        out_markup: PandocFormat,
+        strip_raw: bool,
+        in_format: str | None = None,
+    ) -> str:
+        if in_format is not None:
+            # Only modern pandoc versions can read their JSON AST
+            cmd = self._build_modern_pandoc_cmd(out_markup, strip_raw, in_format)
+        else:
+            cmd = self._build_pandoc_cmd(out_markup, strip_raw)
+        return self._run_pandoc_cmd(cmd, html_content)
+
+    def _pop_batch_result(
+        self,
+        post: Post,
+        out_markup: OutMarkup,
+        strip_raw: bool,
+    ) -> str | None:
+        try:
+            batch_post, batch_markup, batch_strip_raw, content = (
+                self._batch_results.pop(id(post))
+            )
+        except KeyError:
+            return None
+
+        if (
+            batch_post is not post
+            or batch_markup != out_markup
+            or batch_strip_raw != strip_raw
+        ):
+            return None
+
         return content
+
+    def convert_batch(
+        self,
+        posts: Sequence[Post],
+        out_markup: OutMarkup,
+        strip_raw: bool,
+    ):
+        """
+        Convert several posts with a single pandoc run, to amortize pandoc's
+        startup time. The results are picked up by convert(), which must
+        still be called for each post.
+
+        A batch that fails is bisected, so that a faulty post does not prevent
+        the others from being converted. Faulty posts are then left to
+        convert(), which reports the error.
+        """
+        self._batch_results = {}
+        if self.version < (3,):
+            # Batches rely on lua custom writers
+            return
+
+        batch_posts = []
+        htmls = []
+        keys = []
+        for post in posts:
+            if not self.supports(post.markup):
+                continue
+            html = self._wrap_into_html(post)
+            if self._fast_convert == "on":
+                # Simple posts don't need pandoc at all
+                content = self._convert_fast(html, out_markup)
+                if content is not None:
+                    self._batch_results[id(post)] = (
+                        post,
+                        out_markup,
+                        strip_raw,
+                        content,
+                    )
+                    continue
+
+            key = None
+            if self._cache is not None:
+                key = self._cache_key(html, out_markup, strip_raw)
+                content = self._cache.get(key)
+                if content is not None:
+                    self._batch_results[id(post)] = (
+                        post,
+                        out_markup,
+                        strip_raw,
+                        content,
+                    )
+                    continue
+
+            # Unbalanced HTML would leak into the next post of the batch
+            if html.strip() and is_balanced_html(html):
+                batch_posts.append(post)
+                htmls.append(html)
+                keys.append(key)
+
+        if len(htmls) < 2:
+            return
+
+        format_ = self._build_pandoc_options(out_markup, strip_raw)["to"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer_filename = os.path.join(tmpdir, "batch_writer.lua")
+            with open(writer_filename, "w", encoding="utf-8") as fp:
+                fp.write(BATCH_WRITER_LUA)
+
+            contents = self._convert_html_batch(
+                htmls, format_, strip_raw, writer_filename
+            )
+
+        for post, key, content in zip(batch_posts, keys, contents):
+            if content is not None:
+                self._batch_results[id(post)] = (post, out_markup, strip_raw, content)
+                if key is not None:
+                    self._cache.put(key, content)
+
+    def _convert_html_batch(
+        self,
+        htmls: list[str],
+        format_: str,
+        strip_raw: bool,
+        writer_filename: str,
+    ) -> list[str | None]:
+        marker = f"blogtopelicanbatch{uuid.uuid4().hex}"
+        separator = f"<p>{marker}</p>"
+        cmd = [
+            "pandoc",
+            "--from",
+            self._build_input_format(strip_raw),
+            "--to",
+            writer_filename,
+            "--wrap",
+            "none",
+            "--variable",
+            f"b2p_marker={marker}",
+            "--variable",
+            f"b2p_format={format_}",
+        ]
+
+        contents: list[str | None] | None = None
+        try:
+            result = subprocess.run(
+                cmd,
+                input=separator.join(htmls),
+                capture_output=True,
+                encoding="utf-8",
+                check=False,
+            )
+            if result.returncode == 0:
+                contents = list(result.stdout.split(f"\n{marker}\n"))
+        except OSError as e:
+            logger.debug("Pandoc batch execution failed: %s", e)
+
+        if contents is not None and len(contents) == len(htmls):
+            return contents
+
+        # Unbalanced HTML may swallow a marker: bisect to isolate the culprit
+        if len(htmls) == 1:
+            return [None]
+
+        middle = len(htmls) // 2
+        logger.debug("Pandoc batch of %d posts failed, splitting it", len(htmls))
+        return self._convert_html_batch(
+            htmls[:middle], format_, strip_raw, writer_filename
+        ) + self._convert_html_batch(
+            htmls[middle:], format_, strip_raw, writer_filename
+        )
+
+    def update_links_to_attached_files(self, content, attachments):
+        return LinkRewriter(attachments).rewrite(content)
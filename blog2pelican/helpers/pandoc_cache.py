@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PandocCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def add(self, other: "PandocCacheStats"):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+
+
+class PandocCache:
+    """
+    On-disk cache of pandoc conversions, stored in a SQLite database.
+
+    Entries are keyed by a hash of everything that affects pandoc's output,
+    so that re-running an import only converts the posts that changed.
+    When the cache grows over max_size bytes, the least recently used
+    entries are evicted.
+    """
+
+    # Evict down to this fraction of max_size, to avoid evicting on each put
+    EVICTION_RATIO = 0.9
+
+    def __init__(self, path: str | pathlib.Path, max_size: int):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self.stats = PandocCacheStats()
+
+        if self.path.parent != pathlib.Path():
+            os.makedirs(self.path.parent, exist_ok=True)
+
+        # Autocommit, several processes may share the cache
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversions ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL"
+            ")"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS conversions_last_used"
+            " ON conversions (last_used)"
+        )
+        # Estimate of the cache size, other processes may update the cache
+        # as well so it's checked against the database before evicting.
+        self._size = self._compute_size()
+
+    @staticmethod
+    def make_key(
+        html_content: str,
+        format_: str,
+        strip_raw: bool,
+        version: tuple[int, ...],
+    ) -> str:
+        h = hashlib.sha256()
+        for part in (
+            ".".join(str(i) for i in version),
+            format_,
+            str(strip_raw),
+            html_content,
+        ):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        row = self._db.execute(
+            "SELECT content FROM conversions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._db.execute(
+            "UPDATE conversions SET last_used = ? WHERE key = ?",
+            (time.time(), key),
+        )
+        return row[0]
+
+    def _compute_size(self) -> int:
+        (size,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM conversions"
+        ).fetchone()
+        return size
+
+    def put(self, key: str, content: str):
+        size = len(content.encode("utf-8"))
+        self._size += size
+        self._db.execute(
+            "INSERT OR REPLACE INTO conversions (key, content, size, last_used)"
+            " VALUES (?, ?, ?, ?)",
+            (key, content, size, time.time()),
+        )
+        self._evict_if_required()
+
+    def _evict_if_required(self):
+        if self._size <= self.max_size:
+            return
+
+        total = self._compute_size()
+        if total <= self.max_size:
+            self._size = total
+            return
+
+        target = self.max_size * self.EVICTION_RATIO
+        keys = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM conversions ORDER BY last_used"
+        ):
+            if total <= target:
+                break
+            keys.append((key,))
+            total -= size
+
+        self._db.executemany("DELETE FROM conversions WHERE key = ?", keys)
+        self._size = total
+        self.stats.evictions += len(keys)
+        logger.debug("Evicted %d entries from the pandoc cache", len(keys))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,193 @@
+import http.client
+import json
+import logging
+import socket
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PandocServerError(Exception):
+    pass
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class PandocServer:
+    """
+    Client for a long-lived `pandoc server` process.
+
+    Pandoc's startup time dominates the conversion of a single post, so
+    instead of running one pandoc process per post, posts are sent over HTTP
+    to a server started once per run.
+    """
+
+    def __init__(self, host="127.0.0.1", port=None, timeout=60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._process = None
+        self._connection = None
+        self._messages: list[str] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def process_exited(self) -> bool:
+        return self._process is not None and self._process.poll() is not None
+
+    def _read_messages(self, stderr):
+        """Collect what pandoc writes on stderr, so that it never blocks"""
+        for line in stderr:
+            message = line.decode("utf-8", errors="replace").rstrip()
+            logger.debug("pandoc server: %s", message)
+            self._messages.append(message)
+
+    def _startup_failure(self, elapsed: float, probe_timeout: float) -> str | None:
+        """
+        Reason to give up waiting for a server that is still running: pandoc
+        builds without the threaded runtime complain, but neither listen nor
+        exit. A server that didn't even announce itself is given up after
+        probe_timeout.
+        """
+        messages = list(self._messages)
+        for message in messages:
+            if "threaded" in message:
+                return message
+        if elapsed >= probe_timeout and not any(
+            message.startswith("Starting server") for message in messages
+        ):
+            return "; ".join(messages) or "no answer"
+        return None
+
+    def start(self, startup_timeout=10, probe_timeout=1):
+        """
+        Spawn `pandoc server` and wait until it answers requests. Servers that
+        don't start listening are given up after probe_timeout, unless they
+        announced they are starting.
+        """
+        if self.port is None:
+            self.port = _find_free_port()
+
+        cmd = [
+            "pandoc",
+            "server",
+            "--port",
+            str(self.port),
+            "--timeout",
+            str(self.timeout),
+        ]
+        try:
+            self._process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            raise PandocServerError(f"Unable to start pandoc server: {e}") from e
+
+        self._messages = []
+        threading.Thread(
+            target=self._read_messages, args=(self._process.stderr,), daemon=True
+        ).start()
+
+        start = time.monotonic()
+        while time.monotonic() - start < startup_timeout:
+            if self._process.poll() is not None:
+                self._process = None
+                raise PandocServerError("Pandoc server exited during startup")
+            try:
+                self._request("GET", "/version")
+                logger.debug("Pandoc server listening on %s", self.url)
+                return
+            except PandocServerError:
+                failure = self._startup_failure(time.monotonic() - start, probe_timeout)
+                if failure is not None:
+                    self.stop()
+                    raise PandocServerError(
+                        f"Pandoc server did not start: {failure}"
+                    ) from None
+                time.sleep(0.1)
+
+        self.stop()
+        raise PandocServerError("Pandoc server did not answer in time")
+
+    def stop(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+    def _request(self, method, path, body=None, headers=None):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(
+                self.host,
+                self.port,
+                timeout=self.timeout,
+            )
+
+        try:
+            self._connection.request(method, path, body=body, headers=headers or {})
+            response = self._connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Drop the connection, a new one is opened on next request
+            self._connection.close()
+            self._connection = None
+            raise PandocServerError(f"Pandoc server unreachable: {e}") from e
+
+        if response.status != 200:
+            raise PandocServerError(
+                f"Pandoc server error {response.status}: "
+                f"{data.decode('utf-8', errors='replace')}"
+            )
+
+        return data
+
+    def convert(self, text: str, options: dict[str, str]) -> str:
+        """
+        Convert text using the given pandoc server options
+        (from, to, wrap, ...).
+        """
+        payload = dict(options, text=text)
+        data = self._request(
+            "POST",
+            "/",
+            body=json.dumps(payload).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+        )
+
+        try:
+            result = json.loads(data)
+        except ValueError as e:
+            raise PandocServerError(f"Invalid pandoc server answer: {e}") from e
+
+        if result.get("error"):
+            raise PandocServerError(result["error"])
+
+        for message in result.get("messages", []):
+            logger.debug("pandoc: %s", message)
+
+        if result.get("base64"):
+            raise PandocServerError("Unexpected binary output from pandoc server")
+
+        return result["output"]
@@ -0,0 +1,337 @@
+"""
+In-process conversion of simple HTML posts to markdown or reST.
+
+Many posts only use a handful of tags (paragraphs, links, emphasis, lists,
+images). Running pandoc on them costs a whole process for output that is
+easy to produce directly. The converter here only accepts a conservative
+subset of HTML, for which it produces the same output as pandoc. Anything
+else is declined, and left to pandoc.
+"""
+
+import re
+from html.parser import HTMLParser
+
+from blog2pelican.domain.entities.settings.base import OutMarkup
+
+# Characters that never need escaping, in text, in markdown and reST
+# ("_" is a word character, but pandoc escapes it)
+_SAFE_TEXT_RE = re.compile(r"(?:[^\W_]|[\s,.;:!?'\"()/%-])*")
+# Text at the start of a block that could be mistaken for markup
+# (list items, headers, enumerations, directives, LaTeX comments...)
+_UNSAFE_BLOCK_START_RE = re.compile(r"\w+[.)](\s|$)|[-+*#>|:=~.(\[%]|\d")
+_UNSAFE_URL_RE = re.compile(r"[\s()<>\"`\\]")
+# Characters allowed around inline markup
+_BEFORE_INLINE = " (\"'"
+_AFTER_INLINE = " .,:;!?)\"'"
+
+_INLINE_TAGS = {"em": "em", "i": "em", "strong": "strong", "b": "strong", "a": "a"}
+_BLOCK_TAGS = frozenset({"p", "ul", "ol"})
+
+
+class UnsupportedHtml(Exception):
+    pass
+
+
+class _Element:
+    def __init__(self, tag: str, attrs: dict[str, str | None]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list[_Element | str] = []
+
+
+class _InlineMarkup:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _LineBreak:
+    pass
+
+
+class _TreeBuilder(HTMLParser):
+    """Build a minimal tree, refusing anything unexpected."""
+
+    ALLOWED_TAGS = frozenset(
+        {"p", "a", "em", "i", "strong", "b", "ul", "ol", "li", "img", "br"}
+    )
+    VOID_TAGS = frozenset({"img", "br"})
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Element("root", {})
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.ALLOWED_TAGS:
+            raise UnsupportedHtml(tag)
+
+        element = _Element(tag, dict(attrs))
+        self.stack[-1].children.append(element)
+        if tag not in self.VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in self.VOID_TAGS:
+            raise UnsupportedHtml(tag)
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        if len(self.stack) < 2 or self.stack[-1].tag != tag:
+            # Implicitly closed tags are left to pandoc
+            raise UnsupportedHtml(tag)
+        self.stack.pop()
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+    def handle_comment(self, data):
+        raise UnsupportedHtml("comment")
+
+    def handle_decl(self, decl):
+        raise UnsupportedHtml("declaration")
+
+    def handle_pi(self, data):
+        raise UnsupportedHtml("processing instruction")
+
+    def unknown_decl(self, data):
+        raise UnsupportedHtml("declaration")
+
+    def close(self):
+        super().close()
+        if len(self.stack) != 1:
+            raise UnsupportedHtml("unclosed tag")
+
+
+def _check_attrs(element: _Element, allowed: set[str]):
+    if not set(element.attrs) <= allowed:
+        raise UnsupportedHtml(f"attributes of {element.tag}")
+
+
+def _check_text(text: str):
+    if not _SAFE_TEXT_RE.fullmatch(text) or "::" in text:
+        raise UnsupportedHtml("text")
+
+
+def _collapse(text: str) -> str:
+    return re.sub(r"\s+", " ", text)
+
+
+class _Renderer:
+    def __init__(self, out_markup: OutMarkup):
+        self.out_markup = out_markup
+
+    def render(self, root: _Element) -> str:
+        blocks = []
+        previous_tag = None
+        for child in root.children:
+            if isinstance(child, str):
+                if child.strip():
+                    raise UnsupportedHtml("text outside of blocks")
+                continue
+            if child.tag not in _BLOCK_TAGS:
+                raise UnsupportedHtml(child.tag)
+            if child.tag in ("ul", "ol") and previous_tag in ("ul", "ol"):
+                # pandoc separates adjacent lists with a comment
+                raise UnsupportedHtml("adjacent lists")
+            previous_tag = child.tag
+
+            if child.tag == "p":
+                blocks.append(self.render_paragraph(child))
+            else:
+                blocks.append(self.render_list(child))
+
+        if not blocks:
+            raise UnsupportedHtml("empty document")
+
+        return "\n\n".join(blocks) + "\n"
+
+    def render_paragraph(self, element: _Element) -> str:
+        _check_attrs(element, set())
+        return self.render_block_content(element.children)
+
+    def render_list(self, element: _Element) -> str:
+        _check_attrs(element, set())
+        items = []
+        for child in element.children:
+            if isinstance(child, str):
+                if child.strip():
+                    raise UnsupportedHtml("text in list")
+                continue
+            if child.tag != "li":
+                raise UnsupportedHtml(child.tag)
+            _check_attrs(child, set())
+            children = child.children
+            if any(isinstance(c, _Element) and c.tag == "p" for c in children):
+                # Paragraphs in items make pandoc produce loose lists
+                raise UnsupportedHtml("paragraph in list")
+            text = self.render_block_content(children)
+            if "\n" in text:
+                raise UnsupportedHtml("line break in list")
+            items.append(text)
+
+        if not items:
+            raise UnsupportedHtml("empty list")
+
+        lines = []
+        for i, item in enumerate(items, 1):
+            if element.tag == "ul":
+                marker = "- "
+            elif self.out_markup == "rst":
+                marker = "#. "
+            else:
+                marker = f"{i}."
+                marker += " " * max(1, 4 - len(marker))
+            lines.append(marker + item)
+
+        return "\n".join(lines)
+
+    def render_block_content(self, children) -> str:
+        first = children[0] if children else None
+        if isinstance(first, str) and _UNSAFE_BLOCK_START_RE.match(first.lstrip()):
+            raise UnsupportedHtml("block start")
+        text = self.render_inlines(children).strip(" ")
+        if not text:
+            raise UnsupportedHtml("empty block")
+        return text
+
+    def render_inlines(self, children) -> str:
+        parts: list[str | _InlineMarkup | _LineBreak] = []
+        for child in children:
+            if isinstance(child, str):
+                _check_text(child)
+                parts.append(_collapse(child))
+            elif child.tag == "br":
+                _check_attrs(child, set())
+                if self.out_markup == "rst":
+                    raise UnsupportedHtml("line break")
+                parts.append(_LineBreak())
+            elif child.tag == "img":
+                parts.append(_InlineMarkup(self.render_image(child)))
+            elif child.tag in _INLINE_TAGS:
+                parts.append(_InlineMarkup(self.render_inline(child)))
+            else:
+                raise UnsupportedHtml(child.tag)
+
+        return self.join_inlines(parts)
+
+    def join_inlines(self, parts) -> str:
+        result = ""
+        for i, part in enumerate(parts):
+            if isinstance(part, _LineBreak):
+                # pandoc drops the spaces around line breaks
+                result = result.rstrip(" ")
+                if not result or result.endswith("\n"):
+                    raise UnsupportedHtml("line break")
+                result += "\\\n"
+            elif isinstance(part, _InlineMarkup):
+                previous = result[-1:] or " "
+                following = parts[i + 1] if i + 1 < len(parts) else " "
+                if isinstance(following, _LineBreak):
+                    following = " "
+                elif isinstance(following, _InlineMarkup):
+                    raise UnsupportedHtml("adjacent inline markup")
+                if previous not in _BEFORE_INLINE + "\n":
+                    raise UnsupportedHtml("inline markup boundary")
+                if following[:1] not in _AFTER_INLINE:
+                    raise UnsupportedHtml("inline markup boundary")
+                result += part.text
+            else:
+                if result.endswith((" ", "\n")) or not result:
+                    part = part.lstrip(" ")
+                if result.endswith("\n") and _UNSAFE_BLOCK_START_RE.match(part):
+                    raise UnsupportedHtml("line start")
+                result += part
+
+        if result.rstrip(" ").endswith("\n"):
+            raise UnsupportedHtml("line break")
+        return result
+
+    def render_text_only(self, element: _Element) -> str:
+        if not element.children or not all(
+            isinstance(child, str) for child in element.children
+        ):
+            raise UnsupportedHtml(f"content of {element.tag}")
+        text = "".join(c for c in element.children if isinstance(c, str))
+        _check_text(text)
+        text = _collapse(text)
+        if text != text.strip() or not text:
+            raise UnsupportedHtml(f"spaces in {element.tag}")
+        return text
+
+    def render_inline(self, element: _Element) -> str:
+        kind = _INLINE_TAGS[element.tag]
+        if kind == "a":
+            return self.render_link(element)
+
+        _check_attrs(element, set())
+        text = self.render_text_only(element)
+        delimiter = "*" if kind == "em" else "**"
+        return f"{delimiter}{text}{delimiter}"
+
+    def render_link(self, element: _Element) -> str:
+        _check_attrs(element, {"href", "title"})
+        href = element.attrs.get("href")
+        title = element.attrs.get("title")
+        if not href or _UNSAFE_URL_RE.search(href):
+            raise UnsupportedHtml("link target")
+        text = self.render_text_only(element)
+        if text in (href, href.removeprefix("mailto:")):
+            # pandoc uses autolinks
+            raise UnsupportedHtml("autolink")
+
+        if self.out_markup == "rst":
+            return f"`{text} <{href}>`__"
+
+        if title is None:
+            return f"[{text}]({href})"
+
+        _check_text(title)
+        if '"' in title:
+            raise UnsupportedHtml("link title")
+        return f'[{text}]({href} "{_collapse(title)}")'
+
+    def render_image(self, element: _Element) -> str:
+        if self.out_markup == "rst":
+            # reST images need substitution definitions
+            raise UnsupportedHtml("image")
+
+        _check_attrs(element, {"src", "alt", "title"})
+        src = element.attrs.get("src")
+        alt = element.attrs.get("alt") or ""
+        title = element.attrs.get("title")
+        if not src or _UNSAFE_URL_RE.search(src):
+            raise UnsupportedHtml("image source")
+        _check_text(alt)
+        alt = _collapse(alt)
+        if alt != alt.strip():
+            raise UnsupportedHtml("image alt")
+
+        if title is None:
+            return f"![{alt}]({src})"
+
+        _check_text(title)
+        if '"' in title:
+            raise UnsupportedHtml("image title")
+        return f'![{alt}]({src} "{_collapse(title)}")'
+
+
+def convert_simple_html(
+    html_content: str,
+    out_markup: OutMarkup,
+) -> str | None:
+    """
+    Convert html_content the way pandoc would, if it only uses simple HTML.
+    Return None otherwise.
+    """
+    if out_markup not in ("markdown", "rst"):
+        return None
+
+    builder = _TreeBuilder()
+    try:
+        builder.feed(html_content)
+        builder.close()
+        return _Renderer(out_markup).render(builder.root)
+    except UnsupportedHtml:
+        return None
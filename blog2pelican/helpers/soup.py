@@ -1,5 +1,9 @@
+import io
+import os
 import sys
 
+from blog2pelican.helpers.input_files import open_input
+
 
 def import_bs4():
     """Import and return bs4, otherwise sys.exit."""
@@ -14,10 +18,26 @@ def import_bs4():
     return bs4
 
 
+def _read_text(infile) -> str:
+    """Read a binary file object as UTF-8 text, with universal newlines"""
+    text = io.TextIOWrapper(infile, encoding="utf-8")
+    try:
+        return text.read()
+    finally:
+        # Leave infile open, it belongs to the caller
+        text.detach()
+
+
 def soup_from_xml_file(filepath, features="xml"):
-    """Reads a file, returns soup."""
+    """
+    Reads a file, returns soup. filepath is the path of a file, possibly
+    compressed, or a binary file object.
+    """
     bs4 = import_bs4()
-    with open(filepath, encoding="utf-8") as infile:
-        xml = infile.read()
+    if isinstance(filepath, (str, os.PathLike)):
+        with open_input(filepath) as infile:
+            xml = _read_text(infile)
+    else:
+        xml = _read_text(filepath)
     soup = bs4.BeautifulSoup(xml, features)
     return soup
@@ -0,0 +1,124 @@
+import concurrent.futures
+import io
+import mmap
+import os
+import re
+from collections import deque
+from collections.abc import Callable, Generator
+from typing import BinaryIO, TypeVar
+
+T = TypeVar("T")
+
+# Approximate size of the shards XML files are split into, in bytes
+SHARD_SIZE = 8 * 1024 * 1024
+
+# End of the markup that can contain a start tag without being one
+_SKIPPED_ENDS = {b"<![CDATA[": b"]]>", b"<!--": b"-->", b"<?": b"?>"}
+
+
+def element_starts(path, name: str) -> Generator[int]:
+    """
+    Yield the offsets of the start tags of the elements named name in the
+    XML file at path. CDATA sections, comments and processing instructions
+    are skipped. Elements named name are expected not to be nested.
+    """
+    regex = re.compile(
+        rb"<(?:!\[CDATA\[|!--|\?|" + re.escape(name.encode()) + rb"[\s/>])"
+    )
+    if os.path.getsize(path) == 0:
+        return
+
+    with (
+        open(path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        pos = 0
+        while match := regex.search(data, pos):
+            end = _SKIPPED_ENDS.get(match.group())
+            if end is None:
+                yield match.start()
+                pos = match.end()
+                continue
+
+            pos = data.find(end, match.end())
+            if pos == -1:
+                return
+            pos += len(end)
+
+
+def plan_shards(
+    path, name: str, shard_size: int | None = None
+) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    Split the XML file at path into shards of about shard_size bytes, each
+    starting with an element named name.
+
+    Return the header preceding the first element (XML declaration and
+    opening tags of its ancestors), and the offsets of each shard.
+    """
+    shard_size = shard_size or SHARD_SIZE
+    starts = []
+    next_start = 0
+    for start in element_starts(path, name):
+        if start >= next_start:
+            starts.append(start)
+            next_start = start + shard_size
+    if not starts:
+        return b"", []
+
+    with open(path, "rb") as f:
+        header = f.read(starts[0])
+    ends = starts[1:] + [os.path.getsize(path)]
+    return header, list(zip(starts, ends))
+
+
+def read_shard(path, header: bytes, start: int, end: int) -> BinaryIO:
+    """
+    Return a file object of the shard, as a document of its own. Parsers
+    must recover from the closing tags missing from all but the last shard.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        return io.BytesIO(header + f.read(end - start))
+
+
+def _parse_shard(parse: Callable[[BinaryIO], T], path, header, start, end) -> T:
+    return parse(read_shard(path, header, start, end))
+
+
+def map_shards(
+    path,
+    name: str,
+    parse: Callable[[BinaryIO], T],
+    jobs: int,
+    shard_size: int | None = None,
+) -> Generator[T]:
+    """
+    Split the XML file at path into shards, and yield what parse returns
+    for each of them, in document order. Shards are parsed by a pool of
+    jobs processes, so parse must be picklable.
+
+    Files too small to be split are parsed in this process.
+    """
+    header, shards = plan_shards(path, name, shard_size)
+    if len(shards) < 2 or jobs < 2:
+        with open(path, "rb") as f:
+            yield parse(f)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Bound the number of parsed shards waiting to be consumed
+        pending: deque[concurrent.futures.Future] = deque()
+        try:
+            for start, end in shards:
+                pending.append(
+                    executor.submit(_parse_shard, parse, path, header, start, end)
+                )
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,89 @@
+import sys
+from collections.abc import Generator
+
+# Whitespace BeautifulSoup collapses into a single space or newline
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+def import_lxml_etree():
+    """Import and return lxml.etree, otherwise sys.exit."""
+    try:
+        from lxml import etree
+    except ImportError:
+        error = 'Missing dependency "lxml" required to import XML files.'
+        sys.exit(error)
+    return etree
+
+
+def iter_elements(path, tag: str) -> Generator:
+    """
+    Parse the XML file at path incrementally, yielding each element
+    matching tag (e.g. "{*}item") once it's complete.
+
+    Elements are freed once the caller is done with them, so that memory
+    usage doesn't depend on the file size.
+    """
+    etree = import_lxml_etree()
+    context = etree.iterparse(
+        path,
+        events=("end",),
+        tag=tag,
+        recover=True,
+        huge_tree=True,
+    )
+    for _, element in context:
+        yield element
+
+        # Free the element, and the already processed siblings kept
+        # referenced by the parent
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+    del context
+
+
+def _soup_text(text: str) -> str:
+    if all(c in _ASCII_SPACES for c in text):
+        return "\n" if "\n" in text else " "
+    return text
+
+
+def element_string(element) -> str | None:
+    """
+    Equivalent of BeautifulSoup's Tag.string for an lxml element: its text
+    if it has a single child, None otherwise.
+    """
+    contents = []
+    if element.text is not None:
+        contents.append(element.text)
+    for child in element:
+        contents.append(child)
+        if child.tail is not None:
+            contents.append(child.tail)
+
+    if len(contents) != 1:
+        return None
+    if isinstance(contents[0], str):
+        return _soup_text(contents[0])
+    return element_string(contents[0])
+
+
+def element_text(element) -> str:
+    """
+    Equivalent of BeautifulSoup's Tag.contents[0] for an lxml element whose
+    first child is text. Raise IndexError if it's empty.
+    """
+    if element.text is None:
+        raise IndexError("element has no text")
+    return _soup_text(element.text)
+
+
+def find(element, name: str):
+    """First descendant of element named name, whatever its namespace"""
+    return next(element.iter(f"{{*}}{name}"), None)
+
+
+def find_string(element, name: str) -> str | None:
+    descendant = find(element, name)
+    return element_string(descendant) if descendant is not None else None
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from blog2pelican.app.use_cases.convert_blog import ConvertBlogUseCase
+from blog2pelican.domain.entities.settings import DotclearSettings
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("pandoc") is None, reason="pandoc not installed"
+)
+
+POSTS_DIR = "tests/data/dotclear/standalone/posts"
+
+
+def make_settings(name, output_dir):
+    return DotclearSettings(
+        input=os.path.join(POSTS_DIR, name),
+        engine="dotclear",
+        output_dir=output_dir,
+        markup="rst",
+        jobs=2,
+    )
+
+
+def read_files(output_dir):
+    return {name: (output_dir / name).read_text() for name in os.listdir(output_dir)}
+
+
+def test_async_matches_sync(tmp_path):
+    uc = ConvertBlogUseCase()
+    for name in sorted(os.listdir(POSTS_DIR)):
+        uc.convert_blog(make_settings(name, tmp_path / "sync"))
+        asyncio.run(uc.convert_blog_async(make_settings(name, tmp_path / "async")))
+
+    assert read_files(tmp_path / "async") == read_files(tmp_path / "sync")
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from blog2pelican.app.use_cases.convert_blog import ConvertBlogUseCase
+from blog2pelican.domain.entities.settings import DotclearSettings
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("pandoc") is None, reason="pandoc not installed"
+)
+
+POSTS_DIR = "tests/data/dotclear/standalone/posts"
+
+
+def make_settings(name, output_dir, markup, extra_markups=None):
+    return DotclearSettings(
+        input=os.path.join(POSTS_DIR, name),
+        engine="dotclear",
+        output_dir=output_dir,
+        markup=markup,
+        extra_markups=extra_markups,
+        fast_convert="off",
+    )
+
+
+def read_files(output_dir):
+    return {name: (output_dir / name).read_text() for name in os.listdir(output_dir)}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_extra_markups_match_single_markup(tmp_path, use_async):
+    uc = ConvertBlogUseCase()
+    for name in sorted(os.listdir(POSTS_DIR)):
+        settings = make_settings(
+            name, tmp_path / "many", "rst", ["markdown", "asciidoc", "rst"]
+        )
+        if use_async:
+            asyncio.run(uc.convert_blog_async(settings))
+        else:
+            uc.convert_blog(settings)
+        uc.convert_blog(make_settings(name, tmp_path / "rst", "rst"))
+        uc.convert_blog(make_settings(name, tmp_path / "md", "markdown"))
+
+    many = read_files(tmp_path / "many")
+    expected = read_files(tmp_path / "rst") | read_files(tmp_path / "md")
+    assert {k: v for k, v in many.items() if not k.endswith(".adoc")} == expected
+    assert sorted(k for k in many if k.endswith(".adoc")) == sorted(
+        k.replace(".rst", ".adoc") for k in read_files(tmp_path / "rst")
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+import pytest
+
+from blog2pelican.app.use_cases.convert_blog import ConvertBlogUseCase, iter_async
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings import DotclearSettings
+
+
+def make_post(filename, content):
+    return Post(
+        title=filename.title(),
+        content=content,
+        filename=filename,
+        date="2012-02-15 11:00",
+        author="admin",
+        categories=None,
+        tags=None,
+        status="published",
+        kind="article",
+        markup="markdown",
+    )
+
+
+def convert(output_dir, posts, capsys, use_async=False, **kwargs):
+    settings = DotclearSettings(
+        input="unused",
+        engine="dotclear",
+        output_dir=output_dir,
+        markup="markdown",
+        incremental=True,
+        **kwargs,
+    )
+    uc = ConvertBlogUseCase()
+    if use_async:
+        asyncio.run(uc.convert_posts_async(iter_async(posts), settings))
+    else:
+        uc.convert_posts(posts, settings)
+
+    # Names of the files written
+    return [line.rsplit("/", 1)[-1] for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_only_changed_posts_are_converted(tmp_path, capsys, use_async):
+    posts = [make_post("first", "First post"), make_post("second", "Second post")]
+    assert convert(tmp_path, posts, capsys, use_async) == ["first.md", "second.md"]
+    assert convert(tmp_path, posts, capsys, use_async) == []
+
+    posts[1] = make_post("second", "Second post, edited")
+    assert convert(tmp_path, posts, capsys, use_async) == ["second.md"]
+    assert (tmp_path / "second.md").read_text().endswith("Second post, edited")
+
+    # Missing files are converted again
+    (tmp_path / "first.md").unlink()
+    assert convert(tmp_path, posts, capsys, use_async) == ["first.md"]
+
+
+def test_settings_change(tmp_path, capsys):
+    posts = [make_post("first", "First post")]
+    convert(tmp_path, posts, capsys)
+
+    assert convert(tmp_path, posts, capsys, disable_slugs=True) == ["first.md"]
+    # Settings that don't change the output don't matter
+    assert convert(tmp_path, posts, capsys, disable_slugs=True, jobs=4) == []
+
+
+def test_removed_posts(tmp_path, capsys, caplog):
+    posts = [make_post("first", "First post"), make_post("second", "Second post")]
+    convert(tmp_path, posts, capsys)
+
+    with caplog.at_level(logging.WARNING):
+        assert convert(tmp_path, posts[:1], capsys) == []
+    assert "Post second was removed from the blog" in caplog.text
+    assert (tmp_path / "second.md").exists()
+
+    assert convert(tmp_path, posts[:1], capsys, delete_removed=True) == ["second.md"]
+    assert not (tmp_path / "second.md").exists()
+    assert (tmp_path / "first.md").exists()
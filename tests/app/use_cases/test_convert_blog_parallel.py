@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pytest
+
+from blog2pelican.app.use_cases.convert_blog import ConvertBlogUseCase
+from blog2pelican.domain.entities.settings import DotclearSettings
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("pandoc") is None, reason="pandoc not installed"
+)
+
+POSTS_DIR = "tests/data/dotclear/standalone/posts"
+
+
+def convert(output_dir, jobs, capsys):
+    uc = ConvertBlogUseCase()
+    for name in sorted(os.listdir(POSTS_DIR)):
+        settings = DotclearSettings(
+            input=os.path.join(POSTS_DIR, name),
+            engine="dotclear",
+            output_dir=output_dir,
+            markup="markdown",
+            jobs=jobs,
+        )
+        uc.convert_blog(settings)
+
+    files = {name: (output_dir / name).read_text() for name in os.listdir(output_dir)}
+    stdout = capsys.readouterr().out.replace(str(output_dir), "")
+    return files, stdout
+
+
+def test_parallel_matches_serial(tmp_path, capsys):
+    serial = convert(tmp_path / "serial", 1, capsys)
+    parallel = convert(tmp_path / "parallel", 2, capsys)
+
+    assert parallel == serial
@@ -1,5 +1,8 @@
+import os
+import shutil
 import tempfile
 
+from blog2pelican.app.use_cases.convert_blog import ConvertBlogUseCase
 from blog2pelican.app.use_cases.convert_post import ConvertPostUseCase
 from blog2pelican.domain.entities.posts import Post
 from blog2pelican.domain.entities.settings import DotclearSettings
@@ -28,7 +31,7 @@ def test_simple():
             use_category_subdir=False,
         )
         uc = ConvertPostUseCase()
-        actual = uc.convert(post, settings, output_dir)
+        actual = uc.convert(post, settings)
 
     expected = Post(
         title="En direct d'Istanbul",
@@ -43,3 +46,49 @@ def test_simple():
         markup="markdown",
     )
     assert actual == expected
+
+
+def test_media_from_local_copy(tmp_path):
+    # Hardlinks need the local copy on the same filesystem as the output
+    public_dir = tmp_path / "copy"
+    shutil.copytree("tests/data/dotclear/media/public", public_dir)
+    output_dir = tmp_path / "output"
+    settings = DotclearSettings(
+        input="tests/data/dotclear/media/backup.txt",
+        engine="dotclear",
+        output_dir=output_dir,
+        markup="markdown",
+        dc_media=True,
+        dc_public_url="http://blog.example.org/public/",
+        dc_public_dir=public_dir,
+    )
+    ConvertBlogUseCase().convert_blog(settings)
+
+    content = (output_dir / "guadec-2007-the-offline-desktop.md").read_text()
+    assert "![]({static}public/guadec/2007/offline-desktop.png)" in content
+    assert 'attachments: "public/guadec/2007/offline-desktop.png"' in content
+    # Media are linked from the local copy, orphans included
+    for media in ["guadec/2007/offline-desktop.png", "cv.pdf"]:
+        assert os.path.samefile(output_dir / "public" / media, public_dir / media)
+
+
+def test_media_in_extra_asciidoc(tmp_path):
+    public_dir = tmp_path / "copy"
+    shutil.copytree("tests/data/dotclear/media/public", public_dir)
+    output_dir = tmp_path / "output"
+    settings = DotclearSettings(
+        input="tests/data/dotclear/media/backup.txt",
+        engine="dotclear",
+        output_dir=output_dir,
+        markup="markdown",
+        extra_markups=["asciidoc"],
+        dc_media=True,
+        dc_public_url="http://blog.example.org/public/",
+        dc_public_dir=public_dir,
+    )
+    ConvertBlogUseCase().convert_blog(settings)
+
+    # Only the media of the post are listed, not the orphans
+    content = (output_dir / "guadec-2007-the-offline-desktop.adoc").read_text()
+    assert ":attachments: public/guadec/2007/offline-desktop.png\n" in content
+    assert os.path.exists(output_dir / "public" / "cv.pdf")
@@ -0,0 +1,78 @@
+import gzip
+import pathlib
+import zipfile
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.blogger import BloggerReader
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings import BloggerSettings
+
+EXPORT = "tests/data/blogger/feed.atom"
+
+
+def test_read_posts():
+    reader = BloggerReader()
+    posts = list(reader.read_posts(EXPORT))
+
+    # Settings and comments are skipped
+    assert [post.filename for post in posts] == ["hello", "post-102", "about", "cake"]
+    assert posts[0] == Post(
+        title="Hello & welcome",
+        content="<p>First post, mentioning an &lt;entry&gt; tag.</p>",
+        filename="hello",
+        date="2012-02-15 11:00",
+        author="admin",
+        categories=None,
+        tags=["News", "Life"],
+        status="published",
+        kind="article",
+        markup="html",
+    )
+    assert (posts[1].title, posts[1].status) == ("", "draft")
+    assert posts[2].kind == "page"
+
+
+def test_import_comments():
+    reader = BloggerReader()
+    reader.use_settings(
+        BloggerSettings(
+            engine="blogger",
+            input=EXPORT,
+            output_dir=pathlib.Path("output"),
+            markup="rst",
+            dirpage=False,
+            import_comments=True,
+        )
+    )
+    comments = [post for post in reader.read_posts(EXPORT) if post.kind == "comment"]
+
+    # Comments are named after their id, not the post they belong to
+    assert [(post.filename, post.author) for post in comments] == [
+        ("post-103", "reader")
+    ]
+
+
+@pytest.mark.parametrize("read_jobs", [1, 2])
+def test_compressed_exports(tmp_path, read_jobs):
+    with open(EXPORT, "rb") as f:
+        content = f.read()
+    (tmp_path / "feed.atom.gz").write_bytes(gzip.compress(content))
+    with zipfile.ZipFile(tmp_path / "takeout.zip", "w", zipfile.ZIP_DEFLATED) as f:
+        f.writestr("Takeout/Blogger/Blogs/Blog/feed.atom", content)
+        f.writestr("Takeout/Blogger/Blogs/Blog/settings.csv", "")
+
+    reader = BloggerReader()
+    reader.use_settings(
+        BloggerSettings(
+            engine="blogger",
+            input=EXPORT,
+            output_dir=pathlib.Path("output"),
+            markup="rst",
+            dirpage=False,
+            read_jobs=read_jobs,
+        )
+    )
+    expected = list(reader.read_posts(EXPORT))
+    for name in ["feed.atom.gz", "takeout.zip"]:
+        assert list(reader.read_posts(str(tmp_path / name))) == expected
@@ -1,5 +1,13 @@
-from blog2pelican.adapters.blog_readers.dotclear import DotclearReader
+import gzip
+import zipfile
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.dotclear import DotclearReader, _decode_tags
 from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings import DotclearSettings
+
+MEDIA_BACKUP = "tests/data/dotclear/media/backup.txt"
 
 
 def test_simple():
@@ -86,3 +94,150 @@ def test_long_line():
     )
 
     assert actual == expected
+
+
+def test_sections_index(tmp_path, capsys):
+    backup = tmp_path / "backup.txt"
+    with open("tests/data/dotclear/standalone/posts/simple.txt", "rb") as f:
+        content = f.read()
+    backup.write_bytes(
+        content.rstrip(b"\n")
+        + b"\n\n[media media_id,user_id,media_path]\n"
+        + b'"1","TEST-GANDI","istanbul.jpg"\n'
+        + b'"2","TEST-GANDI","guadec.png"\n'
+    )
+
+    reader = DotclearReader()
+    sections = reader._index_sections(str(backup))
+    assert {name: section.count for name, section in sections.items()} == {
+        "category": 1,
+        "post": 1,
+        "media": 2,
+    }
+    assert sections["media"].columns == ["media_id", "user_id", "media_path"]
+    assert list(reader._read_section(str(backup), sections["media"])) == [
+        '"1","TEST-GANDI","istanbul.jpg"',
+        '"2","TEST-GANDI","guadec.png"',
+    ]
+
+    # The posts are counted before being read
+    posts = reader.read_posts(str(backup))
+    assert next(posts).title == "En direct d'Istanbul"
+    assert capsys.readouterr().out == "1 posts read.\n"
+
+
+def test_escaped_fields(tmp_path):
+    with open("tests/data/dotclear/standalone/posts/simple.txt", encoding="utf-8") as f:
+        content = f.read()
+    backup = tmp_path / "backup.txt"
+    backup.write_text(
+        content.replace("En direct d'Istanbul", 'En \\"direct\\", d\'Istanbul').replace(
+            "<p>first paragraph</p>", '<p>a\\\\b\\",\\"c</p>\\n<p>d</p>'
+        )
+    )
+
+    reader = DotclearReader()
+    post = next(reader.read_posts(str(backup)))
+    assert post.title == 'En "direct", d\'Istanbul'
+    assert post.content == '<p>a\\b","c</p>\n<p>d</p>'
+    assert post.tags == ["GUADEC", "GNOME"]
+
+
+@pytest.mark.parametrize(
+    "post_meta, tags",
+    [
+        (
+            'a:1:{s:3:"tag";a:2:{i:0;s:6:"GUADEC";i:1;s:5:"GNOME";}}',
+            ("GUADEC", "GNOME"),
+        ),
+        # Lengths are in bytes, and strings may contain delimiters
+        ('a:1:{s:3:"tag";a:1:{i:0;s:7:"b";"}é";}}', ('b";"}é',)),
+        # Other entries are skipped
+        (
+            (
+                'a:3:{i:4;b:1;s:5:"other";a:2:{i:0;N;i:1;a:1:{s:1:"d";d:0.5;}}'
+                's:3:"tag";a:1:{i:0;s:5:"linux";}}'
+            ),
+            ("linux",),
+        ),
+        ('a:1:{s:3:"tag";a:0:{}}', ()),
+        ('a:1:{s:5:"other";i:1;}', None),
+        ("a:0:{}", None),
+    ],
+)
+def test_decode_tags(post_meta, tags):
+    assert _decode_tags(post_meta) == tags
+
+
+def test_decode_invalid_tags():
+    with pytest.raises(ValueError):
+        _decode_tags('a:1:{s:3:"tag";a:1:{i:0;s:9:"short";}}')
+
+
+def test_media_disabled():
+    reader = DotclearReader()
+    assert reader.attached_files() is None
+
+
+def media_reader(tmp_path):
+    reader = DotclearReader()
+    reader.use_settings(
+        DotclearSettings(
+            input=MEDIA_BACKUP,
+            engine="dotclear",
+            output_dir=tmp_path,
+            markup="markdown",
+            dc_media=True,
+            dc_public_url="http://blog.example.org/public",
+        )
+    )
+    return reader
+
+
+def test_attached_media(tmp_path):
+    reader = media_reader(tmp_path)
+    posts = list(reader.read_posts(MEDIA_BACKUP))
+
+    # Links to media are made absolute, to be rewritten once downloaded
+    assert posts[0].content == (
+        '<p><img alt="" '
+        'src="http://blog.example.org/public/guadec/2007/offline-desktop.png" /></p>'
+    )
+    assert reader.attached_files() == {
+        "guadec-2007-the-offline-desktop": {
+            "http://blog.example.org/public/guadec/2007/offline-desktop.png"
+        },
+        None: {"http://blog.example.org/public/cv.pdf"},
+    }
+
+
+@pytest.mark.parametrize("archive", ["backup.txt.gz", "backup.zip"])
+def test_compressed_backup(tmp_path, archive):
+    with open(MEDIA_BACKUP, "rb") as f:
+        content = f.read()
+    path = tmp_path / archive
+    if archive.endswith(".gz"):
+        path.write_bytes(gzip.compress(content))
+    else:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as f:
+            f.writestr("backup.txt", content)
+
+    # Sections are found in the decompressed backup
+    reader = media_reader(tmp_path)
+    posts = list(reader.read_posts(str(path)))
+    expected_reader = media_reader(tmp_path)
+    assert posts == list(expected_reader.read_posts(MEDIA_BACKUP))
+    assert reader.attached_files() == expected_reader.attached_files()
+
+
+def test_escaped_backslash_before_n(tmp_path):
+    with open("tests/data/dotclear/standalone/posts/simple.txt", encoding="utf-8") as f:
+        content = f.read()
+    backup = tmp_path / "backup.txt"
+    backup.write_text(
+        content.replace("<p>first paragraph</p>", "<p>C:\\\\new</p>\\n<p>\\\\\\n</p>")
+    )
+
+    reader = DotclearReader()
+    post = next(reader.read_posts(str(backup)))
+    assert post.content == "<p>C:\\new</p>\n<p>\\\n</p>"
@@ -0,0 +1,80 @@
+import pathlib
+import zipfile
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.medium import MediumReader
+from blog2pelican.domain.entities.settings import MediumSettings
+from blog2pelican.helpers.soup import import_bs4
+
+EXPORT = "tests/data/medium/posts"
+
+
+def read_posts(path=EXPORT, **kwargs):
+    reader = MediumReader()
+    reader.use_settings(
+        MediumSettings(
+            engine="medium",
+            input=EXPORT,
+            output_dir=pathlib.Path("output"),
+            markup="rst",
+            **kwargs,
+        )
+    )
+    return list(reader.read_posts(path))
+
+
+def test_read_posts():
+    posts = read_posts()
+
+    # Files that aren't posts are skipped, and posts come in file name order
+    assert [(post.filename, post.status) for post in posts] == [
+        ("2017-04-21_Hello-world", "published"),
+        ("2018-01-02_Caf--au-lait", "published"),
+        ("draft_Unfinished-thoughts", "draft"),
+    ]
+    assert posts[1].title == "Café au lait"
+    assert posts[1].date == "2018-01-02 08:30"
+    assert posts[1].author == "Jane Doe"
+    assert "<p>Milk &amp; <em>coffee</em>.</p>" in posts[1].content
+
+
+def test_read_single_post():
+    reader = MediumReader()
+    posts = list(reader.read_posts(f"{EXPORT}/2017-04-21_Hello-world-a8a8a8a8.html"))
+    assert [post.title for post in posts] == ["Hello world"]
+
+
+@pytest.mark.parametrize(
+    "settings", [{"html_parser": "lxml"}, {"read_jobs": 2}, {"read_jobs": 0}]
+)
+def test_same_posts(settings):
+    assert read_posts(**settings) == read_posts()
+
+
+def test_strip_medium_post_content():
+    bs4 = import_bs4()
+    soup = bs4.BeautifulSoup(
+        '<section name="a" class="section"><div class="section-content">'
+        '<p id="p1" name="p1" class="graf">Text</p><div>Fish &amp; chips'
+        '<figure class="graf"><img class="graf-image" src="a.jpg"></figure>'
+        '<footer><a href="https://example.org" title="t">Link</a></footer>'
+        "</div></div></section><hr>",
+        "html.parser",
+    )
+    assert MediumReader().strip_medium_post_content(soup) == (
+        '<p>Text</p>Fish &amp; chips<figure><img src="a.jpg"/></figure>'
+        '<a href="https://example.org" title="t">Link</a><hr/>'
+    )
+
+
+@pytest.mark.parametrize("read_jobs", [1, 2])
+def test_export_archive(tmp_path, read_jobs):
+    path = tmp_path / "medium-export.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for post in sorted(pathlib.Path(EXPORT).iterdir()):
+            archive.write(post, f"posts/{post.name}")
+        archive.writestr("profile/profile.html", "<html></html>")
+
+    # Only the posts of the archive are read, without being extracted
+    assert read_posts(str(path), read_jobs=read_jobs) == read_posts()
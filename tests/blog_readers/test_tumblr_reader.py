@@ -0,0 +1,228 @@
+import json
+import logging
+import pathlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.tumblr import (
+    TumblrAPIError,
+    TumblrClient,
+    TumblrReader,
+)
+from blog2pelican.domain.entities.settings import TumblrSettings
+
+
+def make_post(i, timestamp):
+    return {
+        "id": 1000 + i,
+        "blog_name": "example",
+        "type": "text",
+        "title": f"Post {i}",
+        "slug": f"post-{i}",
+        "body": f"<p>Body {i}</p>",
+        "format": "html",
+        "tags": ["tag"],
+        "timestamp": timestamp,
+    }
+
+
+# Most recent posts first, several of them being published during the same
+# second, across pages
+POSTS = [make_post(i, 1500000000 - i // 3 * 60) for i in range(47)]
+
+
+class FakeTumblrHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self, status, body, headers=None):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        with server.lock:
+            server.requests.append(params)
+            # Status and headers of the following replies, if not the usual ones
+            failure = server.failures.pop(0) if server.failures else None
+        time.sleep(server.delay)
+
+        if url.path != "/v2/blog/example.tumblr.com/posts":
+            self._reply(404, {"meta": {"status": 404}})
+            return
+        if params.get("api_key") != "KEY":
+            self._reply(401, {"meta": {"status": 401}})
+            return
+        status, headers = failure or (200, {})
+        if status != 200:
+            self._reply(status, {"meta": {"status": status}}, headers)
+            return
+
+        posts = server.posts
+        if "before" in params:
+            posts = [
+                post for post in posts if post["timestamp"] < int(params["before"])
+            ]
+        if "offset" in params:
+            posts = posts[int(params["offset"]) :]
+        posts = posts[: int(params.get("limit", 20))]
+        self._reply(
+            200, {"meta": {"status": 200}, "response": {"posts": posts}}, headers
+        )
+
+
+@pytest.fixture
+def api_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeTumblrHandler)
+    httpd.lock = threading.Lock()
+    httpd.posts = POSTS
+    httpd.requests = []
+    httpd.failures = []
+    httpd.connections = 0
+    httpd.delay = 0
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/v2"
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def tumblr_reader(api_server, **kwargs):
+    reader = TumblrReader()
+    reader.use_settings(
+        TumblrSettings(
+            engine="tumblr",
+            input="KEY",
+            output_dir=pathlib.Path("output"),
+            markup="rst",
+            blogname="example",
+            api_base=api_server.url,
+            **kwargs,
+        )
+    )
+    return reader
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+def test_read_posts(api_server, prefetch_pages):
+    reader = tumblr_reader(api_server, prefetch_pages=prefetch_pages)
+    posts = list(reader.read_posts("KEY"))
+
+    # Posts published during the same second as the last one of a page are
+    # neither missed nor read twice
+    assert [post.title for post in posts] == [post["title"] for post in POSTS]
+    assert posts[0].filename == "2017-07-14-post-0"
+    assert posts[0].content == "<p>Body 0</p>\n"
+    assert posts[0].categories == ["text"]
+
+    # Pages are requested with a timestamp cursor, over a single connection
+    assert [request.get("before") for request in api_server.requests] == [
+        None,
+        str(POSTS[19]["timestamp"] + 1),
+        str(POSTS[38]["timestamp"] + 1),
+    ]
+    assert api_server.connections == 1
+
+
+def test_same_second(api_server, caplog):
+    api_server.posts = [make_post(i, 1500000000) for i in range(25)] + [
+        make_post(25, 1400000000)
+    ]
+    reader = tumblr_reader(api_server)
+
+    with caplog.at_level(logging.WARNING):
+        posts = list(reader.read_posts("KEY"))
+
+    # Posts of a second that don't fit in a page can't be reached by cursor
+    assert [post.title for post in posts] == [f"Post {i}" for i in range(20)] + [
+        "Post 25"
+    ]
+    assert "Some posts published at 1500000000 may be missing" in caplog.text
+
+
+def test_prefetch(api_server):
+    api_server.delay = 0.05
+    reader = tumblr_reader(api_server, prefetch_pages=2)
+    posts = reader.read_posts("KEY")
+
+    # Following pages are downloaded while the first post is being imported
+    next(posts)
+    deadline = time.monotonic() + 5
+    while len(api_server.requests) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(api_server.requests) == 3
+    posts.close()
+
+
+def test_rate_limit(api_server, caplog):
+    api_server.failures = [
+        (429, {"Retry-After": "0"}),
+        (
+            200,
+            {"X-Ratelimit-Perhour-Remaining": "0", "X-Ratelimit-Perhour-Reset": "0.2"},
+        ),
+    ]
+    with TumblrClient(api_server.url, backoff=0.01) as client:
+        # Rate limited requests are retried
+        client.get("blog/example.tumblr.com/posts", api_key="KEY")
+        assert len(api_server.requests) == 2
+
+        # Once the limit is exhausted, requests wait for its reset
+        start = time.monotonic()
+        with caplog.at_level(logging.WARNING):
+            client.get("blog/example.tumblr.com/posts", api_key="KEY")
+        assert time.monotonic() - start >= 0.2
+        assert "Tumblr API rate limit reached" in caplog.text
+
+
+def test_rate_limit_headers_on_error(api_server):
+    api_server.failures = [
+        (
+            503,
+            {"X-Ratelimit-Perhour-Remaining": "0", "X-Ratelimit-Perhour-Reset": "0.2"},
+        )
+    ]
+    with TumblrClient(api_server.url, backoff=0.01) as client:
+        start = time.monotonic()
+        response = client.get("blog/example.tumblr.com/posts", api_key="KEY")
+
+    # The retry waits for the reset of the exhausted limit, not the backoff
+    assert time.monotonic() - start >= 0.2
+    assert len(response["posts"]) == 20
+
+
+def test_api_error(api_server):
+    api_server.failures = [(503, {})] * 3
+    with (
+        TumblrClient(api_server.url, retries=2, backoff=0.01) as client,
+        pytest.raises(TumblrAPIError, match="HTTP error 503"),
+    ):
+        client.get("blog/example.tumblr.com/posts", api_key="KEY")
+
+    with (
+        TumblrClient(api_server.url) as client,
+        pytest.raises(TumblrAPIError, match="HTTP error 401"),
+    ):
+        client.get("blog/example.tumblr.com/posts", api_key="WRONG")
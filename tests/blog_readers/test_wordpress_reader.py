@@ -0,0 +1,108 @@
+import json
+import lzma
+import pathlib
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.wordpress import WordPressReader
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.domain.entities.settings import WordPressSettings
+
+EXPORT = "tests/data/wordpress/export.xml"
+
+# Output of the original, regex by regex, wpautop port
+with open("tests/data/wordpress/decode_wp_content.json", encoding="utf-8") as f:
+    DECODE_CASES = json.load(f)
+
+
+def test_read_posts():
+    reader = WordPressReader()
+    posts = list(reader.read_posts(EXPORT))
+
+    # Attachments and trashed posts are skipped
+    assert [post.filename for post in posts] == ["hello", "12", "about", "cake"]
+    assert posts[0] == Post(
+        title="Hello & welcome",
+        content=(
+            "First paragraph with <em>emphasis</em>.\n\n<pre>\nsome code\n</pre>\n"
+            "Second line\nthird line\n\n"
+            '[caption id="attachment_11" align="alignnone" width="300" '
+            'caption="A photo"]'
+            '<a href="http://blog.example.org/wp-content/uploads/2012/02/photo.jpg">'
+            '<img src="http://blog.example.org/wp-content/uploads/2012/02/photo.jpg"'
+            " /></a>[/caption]"
+        ),
+        filename="hello",
+        date="2012-02-15 11:00",
+        author="admin",
+        categories=["Life", "News"],
+        tags=["Tag 1"],
+        status="published",
+        kind="article",
+        markup="wp-html",
+    )
+
+
+def test_untitled_draft():
+    reader = WordPressReader()
+    post = list(reader.read_posts(EXPORT))[1]
+
+    # Empty CDATA sections read as a space, as BeautifulSoup used to
+    assert post.title == "No title [ ]"
+    assert post.date is None
+    assert post.status == "draft"
+    assert post.author == "editor"
+
+
+def make_settings(custpost=False, wp_attach=False):
+    return WordPressSettings(
+        engine="wordpress",
+        input=EXPORT,
+        output_dir=pathlib.Path("output"),
+        markup="rst",
+        dirpage=False,
+        custpost=custpost,
+        wp_attach=wp_attach,
+    )
+
+
+def test_custom_post_types():
+    reader = WordPressReader()
+    reader.use_settings(make_settings(custpost=True))
+    kinds = {post.filename: post.kind for post in reader.read_posts(EXPORT)}
+
+    assert kinds == {
+        "hello": "article",
+        "12": "article",
+        "about": "page",
+        "cake": "recipe",
+    }
+
+
+def test_attached_files():
+    reader = WordPressReader()
+    assert reader.attached_files() is None
+
+    reader.use_settings(make_settings(wp_attach=True))
+    posts = list(reader.read_posts(EXPORT))
+
+    assert len(posts) == 4
+    assert reader.attached_files() == {
+        "hello": {"http://blog.example.org/wp-content/uploads/2012/02/photo.jpg"},
+        None: {"http://blog.example.org/wp-content/uploads/2012/05/orphan.pdf"},
+    }
+
+
+@pytest.mark.parametrize("case", DECODE_CASES)
+def test_decode_wp_content(case):
+    content = WordPressReader.decode_wp_content(case["content"], br=case["br"])
+    assert content == case["expected"]
+
+
+def test_compressed_export(tmp_path):
+    path = tmp_path / "export.xml.xz"
+    with open(EXPORT, "rb") as f:
+        path.write_bytes(lzma.compress(f.read()))
+
+    reader = WordPressReader()
+    assert list(reader.read_posts(str(path))) == list(reader.read_posts(EXPORT))
@@ -0,0 +1,44 @@
+import io
+import os
+
+from blog2pelican.helpers.attachment_store import AttachmentStore, StoredFile
+
+
+def test_save_lookup(tmp_path):
+    store = AttachmentStore(tmp_path / "store")
+    assert store.lookup("http://example.org/a.jpg") is None
+
+    store.save(
+        "http://example.org/a.jpg",
+        io.BytesIO(b"image"),
+        tmp_path / "a.jpg",
+        etag='"1"',
+        last_modified="Wed, 15 Feb 2012 11:00:00 GMT",
+    )
+    store.close()
+
+    # The manifest persists across runs
+    store = AttachmentStore(tmp_path / "store")
+    stored = store.lookup("http://example.org/a.jpg")
+    assert stored == StoredFile(
+        digest="6105d6cc76af400325e94d588ce511be5bfdbb73b437dc51eca43917d7a43e3d",
+        size=5,
+        etag='"1"',
+        last_modified="Wed, 15 Feb 2012 11:00:00 GMT",
+    )
+    assert os.path.samefile(store.object_path(stored.digest), tmp_path / "a.jpg")
+
+    # Files removed from the store are downloaded again
+    os.remove(store.object_path(stored.digest))
+    assert store.lookup("http://example.org/a.jpg") is None
+    store.close()
+
+
+def test_link_replaces_target(tmp_path):
+    store = AttachmentStore(tmp_path / "store")
+    (tmp_path / "a.jpg").write_bytes(b"old")
+    store.save("http://example.org/a.jpg", io.BytesIO(b"new"), tmp_path / "a.jpg")
+    store.close()
+
+    assert (tmp_path / "a.jpg").read_bytes() == b"new"
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg", "store"]
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from blog2pelican.app.use_cases.convert_post import download_attachments
+from blog2pelican.helpers.attachment_store import AttachmentStore
+from blog2pelican.helpers.downloader import Downloader, DownloadError
+
+BIG_FILE = os.urandom(1024 * 1024)
+
+
+class FakeFileServerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_file(self):
+        etag = f'"{self.server.version}"'
+        if self.headers["If-None-Match"] == etag:
+            self._reply(304, headers={"ETag": etag})
+            return
+        body = f"content of {self.path} v{self.server.version}".encode()
+        self._reply(200, body, headers={"ETag": etag})
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        try:
+            time.sleep(server.delay)
+            if failures:
+                self._reply(503)
+            elif self.path == "/big.bin":
+                self._reply(200, BIG_FILE)
+            elif self.path == "/moved.txt":
+                self._reply(301, headers={"Location": "/files/a.txt"})
+            elif self.path.startswith("/same/"):
+                self._reply(200, b"same content")
+            elif self.path.startswith("/files/"):
+                self._reply_file()
+            else:
+                self._reply(404)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def file_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeFileServerHandler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.connections = 0
+    httpd.active = 0
+    httpd.max_active = 0
+    httpd.delay = 0
+    httpd.failures = {}
+    httpd.version = 1
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_many(file_server, tmp_path):
+    targets = {
+        f"{file_server.url}/files/{i}.txt": tmp_path / f"{i}.txt" for i in range(20)
+    }
+    with Downloader(workers=4, connections_per_host=2) as downloader:
+        errors = downloader.download_many(targets)
+
+    assert all(error is None for error in errors.values())
+    for i in range(20):
+        assert (tmp_path / f"{i}.txt").read_text() == f"content of /files/{i}.txt v1"
+    # Connections are kept alive, and reused for following files
+    assert file_server.connections <= 2
+
+
+def test_connections_per_host(file_server, tmp_path):
+    file_server.delay = 0.05
+    targets = {
+        f"{file_server.url}/files/{i}.txt": tmp_path / f"{i}.txt" for i in range(12)
+    }
+    with Downloader(workers=8, connections_per_host=3) as downloader:
+        downloader.download_many(targets)
+
+    assert file_server.max_active == 3
+
+
+def test_streamed_file(file_server, tmp_path):
+    with Downloader() as downloader:
+        downloader.download(f"{file_server.url}/big.bin", tmp_path / "big.bin")
+
+    assert (tmp_path / "big.bin").read_bytes() == BIG_FILE
+    assert os.listdir(tmp_path) == ["big.bin"]
+
+
+def test_retry(file_server, tmp_path):
+    file_server.failures["/files/a.txt"] = 2
+    with Downloader(retries=2, backoff=0.01) as downloader:
+        downloader.download(f"{file_server.url}/files/a.txt", tmp_path / "a.txt")
+
+    assert (tmp_path / "a.txt").read_text() == "content of /files/a.txt v1"
+    assert file_server.requests == ["/files/a.txt"] * 3
+
+
+def test_give_up(file_server, tmp_path):
+    file_server.failures["/files/a.txt"] = 3
+    with (
+        Downloader(retries=2, backoff=0.01) as downloader,
+        pytest.raises(DownloadError, match="503"),
+    ):
+        downloader.download(f"{file_server.url}/files/a.txt", tmp_path / "a.txt")
+
+    assert not os.listdir(tmp_path)
+
+
+def test_not_found_is_not_retried(file_server, tmp_path):
+    with (
+        Downloader(retries=2, backoff=0.01) as downloader,
+        pytest.raises(DownloadError, match="404"),
+    ):
+        downloader.download(f"{file_server.url}/missing", tmp_path / "missing")
+
+    assert file_server.requests == ["/missing"]
+
+
+def test_redirection(file_server, tmp_path):
+    with Downloader() as downloader:
+        downloader.download(f"{file_server.url}/moved.txt", tmp_path / "a.txt")
+
+    assert (tmp_path / "a.txt").read_text() == "content of /files/a.txt v1"
+
+
+def test_unreachable(tmp_path):
+    with Downloader(retries=1, backoff=0.01, timeout=1) as downloader:
+        errors = downloader.download_many({"http://127.0.0.1:1/a": tmp_path / "a"})
+
+    assert isinstance(errors["http://127.0.0.1:1/a"], DownloadError)
+
+
+def test_download_attachments(file_server, tmp_path):
+    urls = [
+        f"{file_server.url}/files/2012/02/photo.jpg",
+        f"{file_server.url}/files/2012/02/my photo.jpg",
+        f"{file_server.url}/missing/file.jpg",
+    ]
+    with Downloader(retries=0) as downloader:
+        locations = download_attachments(tmp_path, urls, downloader)
+
+    assert locations == {
+        f"{file_server.url}/files/2012/02/photo.jpg": "files/2012/02/photo.jpg",
+        f"{file_server.url}/files/2012/02/my%20photo.jpg": "files/2012/02/my photo.jpg",
+    }
+    assert (tmp_path / "files/2012/02/my photo.jpg").read_text() == (
+        "content of /files/2012/02/my%20photo.jpg v1"
+    )
+
+
+def download_with_store(file_server, tmp_path, paths):
+    store = AttachmentStore(tmp_path / "store")
+    with Downloader(store=store) as downloader:
+        errors = downloader.download_many(
+            {f"{file_server.url}{path}": tmp_path / path.strip("/") for path in paths}
+        )
+    store.close()
+    assert all(error is None for error in errors.values())
+    return store.stats
+
+
+def test_store_revalidation(file_server, tmp_path):
+    (tmp_path / "files").mkdir()
+    stats = download_with_store(file_server, tmp_path, ["/files/a.txt"])
+    assert (stats.downloaded, stats.unchanged) == (1, 0)
+
+    # Unchanged files aren't downloaded again, and are restored if removed
+    (tmp_path / "files/a.txt").unlink()
+    stats = download_with_store(file_server, tmp_path, ["/files/a.txt"])
+    assert (stats.downloaded, stats.unchanged) == (0, 1)
+    assert (tmp_path / "files/a.txt").read_text() == "content of /files/a.txt v1"
+
+    file_server.version = 2
+    stats = download_with_store(file_server, tmp_path, ["/files/a.txt"])
+    assert (stats.downloaded, stats.unchanged) == (1, 0)
+    assert (tmp_path / "files/a.txt").read_text() == "content of /files/a.txt v2"
+
+
+def test_store_duplicates(file_server, tmp_path):
+    (tmp_path / "same").mkdir()
+    stats = download_with_store(file_server, tmp_path, ["/same/a.jpg", "/same/b.jpg"])
+
+    assert (stats.downloaded, stats.duplicates) == (2, 1)
+    assert os.path.samefile(tmp_path / "same/a.jpg", tmp_path / "same/b.jpg")
+    assert (tmp_path / "same/b.jpg").read_bytes() == b"same content"
+
+
+def test_local_copies(file_server, tmp_path):
+    public = tmp_path / "public"
+    (public / "2012").mkdir(parents=True)
+    (public / "2012/my photo.jpg").write_bytes(b"local photo")
+    (tmp_path / "secret.txt").write_text("secret")
+    output = tmp_path / "output"
+    output.mkdir()
+
+    local_copies = {f"{file_server.url}/files/": public}
+    with Downloader(local_copies=local_copies) as downloader:
+        errors = downloader.download_many(
+            {
+                f"{file_server.url}/files/2012/my%20photo.jpg": output / "photo.jpg",
+                f"{file_server.url}/files/2012/other.jpg": output / "other.jpg",
+                f"{file_server.url}/files/../secret.txt": output / "secret.txt",
+            }
+        )
+
+    assert all(error is None for error in errors.values())
+    assert os.path.samefile(output / "photo.jpg", public / "2012/my photo.jpg")
+    # Files missing from the local copy, or outside of it, are downloaded
+    assert sorted(file_server.requests) == [
+        "/files/../secret.txt",
+        "/files/2012/other.jpg",
+    ]
+    assert (output / "secret.txt").read_text() != "secret"
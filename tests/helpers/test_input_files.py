@@ -0,0 +1,82 @@
+import bz2
+import gzip
+import lzma
+import zipfile
+
+import pytest
+
+from blog2pelican.helpers.input_files import (
+    archive_members,
+    input_format,
+    is_compressed,
+    open_input,
+)
+
+CONTENT = b"<rss><channel><item>1</item></channel></rss>\n"
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+@pytest.mark.parametrize(
+    "fmt, compress",
+    [
+        ("gzip", gzip.compress),
+        ("bzip2", bz2.compress),
+        ("xz", lzma.compress),
+    ],
+)
+def test_compressed(tmp_path, fmt, compress):
+    # Formats are recognised whatever the file name
+    path = tmp_path / "export.xml"
+    path.write_bytes(compress(CONTENT))
+
+    assert input_format(path) == fmt
+    assert is_compressed(path)
+    with open_input(path) as f:
+        assert f.read() == CONTENT
+
+
+def test_uncompressed(tmp_path):
+    path = tmp_path / "export.xml"
+    path.write_bytes(CONTENT)
+    (tmp_path / "empty.xml").write_bytes(b"")
+
+    assert input_format(path) is None
+    assert not is_compressed(tmp_path / "empty.xml")
+    assert not is_compressed(tmp_path)
+    with open_input(path) as f:
+        assert f.read() == CONTENT
+
+
+def test_zip(tmp_path):
+    path = tmp_path / "takeout.zip"
+    write_zip(
+        path,
+        {
+            "Takeout/Blogger/Blogs/Blog/feed.atom": CONTENT,
+            "Takeout/Blogger/Blogs/Blog/settings.csv": b"",
+            "Takeout/Blogger/Blogs/Blog/.feed.atom": b"",
+            "__MACOSX/Takeout/Blogger/Blogs/Blog/feed.atom": b"",
+        },
+    )
+
+    assert input_format(path) == "zip"
+    with zipfile.ZipFile(path) as archive:
+        assert archive_members(archive, (".atom", ".xml")) == [
+            "Takeout/Blogger/Blogs/Blog/feed.atom"
+        ]
+    with open_input(path, (".atom", ".xml")) as f:
+        assert f.read() == CONTENT
+
+
+@pytest.mark.parametrize("names", [[], ["a.xml", "b.xml"]])
+def test_zip_without_single_member(tmp_path, names):
+    path = tmp_path / "export.zip"
+    write_zip(path, dict.fromkeys(names, CONTENT))
+
+    with pytest.raises(ValueError, match="expected a single .xml file"):
+        open_input(path, (".xml",))
@@ -0,0 +1,38 @@
+from blog2pelican.helpers.links import LinkRewriter, url_variants
+
+
+def test_url_variants():
+    assert url_variants("http://a.org/x") == ["http://a.org/x", "https://a.org/x"]
+    assert url_variants("https://a.org/x") == ["http://a.org/x", "https://a.org/x"]
+    assert url_variants("/x") == ["/x"]
+
+
+def test_rewrite_both_schemes():
+    rewriter = LinkRewriter({"http://a.org/up/x.png": "up/x.png"})
+    content = '<img src="http://a.org/up/x.png"/> <a href="https://a.org/up/x.png">'
+    assert rewriter.rewrite(content) == (
+        '<img src="{static}up/x.png"/> <a href="{static}up/x.png">'
+    )
+
+
+def test_rewrite_prefers_longest_url():
+    rewriter = LinkRewriter(
+        {
+            "http://a.org/x.png": "x.png",
+            "http://a.org/x.png.orig": "x.png.orig",
+            "http://a.org/y.png": "y.png",
+        }
+    )
+    content = "http://a.org/x.png.orig http://a.org/x.png http://a.org/y.pn"
+    assert rewriter.rewrite(content) == (
+        "{static}x.png.orig {static}x.png http://a.org/y.pn"
+    )
+
+
+def test_rewrite_special_characters():
+    rewriter = LinkRewriter({"http://a.org/a+b(1).png?s=1": "a+b(1).png"}, prefix="")
+    assert rewriter.rewrite("[x](http://a.org/a+b(1).png?s=1)") == "[x](a+b(1).png)"
+
+
+def test_rewrite_without_locations():
+    assert LinkRewriter({}).rewrite("http://a.org/x.png") == "http://a.org/x.png"
@@ -0,0 +1,60 @@
+import shutil
+
+import pytest
+
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.helpers.pandoc import Pandoc, is_balanced_html
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("pandoc") is None, reason="pandoc not installed"
+)
+
+HTMLS = [
+    '<p>a "b" <img src="x.png"/> <em>c</em>d<sup>1</sup></p>',
+    "<p>first</p><p>line<br/>two<br />three</p>",
+    "<pre>\ncode\n</pre>",
+    "<div><p>unclosed",
+    "<ul><li>a</li><li>b<ol><li>c</li></ol></li></ul>",
+    '<p><img src="y.png" alt="z"/></p><table><tr><td>a</td></tr></table>',
+    "",
+]
+
+
+def make_posts():
+    return [
+        Post(
+            title="Title",
+            content=html,
+            filename=f"post-{i}",
+            date=None,
+            author=None,
+            categories=None,
+            tags=None,
+            status=None,
+            kind="article",
+            markup="html",
+        )
+        for i, html in enumerate(HTMLS)
+    ]
+
+
+def test_is_balanced_html():
+    assert is_balanced_html("<p>a<p>b<ul><li>c</ul><br>")
+    assert not is_balanced_html("<div><p>unclosed")
+    assert not is_balanced_html("<em>a<strong>b</em></strong>")
+
+
+@pytest.mark.parametrize("out_markup", ["markdown", "rst"])
+def test_batch_matches_single_conversion(out_markup):
+    posts = make_posts()
+    batch_pandoc = Pandoc()
+    batch_pandoc.convert_batch(posts, out_markup, strip_raw=False)
+    single_pandoc = Pandoc()
+
+    for post in posts:
+        expected = single_pandoc.convert(post, out_markup, False, False, None)
+        actual = batch_pandoc.convert(post, out_markup, False, False, None)
+        assert actual == expected
+
+    # Empty and unbalanced posts are left out of the batch
+    assert not batch_pandoc._batch_results
@@ -0,0 +1,47 @@
+from blog2pelican.helpers.pandoc_cache import PandocCache
+
+
+def make_key(html):
+    return PandocCache.make_key(html, "markdown-smart", False, (3, 1))
+
+
+def test_key_depends_on_all_inputs():
+    key = make_key("<p>a</p>")
+
+    assert key == make_key("<p>a</p>")
+    assert key != make_key("<p>b</p>")
+    assert key != PandocCache.make_key("<p>a</p>", "rst", False, (3, 1))
+    assert key != PandocCache.make_key("<p>a</p>", "markdown-smart", True, (3, 1))
+    assert key != PandocCache.make_key("<p>a</p>", "markdown-smart", False, (3, 2))
+
+
+def test_get_put(tmp_path):
+    cache = PandocCache(tmp_path / "cache.sqlite", max_size=1024)
+
+    assert cache.get(make_key("<p>a</p>")) is None
+    cache.put(make_key("<p>a</p>"), "a\n")
+    assert cache.get(make_key("<p>a</p>")) == "a\n"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    cache.close()
+
+    # Entries persist across runs
+    cache = PandocCache(tmp_path / "cache.sqlite", max_size=1024)
+    assert cache.get(make_key("<p>a</p>")) == "a\n"
+    cache.close()
+
+
+def test_lru_eviction(tmp_path):
+    cache = PandocCache(tmp_path / "cache.sqlite", max_size=35)
+
+    cache.put(make_key("1"), "x" * 10)
+    cache.put(make_key("2"), "x" * 10)
+    cache.put(make_key("3"), "x" * 10)
+    # Use the oldest entry, so that the second one is the least recently used
+    assert cache.get(make_key("1")) is not None
+    cache.put(make_key("4"), "x" * 10)
+
+    assert cache.get(make_key("2")) is None
+    assert cache.get(make_key("1")) is not None
+    assert cache.get(make_key("4")) is not None
+    assert cache.stats.evictions == 1
+    cache.close()
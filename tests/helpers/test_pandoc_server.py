@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from blog2pelican.domain.entities.posts import Post
+from blog2pelican.helpers.pandoc import Pandoc
+from blog2pelican.helpers.pandoc_server import PandocServer, PandocServerError
+
+
+class FakePandocServerHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(200, b"3.0")
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        request = json.loads(self.rfile.read(length))
+        self.server.requests.append(request)
+        if request["text"] == "fail":
+            self._reply(500, b"conversion failed")
+            return
+        output = f"{request['from']}|{request['to']}|{request['wrap']}"
+        body = json.dumps({"output": output, "base64": False, "messages": []})
+        self._reply(200, body.encode("utf-8"))
+
+
+@pytest.fixture
+def fake_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakePandocServerHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_post(content):
+    return Post(
+        title="Title",
+        content=content,
+        filename="title",
+        date=None,
+        author=None,
+        categories=None,
+        tags=None,
+        status=None,
+        kind="article",
+        markup="html",
+    )
+
+
+def test_convert(fake_server):
+    server = PandocServer(port=fake_server.server_port)
+    pandoc = Pandoc()
+    options = pandoc._build_pandoc_options("markdown", strip_raw=False)
+
+    actual = server.convert("<p>text</p>", options)
+
+    assert actual == "html+raw_html|markdown-smart|none"
+    assert fake_server.requests[0]["text"] == "<p>text</p>"
+    server.stop()
+
+
+def test_server_error(fake_server):
+    server = PandocServer(port=fake_server.server_port)
+
+    with pytest.raises(PandocServerError):
+        server.convert("fail", {"from": "html", "to": "rst", "wrap": "none"})
+    server.stop()
+
+
+def fake_pandoc(tmp_path, monkeypatch, script):
+    """Put a pandoc running script first in PATH"""
+    path = tmp_path / "pandoc"
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+@pytest.mark.parametrize(
+    "script, reason",
+    [
+        # pandoc built without the threaded runtime doesn't exit
+        (
+            (
+                "echo 'getSystemTimerManager: the TimerManager requires linking "
+                "against the threaded runtime' >&2\nsleep 30"
+            ),
+            "threaded runtime",
+        ),
+        ("sleep 30", "no answer"),
+    ],
+)
+def test_server_never_listening(tmp_path, monkeypatch, script, reason):
+    fake_pandoc(tmp_path, monkeypatch, script)
+    server = PandocServer()
+
+    start = time.monotonic()
+    with pytest.raises(PandocServerError, match=reason):
+        server.start(startup_timeout=10, probe_timeout=0.5)
+
+    # The server is given up without waiting for the startup timeout
+    assert time.monotonic() - start < 5
+    assert server._process is None
+
+
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not installed")
+def test_fallback_to_subprocess(fake_server):
+    pandoc = Pandoc()
+    pandoc._server = PandocServer(port=fake_server.server_port)
+
+    actual = pandoc.convert(
+        make_post("fail"),
+        "markdown",
+        strip_raw=False,
+        wp_attach=False,
+        links={},
+    )
+
+    assert actual == "fail\n"
@@ -0,0 +1,187 @@
+import glob
+import random
+import shutil
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.dotclear import DotclearReader
+from blog2pelican.helpers.pandoc import Pandoc
+from blog2pelican.helpers.simple_html import convert_simple_html
+
+# Corpus for the differential test against pandoc
+HTMLS = [
+    (
+        "<p>Hello <em>world</em>, and <strong>bold</strong>.</p>\n"
+        "<p>Second   para\nwith newline</p>"
+    ),
+    '<p>See <a href="http://example.org/a">the site</a> now.</p>',
+    '<p>See <a href="http://example.org/a" title="The site">it</a>.</p>',
+    '<p><img src="/public/a.png" alt="an image" /></p>',
+    '<p>Look <img src="/public/a.png" alt="" /> here</p>',
+    "<ul><li>one</li><li>two</li></ul>",
+    "<p>Intro</p><ol><li>a</li><li>b</li></ol><p>After <i>that</i></p>",
+    "<ol>" + "".join(f"<li>item {i}</li>" for i in range(12)) + "</ol>",
+    "<p>line<br />two</p>",
+    "<p>line <br />\n<em>two</em> and (more)</p>",
+    '<p>Café déjà vu, l\'été "quoted" 50% / x-y</p>',
+    "<p>  leading and trailing  </p>",
+    # Declined by the fast path
+    "<p><i>whole</i> paragraph</p>",
+    "<p>1. not a list</p>",
+    "<p>a*b_c [d] `e`</p>",
+    "<p>snake_case and __init__</p>",
+    "<p>% not a comment</p>",
+    "<p>viii. (x)</p>",
+    "<p>xiii) <em>-x</em></p>",
+    "<p>line<br />viii. (x)</p>",
+    "<p>Intro</p><ol><li><p>a</p></li><li>b</li></ol>",
+    "<ul><li>a</li></ul><ul><li>b</li></ul>",
+    '<p><a href="http://example.org">http://example.org</a></p>',
+    "<p>in<em>word</em></p>",
+    "<div>other tags</div>",
+]
+
+
+# Words of the fuzz corpus: mostly plain text, with some characters that need
+# escaping somewhere in a block
+_FUZZ_WORDS = ["word", "Text", "déjà", "(vu)", "50%", "x-y", "end."]
+_FUZZ_TRICKY_WORDS = [
+    "__init__",
+    "snake_case",
+    "_",
+    "%",
+    "a*b",
+    "l'été",
+    '"q"',
+    "1.",
+    "a.",
+    "viii.",
+    "xiii)",
+    "#tag",
+    "::",
+    ":",
+    "~",
+    "-",
+    "+",
+    "=",
+    "|",
+    "[x]",
+    "`c`",
+    "\\",
+    "&amp;",
+    "?",
+]
+
+
+def _fuzz_inlines(rng):
+    words = [
+        rng.choice(_FUZZ_TRICKY_WORDS if rng.random() < 0.15 else _FUZZ_WORDS)
+        for _ in range(rng.randint(1, 6))
+    ]
+    markup = rng.choice(
+        [
+            None,
+            None,
+            None,
+            f"<em>{rng.choice(_FUZZ_TRICKY_WORDS)}</em>",
+            f'<a href="http://example.org/a_b">{rng.choice(_FUZZ_TRICKY_WORDS)}</a>',
+            "<br />",
+            "<br />xiii)",
+        ]
+    )
+    if markup:
+        words.insert(rng.randint(0, len(words)), markup)
+    return " ".join(words)
+
+
+def fuzz_corpus(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        blocks = []
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.2:
+                tag = rng.choice(["ul", "ol"])
+                items = "".join(
+                    f"<li>{_fuzz_inlines(rng)}</li>" for _ in range(rng.randint(1, 3))
+                )
+                blocks.append(f"<{tag}>{items}</{tag}>")
+            else:
+                blocks.append(f"<p>{_fuzz_inlines(rng)}</p>")
+        yield "\n".join(blocks)
+
+
+def corpus():
+    yield from HTMLS
+    reader = DotclearReader()
+    for filename in sorted(glob.glob("tests/data/dotclear/standalone/posts/*.txt")):
+        for post in reader.read_posts(filename):
+            yield post.content
+
+
+def test_convert_simple_html():
+    html = (
+        '<p>A <a href="/x">link</a>,<br />\n<strong>bold</strong></p>'
+        "<ol><li>first</li><li>second</li></ol>"
+    )
+    assert convert_simple_html(html, "markdown") == (
+        "A [link](/x),\\\n**bold**\n\n1.  first\n2.  second\n"
+    )
+    assert convert_simple_html("<ul><li><em>a</em> b</li></ul>", "rst") == "- *a* b\n"
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "",
+        "plain text",
+        "<p>unclosed",
+        "<p>tag <span>soup</span></p>",
+        '<p class="x">attributes</p>',
+        "<p>escaped &lt;chars&gt;</p>",
+        "<ul><li>nested<ul><li>list</li></ul></li></ul>",
+    ],
+)
+def test_convert_simple_html_declines(html):
+    assert convert_simple_html(html, "markdown") is None
+
+
+def test_rst_declines_images_and_line_breaks():
+    assert convert_simple_html('<p><img src="a.png" alt="a" /></p>', "rst") is None
+    assert convert_simple_html("<p>a<br />b</p>", "rst") is None
+
+
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not installed")
+@pytest.mark.parametrize("out_markup", ["markdown", "rst"])
+def test_matches_pandoc(out_markup):
+    pandoc = Pandoc()
+    cmd = pandoc._build_pandoc_cmd(out_markup, strip_raw=False)
+    converted = 0
+    for html in corpus():
+        content = convert_simple_html(html, out_markup)
+        if content is None:
+            continue
+        assert content == pandoc._run_pandoc_cmd(cmd, html), html
+        converted += 1
+
+    # Make sure the fast path is actually exercised
+    assert converted >= 5
+
+
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not installed")
+@pytest.mark.parametrize("out_markup", ["markdown", "rst"])
+def test_matches_pandoc_fuzz(out_markup):
+    pandoc = Pandoc()
+    cmd = pandoc._build_pandoc_cmd(out_markup, strip_raw=False)
+    mismatches = []
+    converted = 0
+    for html in fuzz_corpus(500):
+        content = convert_simple_html(html, out_markup)
+        if content is None:
+            continue
+        expected = pandoc._run_pandoc_cmd(cmd, html)
+        if content != expected:
+            mismatches.append((html, content, expected))
+        converted += 1
+
+    assert not mismatches
+    assert converted >= 50
@@ -0,0 +1,102 @@
+import pathlib
+
+import pytest
+
+from blog2pelican.adapters.blog_readers.blogger import BloggerReader
+from blog2pelican.adapters.blog_readers.wordpress import WordPressReader
+from blog2pelican.domain.entities.settings import BloggerSettings, WordPressSettings
+from blog2pelican.helpers import xml_shards
+from blog2pelican.helpers.xml_shards import element_starts, plan_shards, read_shard
+
+WORDPRESS_EXPORT = "tests/data/wordpress/export.xml"
+BLOGGER_EXPORT = "tests/data/blogger/feed.atom"
+
+
+def test_element_starts(tmp_path):
+    path = tmp_path / "export.xml"
+    path.write_bytes(
+        b"<?xml version='1.0'?><?pi <item>?><rss><channel>"
+        b"<item><a><![CDATA[<item>]]></a></item><!-- <item> -->"
+        b"<items/><item/><item\n>x</item></channel></rss>"
+    )
+    data = path.read_bytes()
+
+    starts = list(element_starts(path, "item"))
+    assert [data[start : start + 6] for start in starts] == [
+        b"<item>",
+        b"<item/",
+        b"<item\n",
+    ]
+
+    (tmp_path / "empty.xml").write_bytes(b"")
+    assert list(element_starts(tmp_path / "empty.xml", "item")) == []
+
+
+def test_shards_are_documents(tmp_path):
+    path = tmp_path / "export.xml"
+    path.write_bytes(b"<rss><channel><item>1</item><item>2</item></channel></rss>")
+
+    header, shards = plan_shards(path, "item", shard_size=1)
+    assert header == b"<rss><channel>"
+    assert [read_shard(path, header, *shard).read() for shard in shards] == [
+        b"<rss><channel><item>1</item>",
+        b"<rss><channel><item>2</item></channel></rss>",
+    ]
+    # Both items fit in a single shard
+    assert len(plan_shards(path, "item", shard_size=1024)[1]) == 1
+
+
+def make_settings(cls, **kwargs):
+    return cls(
+        input="unused",
+        output_dir=pathlib.Path("output"),
+        markup="rst",
+        dirpage=False,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("read_jobs", [2, 0])
+def test_sharded_wordpress_reader(monkeypatch, read_jobs):
+    def read(read_jobs):
+        reader = WordPressReader()
+        reader.use_settings(
+            make_settings(
+                WordPressSettings,
+                engine="wordpress",
+                custpost=False,
+                wp_attach=True,
+                read_jobs=read_jobs,
+            )
+        )
+        return list(reader.read_posts(WORDPRESS_EXPORT)), reader.attached_files()
+
+    expected = read(1)
+    # One item per shard
+    monkeypatch.setattr(xml_shards, "SHARD_SIZE", 1)
+    assert read(read_jobs) == expected
+
+
+def test_sharded_blogger_reader(monkeypatch):
+    def read(read_jobs):
+        reader = BloggerReader()
+        reader.use_settings(
+            make_settings(
+                BloggerSettings,
+                engine="blogger",
+                import_comments=True,
+                read_jobs=read_jobs,
+            )
+        )
+        return list(reader.read_posts(BLOGGER_EXPORT))
+
+    expected = read(1)
+    assert [post.filename for post in expected] == [
+        "hello",
+        "post-102",
+        "post-103",
+        "about",
+        "cake",
+    ]
+    monkeypatch.setattr(xml_shards, "SHARD_SIZE", 1)
+    assert read(2) == expected